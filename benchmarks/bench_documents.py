@@ -0,0 +1,92 @@
+"""Times the export of several documents (one per camera and per scene) in a single export,
+against one separate export per document, without Blender.
+
+Usage: python benchmarks/bench_documents.py [--vertices N] [--meshes N] [--cameras N] [--scenes N]
+                                            [--output results.json]
+
+The scenes link the same objects, as scenes made with "Link Objects" do. The documents of both runs
+are compared byte for byte, and the results are written as json.
+"""
+import os
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+
+import fakeblender
+import bench_export
+
+bpy = bench_export.bpy
+
+# Creates scenes linking the same objects, seen from cameraCount cameras
+def createScenes(vertexCount, meshCount, cameraCount, sceneCount):
+    scene = fakeblender.createScene(vertexCount, 4, meshCount, 1, False)
+    for index in range(1, cameraCount):
+        scene.objects.append(fakeblender.Object("Camera.%03i" % index, "CAMERA", fakeblender.Camera("Camera.%03i" % index),
+                                                location=(index * 3.0, -10.0, 5.0), rotation=(1.1, 0.0, 0.2 * index)))
+    scenes = [scene]
+    for index in range(1, sceneCount):
+        linkedScene = fakeblender.Scene("Scene.%03i" % index, scene.objects)
+        linkedScene.camera = scene.camera
+        scenes.append(linkedScene)
+    return scenes
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vertices", type=int, default=20000, help="vertices per mesh")
+    parser.add_argument("--meshes", type=int, default=4, help="number of distinct meshes")
+    parser.add_argument("--cameras", type=int, default=4, help="cameras of the scenes")
+    parser.add_argument("--scenes", type=int, default=2, help="scenes linking the same objects")
+    parser.add_argument("--output", default="bench_documents.json", help="json results file")
+    arguments = parser.parse_args()
+
+    scenes = createScenes(arguments.vertices, arguments.meshes, arguments.cameras, arguments.scenes)
+    bpy.data.scenes = scenes
+    directory = tempfile.mkdtemp(prefix="bench_documents")
+    options = {"ExportTextures": False}
+    try:
+        # One export per document, each scene being seen from its cameras in turn
+        separateSeconds = 0.0
+        separatePaths = []
+        for scene in scenes:
+            activeCamera = scene.camera
+            for camera in [item for item in scene.objects if item.type == "CAMERA"]:
+                scene.camera = camera
+                filePath = os.path.join(directory, "separate_%s_%s.xaml" % (scene.name, camera.name))
+                separateSeconds += bench_export.export(scene, filePath, options)
+                separatePaths.append(filePath)
+            scene.camera = activeCamera
+
+        # A single export of all the documents
+        combinedOptions = dict(options, ExportCameras="ALL", ExportScenes="ALL")
+        combinedSeconds = bench_export.export(scenes[0], os.path.join(directory, "combined.xaml"), combinedOptions)
+        identicalCount = 0
+        for path in separatePaths:
+            File = open(path)
+            separate = File.read()
+            File.close()
+            File = open(path.replace("separate_", "combined_"))
+            combined = File.read()
+            File.close()
+            identicalCount += separate == combined
+    finally:
+        shutil.rmtree(directory)
+
+    documentCount = len(separatePaths)
+    print("%i documents (%i scenes x %i cameras)" % (documentCount, len(scenes), arguments.cameras))
+    print("  separate exports  %8.3fs" % separateSeconds)
+    print("  single export     %8.3fs (%.1fx faster, %.0f%% saved)" % (combinedSeconds, separateSeconds / combinedSeconds, 100.0 * (1.0 - combinedSeconds / separateSeconds)))
+    print("  identical documents: %i/%i" % (identicalCount, documentCount))
+
+    parameters = {"vertices": arguments.vertices, "meshes": arguments.meshes, "cameras": arguments.cameras, "scenes": arguments.scenes}
+    File = open(arguments.output, "w")
+    json.dump({"commit": bench_export.getCommit(), "python": platform.python_version(), "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+               "parameters": parameters, "documents": documentCount, "separateSeconds": separateSeconds,
+               "combinedSeconds": combinedSeconds, "identicalDocuments": identicalCount}, File, indent=2)
+    File.close()
+    print("results written to %s" % arguments.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Times each stage of a full export on synthetic scenes, without Blender.
+
+Usage: python benchmarks/bench_export.py [--vertices N] [--materials N] [--meshes N]
+                                         [--instances N] [--slots N] [--no-uvs] [--output results.json]
+
+The results are written as json so that runs on different commits can be compared.
+"""
+import os
+import sys
+import json
+import time
+import inspect
+import argparse
+import platform
+import tempfile
+import subprocess
+
+import fakeblender
+
+bpy = fakeblender.install()
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import io_scene_xaml
+from io_scene_xaml import xaml
+from io_scene_xaml import io_xaml_exporter
+
+# Exporter functions timed as stages, everything else of the export being reported as gathering
+Stages = [(io_xaml_exporter, "writeMaterial"),
+          (io_xaml_exporter, "iterateSharedMeshGeometry"),
+          (io_xaml_exporter, "iterateMeshComprehensive"),
+          (io_xaml_exporter, "writeMeshOptimized"),
+          (xaml.FileStreamWriter, "commit")]
+
+# Replaces a function by a wrapper accumulating its duration, nested calls being counted once
+# and generators being timed step by step
+def instrument(timings, owner, name):
+    function = getattr(owner, name)
+    timings[name] = 0.0
+    depth = [0]
+    def timedCall(call):
+        depth[0] += 1
+        start = time.perf_counter()
+        try:
+            return call()
+        finally:
+            depth[0] -= 1
+            if depth[0] == 0:
+                timings[name] += time.perf_counter() - start
+    def timedSteps(steps):
+        while True:
+            try:
+                step = timedCall(lambda: next(steps))
+            except StopIteration:
+                return
+            yield step
+    def timedFunction(*arguments, **options):
+        result = timedCall(lambda: function(*arguments, **options))
+        return timedSteps(result) if inspect.isgenerator(result) else result
+    setattr(owner, name, timedFunction)
+    return function
+
+# Runs the export operator on a scene, the console output being discarded
+def export(scene, filePath, options):
+    bpy.context.scene = scene
+    bpy.data.meshes[:] = []
+    operator = io_scene_xaml.XamlExporter()
+    operator.filepath = filePath
+    for name, value in options.items():
+        setattr(operator, name, value)
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+    try:
+        start = time.perf_counter()
+        operator.execute(bpy.context)
+        return time.perf_counter() - start
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+def getCommit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL, universal_newlines=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vertices", type=int, default=20000, help="vertices per mesh")
+    parser.add_argument("--materials", type=int, default=4, help="number of materials of the scene")
+    parser.add_argument("--meshes", type=int, default=4, help="number of distinct meshes")
+    parser.add_argument("--instances", type=int, default=1, help="linked duplicates of each mesh")
+    parser.add_argument("--slots", type=int, default=3, help="material slots per mesh, at most the number of materials")
+    parser.add_argument("--no-uvs", action="store_true", help="meshes without uv layer")
+    parser.add_argument("--output", default="bench_export.json", help="json results file")
+    arguments = parser.parse_args()
+
+    parameters = {"vertices": arguments.vertices, "materials": arguments.materials, "meshes": arguments.meshes,
+                  "instances": arguments.instances, "slots": arguments.slots, "uvs": not arguments.no_uvs}
+    scene = fakeblender.createScene(arguments.vertices, arguments.materials, arguments.meshes, arguments.instances, not arguments.no_uvs, 0, arguments.slots)
+    filePath = os.path.join(tempfile.gettempdir(), "bench_export.xaml")
+
+    results = []
+    for mode, options in (("comprehensive", {"Comprehensive": True}), ("optimized", {"Comprehensive": False})):
+        timings = {}
+        originals = [(owner, name, instrument(timings, owner, name)) for owner, name in Stages]
+        try:
+            total = export(scene, filePath, options)
+        finally:
+            for owner, name, function in originals:
+                setattr(owner, name, function)
+        timings["gathering"] = total - sum(timings.values())
+        results.append({"mode": mode, "options": options, "seconds": total,
+                        "stages": timings, "bytes": os.path.getsize(filePath)})
+        print("%s: %.3fs, %.1f MB" % (mode, total, os.path.getsize(filePath) / 2**20))
+        for name, seconds in sorted(timings.items(), key=lambda item: -item[1]):
+            print("  %-26s %8.3fs" % (name, seconds))
+    os.remove(filePath)
+
+    File = open(arguments.output, "w")
+    json.dump({"commit": getCommit(), "python": platform.python_version(), "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+               "parameters": parameters, "results": results}, File, indent=2)
+    File.close()
+    print("results written to %s" % arguments.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Times the gathering of the comprehensive geometry of a mesh split by material slot, the faces of each slot
+being selected by a scan of all the faces per slot (as before the single pass bucketing) or by a single pass.
+
+Usage: python benchmarks/bench_material_slots.py [--vertices N] [--slots 1,10,100] [--repeat N]
+
+Each mesh has exactly the given number of material slots, its rows of faces being spread over them.
+The best of the repeated runs is reported, with the geometry gathered in both cases being compared.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+import fakeblender
+
+fakeblender.install()
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from io_scene_xaml import io_xaml_exporter
+
+# Selects the faces of each slot by scanning all the faces once per slot
+def selectFacesPerSlot(meshData):
+    tessfaces = meshData.tessfaces
+    return [[index for index, face in enumerate(tessfaces) if face.material_index == slot] for slot in range(len(meshData.materials))]
+
+# Selects the faces of all the slots in a single pass
+def selectFacesSinglePass(meshData):
+    buckets = io_xaml_exporter.bucketFacesByMaterial(meshData)
+    return [buckets.get(slot, []) for slot in range(len(meshData.materials))]
+
+# Gets the best duration of selecting the faces, and of selecting them and gathering the geometry of each slot
+def measure(meshData, selectFaces, repeat):
+    bestSelect = bestTotal = None
+    for run in range(repeat):
+        start = time.perf_counter()
+        buckets = selectFaces(meshData)
+        selected = time.perf_counter()
+        geometries = [io_xaml_exporter.gatherMeshComprehensiveGeometry(meshData, material, faceIndices)
+                      for material, faceIndices in zip(meshData.materials, buckets)]
+        end = time.perf_counter()
+        bestSelect = min(bestSelect, selected - start) if bestSelect is not None else selected - start
+        bestTotal = min(bestTotal, end - start) if bestTotal is not None else end - start
+    return bestSelect, bestTotal, geometries
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vertices", type=int, default=20000, help="vertices of the mesh")
+    parser.add_argument("--slots", default="1,10,100", help="comma separated numbers of material slots")
+    parser.add_argument("--repeat", type=int, default=5, help="runs of each measure, the best one being kept")
+    arguments = parser.parse_args()
+
+    print("%6s %8s %14s %14s %14s %14s" % ("slots", "faces", "select/slot", "select once", "gather/slot", "gather once"))
+    for slotCount in [int(value) for value in arguments.slots.split(",")]:
+        generator = random.Random(0)
+        materials = [fakeblender.Material("Material.%03i" % index, (0.5, 0.5, 0.5)) for index in range(slotCount)]
+        meshData = fakeblender.createGridMesh("Mesh", arguments.vertices, materials, True, generator)
+        perSlot = measure(meshData, selectFacesPerSlot, arguments.repeat)
+        singlePass = measure(meshData, selectFacesSinglePass, arguments.repeat)
+        assert perSlot[2] == singlePass[2]
+        print("%6i %8i %13.3fs %13.3fs %13.3fs %13.3fs" % (slotCount, len(meshData.tessfaces), perSlot[0], singlePass[0], perSlot[1], singlePass[1]))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Measures the vertex cache miss ratio (ACMR) of synthetic meshes before and after the triangle reordering.
+
+Usage: python benchmarks/bench_ordering.py [vertex count]
+
+ACMR is the number of vertices transformed per triangle with a 16 entries FIFO cache:
+0.5 is the ideal of a large regular grid, 3.0 means no reuse at all.
+"""
+import os
+import sys
+import time
+import math
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from io_scene_xaml import ordering
+
+# Creates the triangles of a grid of shared vertices, row after row as modeling tools create them
+def createGrid(vertexCount):
+    side = max(2, int(math.sqrt(vertexCount)))
+    indices = []
+    for row in range(side - 1):
+        for column in range(side - 1):
+            a = row * side + column
+            indices.append([a, a + 1, a + side + 1])
+            indices.append([a, a + side + 1, a + side])
+    return side * side, indices
+
+# Creates a closed uv sphere, its triangles being in random order as after boolean operations or imports
+def createShuffledSphere(vertexCount, generator):
+    rings = max(3, int(math.sqrt(vertexCount / 2)))
+    segments = rings * 2
+    indices = []
+    for ring in range(rings - 1):
+        for segment in range(segments):
+            a = ring * segments + segment
+            b = ring * segments + (segment + 1) % segments
+            indices.append([a, b, b + segments])
+            indices.append([a, b + segments, a + segments])
+    generator.shuffle(indices)
+    return rings * segments, indices
+
+def measure(name, vertexCount, indices):
+    before = ordering.computeACMR(indices)
+    start = time.perf_counter()
+    ordered = ordering.tipsify(indices, vertexCount)
+    elapsed = time.perf_counter() - start
+    assert sorted(map(tuple, ordered)) == sorted(map(tuple, indices))
+    print("%-16s %9i %8.3f %8.3f %10.3fs" % (name, len(indices), before, ordering.computeACMR(ordered), elapsed))
+
+def main():
+    vertexCount = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    generator = random.Random(0)
+    print("%-16s %9s %8s %8s %11s" % ("mesh", "triangles", "before", "after", "reordering"))
+    measure("grid", *createGrid(vertexCount))
+    measure("shuffled sphere", *createShuffledSphere(vertexCount, generator))
+
+if __name__ == "__main__":
+    main()
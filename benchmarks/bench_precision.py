@@ -0,0 +1,84 @@
+"""Measures file size and formatting time of the float encodings on a dense mesh: fixed decimals
+(the default) against the legacy %f formatting, and compact numbers without trailing zeros.
+
+Usage: python benchmarks/bench_precision.py [vertex count]
+"""
+import os
+import sys
+import time
+import random
+from collections import namedtuple
+
+import fakeblender
+
+fakeblender.install()
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from io_scene_xaml import xaml
+
+Vector = namedtuple("Vector", "x y z")
+
+def buildMesh(vertexCount):
+    generator = random.Random(0)
+    # Dense grid-like positions, mostly axis aligned normals and uvs, as in CAD meshes
+    vertices = [Vector(round(generator.uniform(-10, 10), 3), round(generator.uniform(-10, 10), 3), generator.uniform(-10, 10)) for i in range(vertexCount)]
+    normals = [generator.choice((Vector(0.0, 0.0, 1.0), Vector(1.0, 0.0, 0.0), Vector(0.0, -1.0, 0.0))) for i in range(vertexCount)]
+    uvs = [(generator.random(), generator.choice((0.0, 0.5, 1.0))) for i in range(vertexCount)]
+    indices = [[generator.randrange(vertexCount) for corner in range(3)] for i in range(vertexCount * 2)]
+    return vertices, normals, uvs, indices
+
+class LegacyWriter:
+    "Formats lists the way the writer did before the compact encoding"
+
+    def formatVector(self, vector):
+        return "%f,%f,%f" % (vector.x, vector.y, vector.z)
+
+    def formatPoint(self, point):
+        return "%f,%f" % (point[0], point[1])
+
+    def formatList(self, list):
+        return ",".join([str(item) for item in list])
+
+def writeLegacy(mesh):
+    vertices, normals, uvs, indices = mesh
+    writer = LegacyWriter()
+    return " ".join([writer.formatVector(vector) for vector in vertices] +
+                    [writer.formatList(triangle) for triangle in indices] +
+                    [writer.formatVector(vector) for vector in normals] +
+                    [writer.formatPoint(point) for point in uvs])
+
+def writeMesh(mesh, precisions, isCompact):
+    vertices, normals, uvs, indices = mesh
+    writer = xaml.StreamWriter()
+    writer.precisions = precisions
+    writer.isCompact = isCompact
+    writer.openTag("MeshGeometry3D")
+    writer.addVectorListProperty("Positions", vertices)
+    writer.addListListProperty("TriangleIndices", indices)
+    writer.addVectorListProperty("Normals", normals, "normal")
+    writer.addPointListProperty("TextureCoordinates", uvs)
+    writer.closeAllTags()
+    return writer.content
+
+# Keeps the best of a few runs to limit the noise
+def measure(name, write, runCount=5):
+    elapsed = None
+    for run in range(runCount):
+        start = time.perf_counter()
+        content = write()
+        runTime = time.perf_counter() - start
+        elapsed = runTime if elapsed is None else min(elapsed, runTime)
+    print("%-24s %8.2f s  %8.1f MB" % (name, elapsed, len(content) / 2**20))
+
+def main():
+    vertexCount = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    print("Dense mesh: %i vertices" % vertexCount)
+    mesh = buildMesh(vertexCount)
+    measure("legacy %f", lambda: writeLegacy(mesh))
+    for isCompact in (False, True):
+        prefix = "compact" if isCompact else "fixed"
+        measure("%s, 6 decimals" % prefix, lambda: writeMesh(mesh, {"position": 6, "normal": 6, "uv": 6, "transform": 6}, isCompact))
+        measure("%s, 4/3/4 decimals" % prefix, lambda: writeMesh(mesh, {"position": 4, "normal": 3, "uv": 4, "transform": 6}, isCompact))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Compares the in-memory and the streaming xaml writers on a synthetic scene.
+
+Usage: python benchmarks/bench_writer.py [vertex count] [output file]
+"""
+import os
+import sys
+import time
+import tempfile
+import tracemalloc
+from collections import namedtuple
+
+import fakeblender
+
+fakeblender.install()
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from io_scene_xaml import xaml
+
+Vector = namedtuple("Vector", "x y z")
+
+def buildScene(vertexCount):
+    vertices = [Vector(i * 0.001, i * 0.002, i * 0.003) for i in range(vertexCount)]
+    normals = [Vector(0.0, 0.0, 1.0)] * vertexCount
+    indices = [[i, i + 1, i + 2] for i in range(0, vertexCount - 2, 3)]
+    return vertices, normals, indices
+
+def writeScene(writer, scene):
+    vertices, normals, indices = scene
+    writer.openTag("Viewport3D")
+    writer.openTag("Viewport3D.Children")
+    writer.openTag("ModelVisual3D")
+    writer.openTag("ModelVisual3D.Content")
+    writer.openTag("GeometryModel3D")
+    writer.openTag("GeometryModel3D.Geometry")
+    writer.openTag("MeshGeometry3D")
+    writer.newLine()
+    writer.addVectorListProperty("Positions", vertices)
+    writer.newLine()
+    writer.addListListProperty("TriangleIndices", indices)
+    writer.newLine()
+    writer.addVectorListProperty("Normals", normals)
+    writer.closeAllTags()
+
+def measure(name, createWriter, filePath, scene):
+    tracemalloc.start()
+    start = time.perf_counter()
+    writer = createWriter(filePath)
+    writeScene(writer, scene)
+    writer.commit(filePath)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print("%-10s %8.2f s  peak %8.1f MB  file %8.1f MB" % (name, elapsed, peak / 2**20, os.path.getsize(filePath) / 2**20))
+
+def main():
+    vertexCount = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    filePath = sys.argv[2] if len(sys.argv) > 2 else os.path.join(tempfile.gettempdir(), "bench_writer.xaml")
+    print("Synthetic scene: %i vertices" % vertexCount)
+    scene = buildScene(vertexCount)
+    measure("memory", lambda filePath: xaml.StreamWriter(), filePath, scene)
+    measure("streaming", xaml.FileStreamWriter, filePath, scene)
+    os.remove(filePath)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,415 @@
+"""Lightweight stand-ins for the bpy and mathutils modules, and parametric scene generation.
+
+Only the parts of the Blender API used by the exporter are provided, so that the exporter
+can be run and timed outside of Blender. Call install() before importing io_scene_xaml.
+"""
+import sys
+import math
+import types
+import random
+import struct
+
+# Rounds a float to single precision, as Blender stores its data
+def toFloat32(value):
+    return struct.unpack("f", struct.pack("f", value))[0]
+
+class Vector(tuple):
+    "Stand-in for mathutils.Vector"
+
+    def __new__(cls, values):
+        return tuple.__new__(cls, [float(value) for value in values])
+
+    x = property(lambda self: self[0])
+    y = property(lambda self: self[1])
+    z = property(lambda self: self[2])
+
+class Quaternion(tuple):
+    "Stand-in for mathutils.Quaternion, stored as (w, x, y, z)"
+
+    def __new__(cls, values):
+        return tuple.__new__(cls, [float(value) for value in values])
+
+    w = property(lambda self: self[0])
+    x = property(lambda self: self[1])
+    y = property(lambda self: self[2])
+    z = property(lambda self: self[3])
+
+class Matrix(tuple):
+    "Stand-in for mathutils.Matrix, a tuple of rows"
+
+    def __new__(cls, rows):
+        return tuple.__new__(cls, [Vector(row) for row in rows])
+
+    def __mul__(self, other):
+        if isinstance(other, Matrix):
+            columns = list(zip(*other))
+            return Matrix([[sum(a * b for a, b in zip(row, column)) for column in columns] for row in self])
+        vector = list(other) + [1.0] * (len(self) - len(other))
+        return Vector([sum(a * b for a, b in zip(row, vector)) for row in self][:len(other)])
+
+    # Euler angles of the rotation part, XYZ order
+    def to_euler(self):
+        return Euler((math.atan2(self[2][1], self[2][2]), math.asin(max(-1.0, min(1.0, -self[2][0]))), math.atan2(self[1][0], self[0][0])))
+
+    # Quaternion of the rotation part, the scale being removed as mathutils does
+    def to_quaternion(self):
+        m = self.getRotation()
+        w = math.sqrt(max(0.0, 1.0 + m[0][0] + m[1][1] + m[2][2])) / 2.0
+        if w < 1e-6:
+            return Quaternion((0.0, 1.0, 0.0, 0.0))
+        return Quaternion((w, (m[2][1] - m[1][2]) / (4 * w), (m[0][2] - m[2][0]) / (4 * w), (m[1][0] - m[0][1]) / (4 * w)))
+
+    def copy(self):
+        return Matrix(self)
+
+    def to_translation(self):
+        return Vector((self[0][3], self[1][3], self[2][3]))
+
+    def getScale(self):
+        return Vector([math.sqrt(sum(self[row][column] ** 2 for row in range(3))) for column in range(3)])
+
+    # Rotation part with normalized columns
+    def getRotation(self):
+        scale = [value if value > 0 else 1.0 for value in self.getScale()]
+        return [[self[row][column] / scale[column] for column in range(3)] for row in range(3)]
+
+    # Translation, rotation and scale, without shear
+    def decompose(self):
+        return self.to_translation(), self.to_quaternion(), self.getScale()
+
+    @staticmethod
+    def Identity(size):
+        return Matrix([[1.0 if row == column else 0.0 for column in range(size)] for row in range(size)])
+
+class Euler(Vector):
+    "Stand-in for mathutils.Euler, XYZ order"
+
+    def to_matrix(self):
+        cx, cy, cz = math.cos(self.x), math.cos(self.y), math.cos(self.z)
+        sx, sy, sz = math.sin(self.x), math.sin(self.y), math.sin(self.z)
+        return Matrix([[cy * cz, sx * sy * cz - cx * sz, cx * sy * cz + sx * sz],
+                       [cy * sz, sx * sy * sz + cx * cz, cx * sy * sz - sx * cz],
+                       [-sy, sx * cy, cx * cy]])
+
+class Color(tuple):
+    "Stand-in for mathutils.Color"
+
+    def __new__(cls, values):
+        return tuple.__new__(cls, [float(value) for value in values])
+
+    r = property(lambda self: self[0])
+    g = property(lambda self: self[1])
+    b = property(lambda self: self[2])
+
+class Collection(list):
+    "Stand-in for bpy_prop_collection, with bulk attribute reads"
+
+    def foreach_get(self, attribute, values):
+        index = 0
+        for item in self:
+            value = getattr(item, attribute)
+            if isinstance(value, (tuple, list)):
+                for component in value:
+                    values[index] = component
+                    index += 1
+            else:
+                values[index] = value
+                index += 1
+
+class MeshVertex:
+    def __init__(self, co, normal):
+        self.co = Vector(co)
+        self.normal = Vector(normal)
+
+class MeshTessFace:
+    def __init__(self, vertices, materialIndex, useSmooth, normal):
+        self.vertices = tuple(vertices)
+        self.material_index = materialIndex
+        self.use_smooth = useSmooth
+        self.normal = Vector(normal)
+
+    # Always 4 indices, the last one being 0 for triangles
+    @property
+    def vertices_raw(self):
+        return self.vertices if len(self.vertices) == 4 else self.vertices + (0,)
+
+class MeshTextureFace:
+    def __init__(self, uvs):
+        self.uv1, self.uv2, self.uv3, self.uv4 = [Vector(uv) for uv in uvs]
+
+    @property
+    def uv_raw(self):
+        return self.uv1 + self.uv2 + self.uv3 + self.uv4
+
+class MeshTextureFaceLayer:
+    def __init__(self, data):
+        self.data = Collection(data)
+
+class MeshTextureFaceLayers(list):
+    @property
+    def active(self):
+        return self[0] if len(self) > 0 else None
+
+class Mesh:
+    "Stand-in for bpy.types.Mesh with its tessellated faces"
+
+    def __init__(self, name, vertices, faces, materials, uvs=None):
+        self.name = name
+        self.vertices = Collection(vertices)
+        self.tessfaces = Collection(faces)
+        self.materials = list(materials)
+        self.users = 0
+        self.uv_textures = ["UVMap"] if uvs is not None else []
+        self.tessface_uv_textures = MeshTextureFaceLayers([MeshTextureFaceLayer(uvs)] if uvs is not None else [])
+
+    def calc_tessface(self):
+        pass
+
+    # Polygons are only read for their size, the tessellated faces stand for them
+    @property
+    def polygons(self):
+        return Collection([types.SimpleNamespace(loop_total=len(face.vertices)) for face in self.tessfaces])
+
+class Texture:
+    def __init__(self, image):
+        self.image = image
+
+class TextureSlot:
+    def __init__(self, texture):
+        self.texture = texture
+        self.texture_coords = "UV"
+
+class Image:
+    def __init__(self, name, filepath):
+        self.name = name
+        self.filepath = filepath
+        self.filepath_raw = filepath
+        self.packed_file = None
+        self.library = None
+        self.size = (0, 0)
+
+class Material:
+    "Stand-in for bpy.types.Material with the properties read by the exporter"
+
+    def __init__(self, name, color=(0.8, 0.8, 0.8), image=None):
+        self.name = name
+        self.diffuse_color = Color(color)
+        self.specular_color = Color((1.0, 1.0, 1.0))
+        self.specular_intensity = 0.5
+        self.specular_shader = "COOKTORR"
+        self.specular_hardness = 50
+        self.emit = 0.0
+        self.use_transparency = False
+        self.alpha = 1.0
+        self.texture_slots = [TextureSlot(Texture(image))] if image is not None else []
+
+class Lamp:
+    def __init__(self, name, type):
+        self.name = name
+        self.type = type
+        self.color = Color((1.0, 1.0, 1.0))
+
+class Camera:
+    def __init__(self, name):
+        self.name = name
+        self.type = "PERSP"
+        self.lens = 35.0
+        self.ortho_scale = 7.0
+        self.clip_start = 0.1
+        self.clip_end = 100.0
+
+class Object:
+    "Stand-in for bpy.types.Object"
+
+    def __init__(self, name, type, data, location=(0.0, 0.0, 0.0), rotation=(0.0, 0.0, 0.0), scale=(1.0, 1.0, 1.0)):
+        self.name = name
+        self.type = type
+        self.data = data
+        self.parent = None
+        self.children = []
+        self.modifiers = []
+        # Mesh given by to_mesh when the modifiers are applied, the original geometry when None
+        self.evaluatedData = None
+        self.particle_systems = []
+        self.dupli_type = "NONE"
+        self.dupli_list = []
+        # Instances listed by dupli_list_create, as DupliObject items
+        self.duplis = []
+        self.animation_data = None
+        self.location = Vector(location)
+        self.rotation_euler = Euler(rotation)
+        self.scale = Vector(scale)
+        if hasattr(data, "users"):
+            data.users += 1
+
+    @property
+    def matrix_local(self):
+        rotation = self.rotation_euler.to_matrix()
+        return Matrix([[rotation[row][column] * self.scale[column] for column in range(3)] + [self.location[row]] for row in range(3)] + [[0.0, 0.0, 0.0, 1.0]])
+
+    @property
+    def matrix_world(self):
+        if self.parent is None:
+            return self.matrix_local
+        return self.parent.matrix_world * self.matrix_local
+
+    # Evaluated meshes share the geometry of the original or of evaluatedData, as modifiers are not simulated
+    def to_mesh(self, scene, apply_modifiers, settings):
+        data = self.evaluatedData if apply_modifiers and len(self.modifiers) > 0 and self.evaluatedData is not None else self.data
+        mesh = Mesh(self.data.name, [], [], self.data.materials)
+        mesh.vertices = data.vertices
+        mesh.tessfaces = data.tessfaces
+        mesh.uv_textures = data.uv_textures
+        mesh.tessface_uv_textures = data.tessface_uv_textures
+        sys.modules["bpy"].data.meshes.append(mesh)
+        return mesh
+
+    def dupli_list_create(self, scene, settings="PREVIEW"):
+        self.dupli_list = list(self.duplis)
+
+    def dupli_list_clear(self):
+        self.dupli_list = []
+
+class DupliObject:
+    "Stand-in for bpy.types.DupliObject: an instanced object and its world matrix"
+
+    def __init__(self, object, matrix):
+        self.object = object
+        self.matrix = matrix
+
+class ParticleSystem:
+    "Stand-in for bpy.types.ParticleSystem, with the settings read by the exporter"
+
+    def __init__(self, name, useRenderEmitter=True):
+        self.name = name
+        self.settings = types.SimpleNamespace(use_render_emitter=useRenderEmitter)
+
+class BlendDataMeshes(list):
+    def remove(self, mesh):
+        list.remove(self, mesh)
+
+class Scene:
+    def __init__(self, name="Scene", objects=()):
+        self.name = name
+        self.objects = list(objects)
+        self.frame_start = 1
+        self.frame_end = 1
+        self.frame_current = 1
+        self.camera = None
+        self.render = types.SimpleNamespace(fps=24, fps_base=1.0)
+        self.frameSetCount = 0
+
+    # Evaluates the actions of the objects at a frame
+    def frame_set(self, frame):
+        self.frame_current = frame
+        self.frameSetCount += 1
+        for object in self.objects:
+            if object.animation_data is not None and object.animation_data.action is not None:
+                object.animation_data.action.evaluate(object, frame)
+
+class Action:
+    "Stand-in for bpy.types.Action: a function setting the channels of an object at a frame"
+
+    def __init__(self, name, evaluate):
+        self.name = name
+        self.evaluate = evaluate
+
+class WindowManager:
+    def progress_begin(self, minimum, maximum):
+        pass
+
+    def progress_update(self, value):
+        pass
+
+    def progress_end(self):
+        pass
+
+    def fileselect_add(self, operator):
+        pass
+
+    def modal_handler_add(self, operator):
+        pass
+
+    def event_timer_add(self, time_step, window):
+        return types.SimpleNamespace(time_step=time_step)
+
+    def event_timer_remove(self, timer):
+        pass
+
+# Stand-in for bpy.props functions: the operator attribute simply holds the default value
+def createProperty(**options):
+    return options.get("default", "" if options.get("subtype") == "FILE_PATH" else None)
+
+# Creates the fake bpy and mathutils modules and registers them in sys.modules
+def install():
+    mathutils = types.ModuleType("mathutils")
+    mathutils.Vector = Vector
+    mathutils.Matrix = Matrix
+    mathutils.Euler = Euler
+    mathutils.Quaternion = Quaternion
+    mathutils.Color = Color
+    sys.modules["mathutils"] = mathutils
+
+    bpy = types.ModuleType("bpy")
+    bpy.types = types.SimpleNamespace(Operator=object, INFO_MT_file_export=[])
+    bpy.props = types.ModuleType("bpy.props")
+    for name in ("StringProperty", "BoolProperty", "IntProperty", "FloatProperty", "EnumProperty"):
+        setattr(bpy.props, name, createProperty)
+    bpy.props.__all__ = ["StringProperty", "BoolProperty", "IntProperty", "FloatProperty", "EnumProperty"]
+    bpy.data = types.SimpleNamespace(filepath="", meshes=BlendDataMeshes(), scenes=[], images=[])
+    bpy.context = types.SimpleNamespace(scene=Scene(), window_manager=WindowManager(), window=None)
+    bpy.app = types.SimpleNamespace(binary_path_python="", version=(2, 63, 0))
+    bpy.path = types.SimpleNamespace(abspath=lambda path, library=None: path[2:] if path.startswith("//") else path)
+    bpy.utils = types.SimpleNamespace(register_module=lambda name: None, unregister_module=lambda name: None)
+    sys.modules["bpy"] = bpy
+    sys.modules["bpy.props"] = bpy.props
+    return bpy
+
+# Creates a grid mesh of about vertexCount vertices, made of quads and triangles
+def createGridMesh(name, vertexCount, materials, hasUvs, generator):
+    side = max(2, int(math.sqrt(vertexCount)))
+    vertices = []
+    for row in range(side):
+        for column in range(side):
+            position = (toFloat32(column / float(side)), toFloat32(row / float(side)), toFloat32(generator.uniform(-0.01, 0.01)))
+            vertices.append(MeshVertex(position, (0.0, 0.0, 1.0)))
+    faces = []
+    uvs = []
+    for row in range(side - 1):
+        for column in range(side - 1):
+            a = row * side + column
+            quad = (a, a + 1, a + side + 1, a + side)
+            materialIndex = (row * len(materials)) // (side - 1)
+            useSmooth = (column % 2) == 0
+            if (row + column) % 3 == 0:
+                # Some quads are split in triangles
+                faces.append(MeshTessFace((quad[1], quad[2], quad[0]), materialIndex, useSmooth, (0.0, 0.0, 1.0)))
+                faces.append(MeshTessFace((quad[3], quad[0], quad[2]), materialIndex, useSmooth, (0.0, 0.0, 1.0)))
+                uvs.append(MeshTextureFace([vertices[index].co[:2] for index in (quad[1], quad[2], quad[0])] + [(0.0, 0.0)]))
+                uvs.append(MeshTextureFace([vertices[index].co[:2] for index in (quad[3], quad[0], quad[2])] + [(0.0, 0.0)]))
+            else:
+                faces.append(MeshTessFace(quad, materialIndex, useSmooth, (0.0, 0.0, 1.0)))
+                uvs.append(MeshTextureFace([vertices[index].co[:2] for index in quad]))
+    return Mesh(name, vertices, faces, materials, uvs if hasUvs else None)
+
+# Creates a scene: meshCount distinct meshes with slotCount material slots each, each mesh used by instanceCount linked duplicates
+def createScene(vertexCount=10000, materialCount=4, meshCount=4, instanceCount=1, hasUvs=True, seed=0, slotCount=3):
+    generator = random.Random(seed)
+    materials = [Material("Material.%03i" % index, (generator.random(), generator.random(), generator.random()),
+                          Image("Image.%03i" % index, "//textures/image%03i.png" % index) if hasUvs and index % 2 == 0 else None)
+                 for index in range(materialCount)]
+    objects = []
+    for meshIndex in range(meshCount):
+        meshMaterials = [materials[(meshIndex + index) % materialCount] for index in range(min(materialCount, slotCount))] if materialCount > 0 else []
+        mesh = createGridMesh("Mesh.%03i" % meshIndex, vertexCount, meshMaterials, hasUvs, generator)
+        for instanceIndex in range(instanceCount):
+            objects.append(Object("Object.%03i.%03i" % (meshIndex, instanceIndex), "MESH", mesh,
+                                  location=(meshIndex * 2.0, instanceIndex * 2.0, 0.0),
+                                  rotation=(0.0, 0.0, generator.uniform(0, math.pi)),
+                                  scale=(1.0, 1.0, 1.0)))
+    camera = Object("Camera", "CAMERA", Camera("Camera"), location=(0.0, -10.0, 5.0), rotation=(1.1, 0.0, 0.0))
+    sun = Object("Sun", "LAMP", Lamp("Sun", "SUN"), rotation=(0.5, 0.2, 0.0))
+    lamp = Object("Lamp", "LAMP", Lamp("Lamp", "POINT"), location=(4.0, 1.0, 6.0))
+    scene = Scene("Scene", objects + [camera, sun, lamp])
+    scene.camera = camera
+    return scene
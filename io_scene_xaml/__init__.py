@@ -11,166 +11,700 @@ bl_info = {
 
    
 import os
-import bpy
-from bpy.props import *
-from mathutils import *
+import re
+import time
+try:
+    import bpy
+except ImportError:
+    # The package is also imported outside of Blender, e.g. by the formatting worker processes
+    bpy = None
 
-import imp
-if "xaml" in locals():
-    imp.reload(xaml)	
-if "io_xaml_exporter" in locals():
-    imp.reload(io_xaml_exporter)
+# Reloads the modules of the addon when Blender reloads the scripts
+if bpy is not None:
+    try:
+        from importlib import reload
+    except ImportError:
+        # Python before 3.4
+        from imp import reload
+    for moduleName in ("xaml", "io_xaml_exporter", "cache", "formatting", "profiling", "textures", "tasks", "ordering",
+                 "decimation", "dictionaries", "compression", "animation", "instancing"):
+        if moduleName in globals():
+            reload(globals()[moduleName])
 
-class XamlExporter(bpy.types.Operator):
-    """Export to the Xaml model format (.xaml)"""
+if bpy is not None:
+    from bpy.props import *
+    from mathutils import *
 
-    bl_idname = "export.xaml"
-    bl_label = "Export Xaml"
+    # Events passed to the interface during a modal export, only moving the view
+    NavigationEvents = {"MOUSEMOVE", "INBETWEEN_MOUSEMOVE", "MIDDLEMOUSE", "WHEELUPMOUSE", "WHEELDOWNMOUSE", "WHEELINMOUSE", "WHEELOUTMOUSE",
+                        "TRACKPADPAN", "TRACKPADZOOM", "MOUSEROTATE", "NDOF_MOTION", "WINDOW_DEACTIVATE", "TIMER_REPORT"}
+
+    class XamlExporter(bpy.types.Operator):
+        """Export to the Xaml model format (.xaml)"""
+
+        bl_idname = "export.xaml"
+        bl_label = "Export Xaml"
     
-    #File path property field
-    filepath = StringProperty(subtype='FILE_PATH')
+        #File path property field
+        filepath = StringProperty(subtype='FILE_PATH')
     
-    # General options
-    Comprehensive = BoolProperty(name="Comprehensice method", description="Loop on face instead of vertices (vertices dulication, smooth management ect...).", default=True)
-    ApplyModifiers = BoolProperty(name="Apply Modifiers", description="Apply object modifiers before export.", default=True)
-    AddDefaultNamespaces = BoolProperty(name="Add default namespaces", description="Determine whether default namespaces are added in root node.", default=True)
-    ExportTextures = BoolProperty(name="Export Textures", description="Reference external image files to be used by the model.", default=True)
-    IsInDebugmode = BoolProperty(name="Debug mode", description="Run the exporter in debug mode.  Check the console for output.", default=False)
-
-    # custom init methods
-    def execute(self, context):
-        if not self.filepath.lower().endswith(".xaml"):
-            self.filepath += ".xaml"
-        
-        from . import xaml
-        from . import io_xaml_exporter            
-
-        # Initialize exporter
-        io_xaml_exporter.Comprehensive = self.Comprehensive
-        io_xaml_exporter.ApplyModifiers = self.ApplyModifiers
-        io_xaml_exporter.AddDefaultNamespaces = self.AddDefaultNamespaces
-        io_xaml_exporter.ExportTextures = self.ExportTextures
-        io_xaml_exporter.IsInDebugmode = self.IsInDebugmode
-
-        # Initialize writer
-        writer = xaml.StreamWriter()
-        writer.openTag("Viewport3D")
-
-        # Default namespaces
-        if self.AddDefaultNamespaces:
-            writer.newLine()
-            writer.addProperty("xmlns", "http://schemas.microsoft.com/winfx/2006/xaml/presentation")
-            writer.newLine()
-            writer.addProperty("xmlns:x", "http://schemas.microsoft.com/winfx/2006/xaml")
-            print("Default namespaces added")
+        # General options
+        Comprehensive = BoolProperty(name="Comprehensice method", description="Loop on face instead of vertices (vertices dulication, smooth management ect...).", default=True)
+        ApplyModifiers = BoolProperty(name="Apply Modifiers", description="Apply object modifiers before export.", default=True)
+        AddDefaultNamespaces = BoolProperty(name="Add default namespaces", description="Determine whether default namespaces are added in root node.", default=True)
+        ExportTextures = BoolProperty(name="Export Textures", description="Copy the images used by the materials next to the exported file.", default=True)
+        MaxTextureSize = IntProperty(name="Max texture size", description="Scale down larger exported textures to this width or height in pixels (0 keeps the original size).", default=0, min=0)
+        TextureFormat = EnumProperty(name="Texture format", description="File format of the exported textures.", default="KEEP",
+                                     items=(("KEEP", "Keep", "Keep the format of the images"), ("PNG", "PNG", "Convert the textures to PNG"), ("JPEG", "JPEG", "Convert the textures to JPEG")))
+        WeldVertices = BoolProperty(name="Weld vertices", description="Share the vertices having the same position, normal and uv (comprehensive method only).", default=False)
+        WeldEpsilon = FloatProperty(name="Weld epsilon", description="Distance under which vertex attributes are considered identical when welding.", default=0.0001, min=0.000001, precision=6)
+        OptimizeVertexCache = BoolProperty(name="Optimize vertex cache", description="Reorder triangles and vertices for the vertex cache of the graphics card (slower export, faster rendering).", default=False)
+        ElideAttributes = BoolProperty(name="Omit redundant attributes", description="Omit the normals of flat faces, computed by WPF, and the texture coordinates of materials without image (disable to write them all).", default=False)
+        MaxObjectTriangles = IntProperty(name="Max triangles per object", description="Decimate the meshes having more triangles (0 for no limit).", default=0, min=0)
+        MaxSceneTriangles = IntProperty(name="Max triangles in scene", description="Decimate all the meshes in proportion to fit this budget (0 for no limit).", default=0, min=0)
+        MaxGeometryVertices = IntProperty(name="Max vertices per geometry", description="Split larger geometries in several blocks (comprehensive method only, 0 for no limit).", default=1000000, min=0)
+        SplitFiles = BoolProperty(name="Split in resource dictionaries", description="Write the materials and the geometries of each mesh in separate ResourceDictionary files, with a manifest (comprehensive method only).", default=False)
+        Compression = EnumProperty(name="Compression", description="Compress the exported file while it is written.", default="NONE",
+                                   items=(("NONE", "None", "Write a plain xaml file"), ("GZIP", "Gzip", "Write a gzip compressed xaml file (.xaml.gz)"),
+                                          ("ZIP", "Zip package", "Write a zip package holding the xaml file, its textures and resource dictionaries")))
+        CompressionLevel = IntProperty(name="Compression level", description="Deflate level, from fastest (1) to smallest (9).", default=6, min=1, max=9)
+        UseCache = BoolProperty(name="Use fragment cache", description="Reuse the mesh fragments of the previous export when the meshes did not change.", default=False)
+        CacheSize = IntProperty(name="Cache size (MB)", description="Maximum size of the fragment cache on disk, and of the fragments shared in memory by the documents of one export.", default=512, min=1)
+        FormatWorkers = IntProperty(name="Formatting workers", description="Number of worker processes formatting large attribute lists (1 formats in the main process).", default=1, min=1, max=64)
+        FormatChunkSize = IntProperty(name="Formatting chunk size", description="Minimum number of items per chunk sent to a formatting worker.", default=50000, min=1000)
+        PositionPrecision = IntProperty(name="Position decimals", description="Number of decimals written for vertex positions.", default=6, min=0, max=7)
+        NormalPrecision = IntProperty(name="Normal decimals", description="Number of decimals written for vertex normals.", default=6, min=0, max=7)
+        UVPrecision = IntProperty(name="UV decimals", description="Number of decimals written for texture coordinates.", default=6, min=0, max=7)
+        TransformPrecision = IntProperty(name="Transform decimals", description="Number of decimals written for transforms, cameras and lights.", default=6, min=0, max=7)
+        CompactNumbers = BoolProperty(name="Compact numbers", description="Remove the trailing zeros of the numbers written: a smaller file, formatted about twice slower.", default=False)
+        IsInDebugmode = BoolProperty(name="Debug mode", description="Run the exporter in debug mode.  Check the console for output.", default=False)
+        WriteProfile = BoolProperty(name="Write profile", description="Write the timings of the export next to the exported file (.profile.json).", default=False)
+        ExportAnimation = BoolProperty(name="Export animation", description="Export the transforms of the animated objects (comprehensive method) and of the camera over the frame range as Storyboard keyframes.", default=False)
+        AnimationTolerance = FloatProperty(name="Animation tolerance", description="Keyframes interpolated within this error (scene units, degrees) are dropped.", default=0.001, min=0.0, precision=4)
+        ExportInstances = BoolProperty(name="Export instances", description="Export the meshes instanced by particle systems and duplis, their geometry being written once (comprehensive method).", default=True)
+        MaxInstances = IntProperty(name="Max instances", description="Keep a random subsample of the instances above this number (0 for no limit).", default=0, min=0)
+        InstanceSeed = IntProperty(name="Instance seed", description="Seed of the random subsample of the instances.", default=0, min=0)
+        ExportCameras = EnumProperty(name="Cameras", description="Cameras the scenes are seen from, one document being written per camera.", default="ACTIVE",
+                                     items=(("ACTIVE", "Active camera", "Write one document seen from the active camera"), ("ALL", "All cameras", "Write one document per camera")))
+        ExportScenes = EnumProperty(name="Scenes", description="Scenes exported, one document being written per scene.", default="CURRENT",
+                                    items=(("CURRENT", "Current scene", "Write the current scene only"), ("ALL", "All scenes", "Write one document per scene")))
+        RunModal = BoolProperty(name="Non-blocking export", description="Export in small steps while the interface stays responsive, Esc cancels the export.", default=False)
+
+        # custom init methods
+        def execute(self, context):
+            if not self.filepath.lower().endswith(".xaml"):
+                self.filepath += ".xaml"
+            from . import tasks
+
+            self.task = tasks.SteppedTask(self.iterateExport(context))
+            if self.RunModal and context.window is not None:
+                # The export runs a few steps on each timer event, the user interface staying responsive
+                WindowManager = context.window_manager
+                self.timer = WindowManager.event_timer_add(0.05, context.window)
+                WindowManager.modal_handler_add(self)
+                WindowManager.progress_begin(0, 100)
+                return {"RUNNING_MODAL"}
+            self.task.run()
+            return {"FINISHED"}
+
+        def modal(self, context, event):
+            from . import io_xaml_exporter
+            if event.type == "ESC":
+                self.task.cancel()
+                self.endModal(context)
+                return {"CANCELLED"}
+            if event.type == "TIMER":
+                # The progress report and the timer end once the export finished or failed
+                isEnded = True
+                io_xaml_exporter.Profiler.resume()
+                try:
+                    if self.task.run(0.1):
+                        return {"FINISHED"}
+                    isEnded = False
+                finally:
+                    # The time spent in the interface until the next step is not charged to the open spans
+                    io_xaml_exporter.Profiler.pause()
+                    if isEnded:
+                        self.endModal(context)
+                context.window_manager.progress_update(100 * self.task.getRatio())
+                return {"PASS_THROUGH"}
+            # The view can be moved while exporting, other events are blocked so the exported data is not edited
+            if event.type in NavigationEvents:
+                return {"PASS_THROUGH"}
+            return {"RUNNING_MODAL"}
+
+        # Ends the progress report and the timer of a modal export
+        def endModal(self, context):
+            WindowManager = context.window_manager
+            WindowManager.event_timer_remove(self.timer)
+            WindowManager.progress_end()
+
+        # Exports the documents in small steps (a material, a geometry chunk, a light...), yielding the number of objects done and to do.
+        # The fragments formatted for a document are reused by the next ones, so that each is computed once.
+        def iterateExport(self, context):
+            from . import io_xaml_exporter            
+
+            # Initialize exporter
+            io_xaml_exporter.Comprehensive = self.Comprehensive
+            io_xaml_exporter.ApplyModifiers = self.ApplyModifiers
+            io_xaml_exporter.AddDefaultNamespaces = self.AddDefaultNamespaces
+            io_xaml_exporter.ExportTextures = self.ExportTextures
+            io_xaml_exporter.IsInDebugmode = self.IsInDebugmode
+            io_xaml_exporter.WeldVertices = self.WeldVertices
+            io_xaml_exporter.WeldEpsilon = self.WeldEpsilon
+            io_xaml_exporter.MaxGeometryVertices = self.MaxGeometryVertices
+            io_xaml_exporter.OptimizeVertexCache = self.OptimizeVertexCache
+            io_xaml_exporter.ElideAttributes = self.ElideAttributes
+            io_xaml_exporter.SplitFiles = self.SplitFiles and self.Comprehensive
+            io_xaml_exporter.Cache = None
+            if self.UseCache:
+                from . import cache
+                io_xaml_exporter.Cache = cache.FragmentCache(os.path.splitext(self.filepath)[0] + "_cache", self.CacheSize * 1024 * 1024)
+            documents = self.getDocuments(context)
+            io_xaml_exporter.SharedFragments = None
+            if len(documents) > 1:
+                from . import cache
+                io_xaml_exporter.SharedFragments = cache.MemoryFragmentCache(self.CacheSize * 1024 * 1024)
+            self.formatter = None
+            if self.FormatWorkers > 1:
+                import multiprocessing
+                from . import formatting
+                # Workers must run Blender's python interpreter, not the Blender executable
+                if bpy.app.binary_path_python:
+                    multiprocessing.set_executable(bpy.app.binary_path_python)
+                self.formatter = formatting.ParallelFormatter(self.FormatWorkers, self.FormatChunkSize)
+            try:
+                start = time.time()
+                for index, (scene, camera, filePath) in enumerate(documents):
+                    for done, total in self.iterateDocument(scene, camera, filePath):
+                        yield index * total + done, len(documents) * total
+                if len(documents) > 1:
+                    sharedFragments = io_xaml_exporter.SharedFragments
+                    print("Documents: %i written in %.3fs, shared fragments: %i reused, %i formatted, %i dropped" % (len(documents), time.time() - start, sharedFragments.hits, sharedFragments.misses, sharedFragments.evicted))
+            finally:
+                if self.formatter is not None:
+                    self.formatter.close()
+                io_xaml_exporter.SharedFragments = None
+
+        # Gets the documents to export as (scene, camera, file path): the current scene or all of them, seen from their
+        # active camera or from each of their cameras. Documents are named after their scene and camera when there are several.
+        def getDocuments(self, context):
+            scenes = list(bpy.data.scenes) if self.ExportScenes == "ALL" else [context.scene]
+            documents = []
+            for scene in scenes:
+                cameras = [scene.camera]
+                if self.ExportCameras == "ALL":
+                    cameras = [item for item in scene.objects if item.type == "CAMERA"] or [scene.camera]
+                for camera in cameras:
+                    documents.append((scene, camera))
+            if len(documents) == 1:
+                return [(documents[0][0], documents[0][1], self.filepath)]
+            basePath = os.path.splitext(self.filepath)[0]
+            namedDocuments = []
+            usedPaths = set()
+            for scene, camera in documents:
+                names = ([scene.name] if self.ExportScenes == "ALL" else []) + ([camera.name] if self.ExportCameras == "ALL" and camera is not None else [])
+                name = "_".join([re.sub(r"[^\w\-.]", "_", name) for name in names])
+                # Names made the same by the replaced characters (or by the case, on Windows) get a numeric suffix, not to overwrite each other
+                filePath = "%s_%s.xaml" % (basePath, name)
+                suffix = 1
+                while filePath.lower() in usedPaths:
+                    suffix += 1
+                    filePath = "%s_%s_%i.xaml" % (basePath, name, suffix)
+                usedPaths.add(filePath.lower())
+                namedDocuments.append((scene, camera, filePath))
+            return namedDocuments
+
+        # Exports a scene seen from a camera (None for the first one) in small steps, yielding the number of objects done and to do
+        def iterateDocument(self, scene, camera, filePath):
+            from . import xaml
+            from . import io_xaml_exporter
+            from . import profiling
+
+            self.scene = scene
+            io_xaml_exporter.DecimateRatio = 1.0
+            io_xaml_exporter.AnimatedNames = {}
+            profiler = io_xaml_exporter.Profiler = profiling.Profiler(self.IsInDebugmode)
+            log = profiler.log
+
+            # Initialize writer, the document is streamed to disk while being built
+            if self.Compression == "NONE":
+                writer = xaml.FileStreamWriter(filePath)
+            else:
+                # The document is compressed in a background thread while being formatted
+                from . import compression
+                writer = xaml.CompressedStreamWriter(os.path.splitext(filePath)[0] + compression.FormatExtensions[self.Compression],
+                                                     self.Compression, os.path.basename(filePath), self.CompressionLevel)
+            profiler.writer = writer
+            writer.precisions = {"position": self.PositionPrecision, "normal": self.NormalPrecision, "uv": self.UVPrecision, "transform": self.TransformPrecision}
+            writer.isCompact = self.CompactNumbers
+            writer.formatter = self.formatter
+            self.dictionarySet = None
+            isCompleted = False
+            try:
+                writer.openTag("Viewport3D")
+
+                # Default namespaces
+                if self.AddDefaultNamespaces:
+                    writer.newLine()
+                    writer.addProperty("xmlns", "http://schemas.microsoft.com/winfx/2006/xaml/presentation")
+                    writer.newLine()
+                    writer.addProperty("xmlns:x", "http://schemas.microsoft.com/winfx/2006/xaml")
+                    log("Default namespaces added")
         
-        print("\n**Gathering scene...**")
-        # Gather Blender cameras
-        print("\n- Gathering cameras")
-        cameraList = [object for object in context.scene.objects
-                                if object.type in ("CAMERA")
-                                and object.parent is None]
-        print("  -> %i cameras found" % len(cameraList))
+                log("\n**Gathering scene...**")
+                with profiler.span("gather"):
+                    # Index the objects by type with their hierarchy in a single pass
+                    objectsByType, rootList, childrenByName = io_xaml_exporter.indexSceneObjects(scene.objects)
+                    # Meshes only rendered through their instances are left out when the instances are exported
+                    skippedNames = self.skippedNames = set()
+                    if self.Comprehensive and self.ExportInstances:
+                        from . import instancing
+                        skippedNames = self.skippedNames = instancing.getInstancedMeshNames(scene.objects)
+                    # Transparent meshes are written after all the opaque ones, in a second pass re-opening the groups holding them
+                    isTransparent = lambda item: item.type == "MESH" and item.name not in skippedNames and io_xaml_exporter.meshHasTransparency(item)
+                    groupNames = io_xaml_exporter.getGroupNames(rootList, childrenByName, lambda item: (item.type == "LAMP" or (item.type == "MESH" and item.name not in skippedNames)) and not isTransparent(item))
+                    transparentGroupNames = io_xaml_exporter.getGroupNames(rootList, childrenByName, isTransparent)
+
+                    # Gather Blender cameras, the camera of the document first
+                    log("\n- Gathering cameras")
+                    cameraList = objectsByType["CAMERA"]
+                    if camera in cameraList:
+                        cameraList.remove(camera)
+                        cameraList.insert(0, camera)
+                    log("  -> %i cameras found" % len(cameraList))
                                 
-        # Gather Blender meshes
-        print("\n- Gathering meshes")
-        meshList = [object for object in context.scene.objects
-                                if object.type in ("MESH")]
-        print("  -> %i meshes found" % len(meshList))
+                    # Gather Blender meshes
+                    log("\n- Gathering meshes")
+                    meshList = [item for item in objectsByType["MESH"] if item.name not in skippedNames]
+                    log("  -> %i meshes found, %i only rendered through their instances" % (len(meshList), len(skippedNames)))
+
+                    # Gather the meshes instanced by particle systems and duplis, each source being written once
+                    instanceSets = []
+                    instanceSources = []
+                    if self.Comprehensive and self.ExportInstances:
+                        log("\n- Gathering instances")
+                        emitters = [item for item in scene.objects if instancing.isEmitter(item)]
+                        instanceSets, foundInstanceCount = instancing.gatherInstances(scene, emitters, self.MaxInstances, self.InstanceSeed)
+                        instanceSources = instancing.getSources(instanceSets)
+                        instanceCount = sum([len(instances) for emitter, instances in instanceSets])
+                        log("  -> %i of %i instances kept, %i emitters, %i sources" % (instanceCount, foundInstanceCount, len(instanceSets), len(instanceSources)))
         
-        # Gather mesh materials
-        # Select distinct materials -> to be optimized
-        print("\n- Gathering materials")
-        materialNameList = []
-        materialList = []
-        for object in meshList:
-            print("tesselating mesh: %s" % object.name)
-            object.data.calc_tessface()            
-
-            print("scanning mesh: %s" % object.name)
-            for material in object.data.materials:
-                if material is not None and material.name not in materialNameList:
-                    materialNameList.append(material.name)
-                    materialList.append(material)
-        materialNameList = None
-        print("  -> %i materials found" % len(materialList))
+                    # Gather mesh materials from the material slots, meshes are tessellated one at a time when written
+                    log("\n- Gathering materials")
+                    materialNames = set()
+                    materialList = []
+                    for object in meshList + instanceSources:
+                        log("scanning mesh: %s" % object.name)
+                        for material in object.data.materials:
+                            if material is not None and material.name not in materialNames:
+                                materialNames.add(material.name)
+                                materialList.append(material)
+                    log("  -> %i materials found" % len(materialList))
      
-        # Gather Blender lights
-        print("\n- Gathering lights")
-        lightList = [object for object in context.scene.objects
-                                if object.type in ("LAMP")
-                                and object.parent is None]
-        print("  -> %i lights found" % len(lightList))
+                    # Gather Blender lights
+                    log("\n- Gathering lights")
+                    lightList = objectsByType["LAMP"]
+                    log("  -> %i lights found" % len(lightList))
+                    log("  -> %i roots, %i groups, %i groups of transparent meshes" % (len(rootList), len(groupNames), len(transparentGroupNames)))
         
-        # Write Xaml Resources
-        io_xaml_exporter.beginResources(writer)
-        for material in materialList:
-            io_xaml_exporter.writeMaterial(writer, material)
-        io_xaml_exporter.endResources(writer)
+                    # Gather mesh data shared by linked duplicates
+                    sharedMeshDataList = []
+                    if self.Comprehensive:
+                        log("\n- Gathering shared meshes")
+                        sharedMeshDataList = io_xaml_exporter.gatherSharedMeshData(meshList)
+                        log("  -> %i shared meshes found" % len(sharedMeshDataList))
+                    sharedMeshNames = set([meshData.name for meshData in sharedMeshDataList])
+
+                    # Resource dictionaries: the materials, each shared mesh data and each other mesh object
+                    dictionarySet = None
+                    if io_xaml_exporter.SplitFiles:
+                        from . import dictionaries
+                        dictionarySet = self.dictionarySet = dictionaries.DictionarySet(filePath, writer)
+                        dictionarySet.add("materials", "materials")
+                        for meshData in sharedMeshDataList:
+                            dictionarySet.add(("mesh", meshData.name), "mesh_" + meshData.name)
+                        sharedMeshUsers = {}
+                        for item in meshList:
+                            if item.data.name in sharedMeshNames and io_xaml_exporter.isMeshDataShareable(item):
+                                sharedMeshUsers.setdefault(item.data.name, []).append(item)
+                            else:
+                                dictionarySet.add(("object", item.name), item.name)
+                        for source in instanceSources:
+                            dictionarySet.add(("instance", source.name), "instance_" + source.name)
+
+                    # Animated objects: meshes and parents of groups with an action of their own, and the camera
+                    animatedObjects = []
+                    # A single frame moves nothing, its storyboard would last 0s and be repeated forever
+                    if self.ExportAnimation and scene.frame_end <= scene.frame_start:
+                        print("Animation: a single frame in the range, not exported")
+                    elif self.ExportAnimation:
+                        from . import animation
+                        usedNames = set()
+                        if self.Comprehensive:
+                            groupObjects = [childrenByName[name][0].parent for name in groupNames | transparentGroupNames]
+                            animatedObjects = sorted(set([item for item in meshList + groupObjects if animation.hasAction(item)]), key=lambda item: item.name)
+                        if len(cameraList) > 0 and animation.isAnimatedInWorld(cameraList[0]) and cameraList[0] not in animatedObjects:
+                            animatedObjects.append(cameraList[0])
+                        for item in animatedObjects:
+                            io_xaml_exporter.AnimatedNames[item.name] = animation.formatTargetName("A", item.name, usedNames)
+                        log("  -> %i animated objects" % len(animatedObjects))
+                    frames = range(scene.frame_start, scene.frame_end + 1) if len(animatedObjects) > 0 else []
+
+                # Share of the triangles kept to fit the scene budget, counted on the meshes as they are exported
+                self.sceneDecimateRatio = 1.0
+                if self.MaxSceneTriangles > 0:
+                    with profiler.span("count"):
+                        sceneTriangleCount = sum([self.countExportedTriangles(item) for item in meshList])
+                    if sceneTriangleCount > self.MaxSceneTriangles:
+                        self.sceneDecimateRatio = float(self.MaxSceneTriangles) / sceneTriangleCount
+                    log("  -> %i triangles in scene, %.1f%% kept" % (sceneTriangleCount, 100 * self.sceneDecimateRatio))
+                done = 0
+                total = len(materialList) + len(sharedMeshDataList) + min(1, len(cameraList)) + len(meshList) + len(lightList) + len(frames) + len(instanceSources) + len(instanceSets)
+                yield done, total
+        
+                # Copy the textures next to the exported file, the copies run while the geometry is written
+                io_xaml_exporter.Textures = None
+                if self.ExportTextures:
+                    from . import textures
+                    with profiler.span("textures"):
+                        images = []
+                        for material in materialList:
+                            image = io_xaml_exporter.getMaterialImage(material)
+                            if image is not None and image not in images:
+                                images.append(image)
+                        io_xaml_exporter.Textures = textures.TextureExporter(os.path.dirname(os.path.abspath(filePath)), os.path.splitext(self.filepath)[0] + ".textures.json",
+                                                                             self.MaxTextureSize, self.TextureFormat)
+                        io_xaml_exporter.Textures.prepare(bpy, images)
+                    yield done, total
+
+                # Write Xaml Resources, in the root scene or in dictionaries it references
+                io_xaml_exporter.beginResources(writer)
+                resourceWriter = writer
+                if dictionarySet is not None:
+                    dictionarySet.writeMergedDictionaries(writer)
+                    resourceWriter = dictionarySet.begin("materials")
+                for material in materialList:
+                    with profiler.span(material.name, "material"):
+                        io_xaml_exporter.writeSharedFragment(resourceWriter, ("material", material.name), lambda fragmentWriter: io_xaml_exporter.writeMaterial(fragmentWriter, material))
+                    done += 1
+                    yield done, total
+                if dictionarySet is not None:
+                    dictionarySet.end("materials", resourceWriter, "materials")
+                for meshData in sharedMeshDataList:
+                    with profiler.span(meshData.name, "object"):
+                        with profiler.span("tessellate"):
+                            meshData.calc_tessface()
+                        io_xaml_exporter.DecimateRatio = self.getDecimateRatio(meshData)
+                        if dictionarySet is not None:
+                            resourceWriter = dictionarySet.begin(("mesh", meshData.name))
+                        for step in io_xaml_exporter.iterateSharedMeshGeometry(resourceWriter, meshData):
+                            yield done, total
+                        if dictionarySet is not None:
+                            bounds = None
+                            meshBounds = io_xaml_exporter.getMeshBounds(meshData)
+                            for item in sharedMeshUsers[meshData.name]:
+                                bounds = io_xaml_exporter.mergeBounds(bounds, io_xaml_exporter.transformBounds(meshBounds, item.matrix_world))
+                            dictionarySet.end(("mesh", meshData.name), resourceWriter, "geometry", bounds)
+                    done += 1
+                    yield done, total
+                for source in instanceSources:
+                    with profiler.span(source.name, "object"):
+                        for step in self.iterateInstanceResource(writer, source, instanceSets):
+                            yield done, total
+                    done += 1
+                    yield done, total
+                io_xaml_exporter.endResources(writer)
        
-        # Write Xaml Camera
-        if len(cameraList) > 0:
-            io_xaml_exporter.beginCamera(writer)
-            #for item in cameraList:
-            #   io_xaml_exporter.writeCamera(writer, item)
-            io_xaml_exporter.writeCamera(writer, cameraList[0])
-            io_xaml_exporter.endCamera(writer)
+                # Write Xaml Camera
+                if len(cameraList) > 0:
+                    io_xaml_exporter.beginCamera(writer)
+                    #for item in cameraList:
+                    #   io_xaml_exporter.writeCamera(writer, item)
+                    with profiler.span(cameraList[0].name, "object"):
+                        io_xaml_exporter.writeCamera(writer, cameraList[0])
+                    io_xaml_exporter.endCamera(writer)
+                    done += 1
+                    yield done, total
         
-        # Beginning of Viewport children
-        io_xaml_exporter.beginChildren(writer)
+                # Beginning of Viewport children
+                io_xaml_exporter.beginChildren(writer)
         
-        # Write Xaml meshes
-        if self.Comprehensive:
-            meshListTransparent = []
-            for item in meshList:
-                if io_xaml_exporter.meshHasTransparency(item):
-                    meshListTransparent.append(item)
+                # Write Xaml meshes and lights, nested in the ModelVisual3D of their parent, the transparent meshes last
+                if self.Comprehensive:
+                    for isObjectDone in self.iterateNodes(writer, rootList, childrenByName, groupNames, sharedMeshNames, False):
+                        if isObjectDone:
+                            done += 1
+                        yield done, total
+                    for emitter, instances in instanceSets:
+                        with profiler.span(emitter.name, "instances"):
+                            for step in io_xaml_exporter.iterateInstances(writer, emitter, instances):
+                                yield done, total
+                        done += 1
+                        yield done, total
+                    for isObjectDone in self.iterateNodes(writer, rootList, childrenByName, transparentGroupNames, sharedMeshNames, True):
+                        if isObjectDone:
+                            done += 1
+                        yield done, total
                 else:
-                    print("exporting mesh %s" % item.name)
-                    io_xaml_exporter.writeMeshComprehensive(writer, item, item.to_mesh(bpy.context.scene, self.ApplyModifiers, "PREVIEW"))
-            for item in meshListTransparent:
-                print("exporting mesh %s" % item.name)
-                io_xaml_exporter.writeMeshComprehensive(writer, item, item.to_mesh(bpy.context.scene, self.ApplyModifiers, "PREVIEW"))
-            meshListTransparent = None
-        else:
-            for item in meshList:
-                print("exporting mesh %s" % item.name)
-                io_xaml_exporter.writeMeshOptimized(writer, item.to_mesh(bpy.context.scene, self.ApplyModifiers, "PREVIEW"))
-            
-        # Write Xaml lights
-        for light in lightList:
-            io_xaml_exporter.writeLight(writer, light)
+                    # The minimalist method writes no transform, the objects stay flat
+                    for item in meshList:
+                        log("exporting mesh %s" % item.name)
+                        with profiler.span(item.name, "object"):
+                            for step in self.iterateEvaluatedMesh(writer, item, None, io_xaml_exporter.writeMeshOptimized):
+                                yield done, total
+                        done += 1
+                        yield done, total
+                    for light in lightList:
+                        with profiler.span(light.name, "object"):
+                            io_xaml_exporter.writeLight(writer, light)
+                        done += 1
+                        yield done, total
         
-        print("\n** Finalizing exported file **")
+                log("\n** Finalizing exported file **")
         
-        # End of Viewport children
-        io_xaml_exporter.endChildren(writer)
-
-        # Write the file
-        writer.closeAllTags()
-        writer.commit(self.filepath)
-        print("Exportation completed successfuly")
-        return {"FINISHED"}
+                # End of Viewport children
+                io_xaml_exporter.endChildren(writer)
+
+                # Write the animations, each frame being evaluated once for all the animated objects
+                if len(frames) > 0:
+                    samples = {}
+                    camera = cameraList[0] if len(cameraList) > 0 else None
+                    getValues = lambda item: io_xaml_exporter.getTransformValues(item) + (io_xaml_exporter.getCameraValues(item) if item is camera else [])
+                    with profiler.span("sample"):
+                        for step in animation.iterateSamples(scene, animatedObjects, frames, getValues, samples):
+                            done += 1
+                            yield done, total
+                    frameSeconds = float(scene.render.fps_base) / scene.render.fps
+                    times = [(frame - frames[0]) * frameSeconds for frame in frames]
+                    sampledCount = writtenCount = 0
+                    with profiler.span("animation"):
+                        io_xaml_exporter.beginStoryboard(writer, times[-1])
+                        for item in animatedObjects:
+                            values = samples.pop(item.name)
+                            namePrefixes = ([""] if item.type == "MESH" else []) + (["G"] if item.name in groupNames else []) + (["GT"] if item.name in transparentGroupNames else [])
+                            trackSets = [(io_xaml_exporter.TransformTracks, namePrefixes)] + ([(io_xaml_exporter.CameraTracks, [""])] if item is camera else [])
+                            for tracks, namePrefixes in trackSets:
+                                counts = io_xaml_exporter.writeAnimation(writer, item, tracks, namePrefixes, values, times, self.AnimationTolerance)
+                                sampledCount += counts[0]
+                                writtenCount += counts[1]
+                        io_xaml_exporter.endStoryboard(writer)
+                    print("Animation: %i objects over %i frames, %i keyframes sampled, %i written after reduction" % (len(animatedObjects), len(frames), sampledCount, writtenCount))
+
+                # Wait for the files written next to the document, a zip package holding them too
+                writer.closeAllTags()
+                textureExporter = io_xaml_exporter.Textures
+                if textureExporter is not None:
+                    with profiler.span("textures"):
+                        textureExporter.finish()
+                if dictionarySet is not None:
+                    with profiler.span("dictionaries"):
+                        entries = dictionarySet.finish()
+                if self.Compression == "ZIP":
+                    for path, name in (textureExporter.getFiles() if textureExporter is not None else []) + (dictionarySet.getFiles() if dictionarySet is not None else []):
+                        writer.addPackageFile(path, name)
+
+                # Write the file
+                with profiler.span("commit"):
+                    writer.commit(filePath)
+                isCompleted = True
+                if textureExporter is not None:
+                    print("Textures: %i copied, %i unchanged, %i duplicates, %i missing" % (textureExporter.copied, textureExporter.skipped, textureExporter.deduplicated, textureExporter.missing))
+                if dictionarySet is not None:
+                    print("Resource dictionaries: %i files, %i bytes, listed in %s" % (len(entries), sum([entry["bytes"] for entry in entries]), dictionarySet.manifestPath))
+                if len(instanceSets) > 0:
+                    print("Instances: %i of %i exported from %i emitters, %i instanced objects written once" % (instanceCount, foundInstanceCount, len(instanceSets), len(instanceSources)))
+                if self.Compression != "NONE":
+                    rawSize, compressedSize, compressSeconds, waitSeconds = writer.getCompressionStats()
+                    print("Compression: %i bytes -> %i bytes (ratio %.1f), %.3fs compressing in background, %.3fs of export time spent on it" % (rawSize, compressedSize, float(rawSize) / max(1, compressedSize), compressSeconds, waitSeconds))
+                if io_xaml_exporter.Cache is not None:
+                    print("Fragment cache: %i reused, %i written, %i evicted" % (io_xaml_exporter.Cache.hits, io_xaml_exporter.Cache.misses, io_xaml_exporter.Cache.evict()))
+                profiler.finish()
+                print(profiler.getSummary())
+                if self.WeldVertices:
+                    totals = profiler.root.getTotals()
+                    if totals.get("unwelded_vertices", 0) > 0:
+                        print("Welding: %i vertices -> %i vertices" % (totals["unwelded_vertices"], totals["unwelded_vertices"] - totals["welded_vertices"]))
+                totals = profiler.root.getTotals()
+                if totals.get("decimation_target", 0) > 0:
+                    print("Decimation: %i triangles removed, %i triangles written" % (totals["decimated_faces"], totals["faces"]))
+                    # Decimation stops before its target when only locked vertices are left: borders, uv seams and material borders
+                    for span in profiler.getSpans("object"):
+                        spanTotals = span.getTotals()
+                        if spanTotals.get("decimation_target", 0) > 0 and spanTotals["faces"] > 1.05 * spanTotals["decimation_target"]:
+                            print("Decimation: %s kept %i triangles for a budget of %i" % (span.name, spanTotals["faces"], spanTotals["decimation_target"]))
+                if self.OptimizeVertexCache:
+                    totals = profiler.root.getTotals()
+                    if totals.get("faces", 0) > 0:
+                        print("Vertex cache: ACMR %.3f -> %.3f" % (totals["cache_misses_before"] / totals["faces"], totals["cache_misses_after"] / totals["faces"]))
+                if self.ElideAttributes:
+                    for span in profiler.getSpans("object"):
+                        totals = span.getTotals()
+                        if totals.get("elided_normals", 0) > 0 or totals.get("elided_uvs", 0) > 0:
+                            print("Omitted attributes: %s, normals of %i/%i geometries, uvs of %i" % (span.name, totals.get("elided_normals", 0), totals["geometries"], totals.get("elided_uvs", 0)))
+                    totals = profiler.root.getTotals()
+                    print("Omitted attributes: normals of %i geometries, uvs of %i, out of %i" % (totals.get("elided_normals", 0), totals.get("elided_uvs", 0), totals.get("geometries", 0)))
+                if self.WriteProfile:
+                    profiler.writeJson(os.path.splitext(filePath)[0] + ".profile.json")
+                print("Exportation completed successfuly")
+            finally:
+                # A cancelled or failed export leaves no partial file
+                if not isCompleted:
+                    if io_xaml_exporter.Textures is not None:
+                        io_xaml_exporter.Textures.finish()
+                    if self.dictionarySet is not None:
+                        self.dictionarySet.discard()
+                    writer.discard()
+                    print("Exportation cancelled, %s removed" % writer.filePath)
             
-    def invoke(self, context, event):
-        WindowManager = context.window_manager
-        WindowManager.fileselect_add(self)
-        return {"RUNNING_MODAL"}
+        # Writes sibling objects: their meshes, the groups of the children of each object, then lights.
+        # The opaque pass writes the opaque meshes and the lights, the transparent pass the transparent meshes only,
+        # each pass opening the groups of groupNames. Yields True once an object is written.
+        def iterateNodes(self, writer, objects, childrenByName, groupNames, sharedMeshNames, isTransparentPass):
+            from . import io_xaml_exporter
+            for item in objects:
+                if item.type != "MESH" or item.name in self.skippedNames or io_xaml_exporter.meshHasTransparency(item) != isTransparentPass:
+                    continue
+                for step in self.iterateMeshComprehensive(writer, item, sharedMeshNames):
+                    yield None
+                yield True
+            for item in objects:
+                if item.name in groupNames:
+                    io_xaml_exporter.beginGroup(writer, item, "GT" if isTransparentPass else "G")
+                    for isObjectDone in self.iterateNodes(writer, childrenByName[item.name], childrenByName, groupNames, sharedMeshNames, isTransparentPass):
+                        yield isObjectDone
+                    io_xaml_exporter.endGroup(writer)
+            for item in objects:
+                if item.type == "LAMP" and not isTransparentPass:
+                    with io_xaml_exporter.Profiler.span(item.name, "object"):
+                        io_xaml_exporter.writeLight(writer, item, True)
+                    yield True
+
+        # Writes a mesh object, referencing its geometry when its mesh data is shared, one step per geometry chunk
+        def iterateMeshComprehensive(self, writer, item, sharedMeshNames):
+            from . import io_xaml_exporter
+            profiler = io_xaml_exporter.Profiler
+            profiler.log("exporting mesh %s" % item.name)
+            with profiler.span(item.name, "object"):
+                if item.data.name in sharedMeshNames and io_xaml_exporter.isMeshDataShareable(item):
+                    io_xaml_exporter.writeMeshComprehensive(writer, item, item.data, True)
+                    return
+                if self.dictionarySet is not None:
+                    for step in self.iterateSplitMesh(writer, item):
+                        yield
+                    return
+                for step in self.iterateEvaluatedMesh(writer, item, item, lambda fragmentWriter, meshData: io_xaml_exporter.iterateMeshComprehensive(fragmentWriter, item, meshData)):
+                    yield
+
+        # Writes the geometries of a mesh object in its own dictionary, referenced from the root scene
+        def iterateSplitMesh(self, writer, item):
+            from . import io_xaml_exporter
+            name = ("object", item.name)
+            dictionaryWriter = self.dictionarySet.begin(name)
+            def writeReferences(meshData):
+                io_xaml_exporter.writeMeshComprehensive(writer, item, meshData, True, item)
+                bounds = io_xaml_exporter.transformBounds(io_xaml_exporter.getMeshBounds(meshData), item.matrix_world)
+                self.dictionarySet.end(name, dictionaryWriter, "geometry", bounds)
+            for step in self.iterateEvaluatedMesh(dictionaryWriter, item, item, lambda fragmentWriter, meshData: io_xaml_exporter.iterateSharedMeshGeometry(fragmentWriter, meshData, item), writeReferences):
+                yield
+
+        # Writes the resources of an object instanced by duplis or particles. When splitting, its geometries are written
+        # in their own dictionary, with the world bounds of all its instances, and the group referencing them and the
+        # materials stays in the root resources, so that the dictionary loads on its own.
+        def iterateInstanceResource(self, writer, source, instanceSets):
+            from . import io_xaml_exporter
+            if self.dictionarySet is None:
+                writeResource = lambda fragmentWriter, meshData: io_xaml_exporter.iterateInstanceResource(fragmentWriter, source, meshData)
+                for step in self.iterateEvaluatedMesh(writer, source, source, writeResource, None, "instance"):
+                    yield
+                return
+            name = ("instance", source.name)
+            rootWriter, writer = writer, self.dictionarySet.begin(name)
+            writeResource = lambda fragmentWriter, meshData: io_xaml_exporter.iterateSharedMeshGeometry(fragmentWriter, meshData, source, "GI")
+            def afterWrite(meshData):
+                io_xaml_exporter.writeInstanceGroup(rootWriter, source, meshData)
+                meshBounds = io_xaml_exporter.getMeshBounds(meshData)
+                bounds = None
+                for emitter, instances in instanceSets:
+                    for instanceSource, matrix in instances:
+                        if instanceSource.name == source.name:
+                            bounds = io_xaml_exporter.mergeBounds(bounds, io_xaml_exporter.transformBounds(meshBounds, matrix))
+                self.dictionarySet.end(name, writer, "instance", bounds)
+            for step in self.iterateEvaluatedMesh(writer, source, source, writeResource, afterWrite, "instance"):
+                yield
+
+        # Writes a mesh object from its evaluated mesh, removed as soon as written so that memory is bounded by the largest object.
+        # afterWrite is called with the evaluated mesh once written, purpose tells the cached fragments of a mesh apart.
+        # When several documents are exported, the next ones reuse the fragment without evaluating the object again:
+        # an object linked in several scenes is evaluated once per frame.
+        def iterateEvaluatedMesh(self, writer, item, cachedObject, writeMesh, afterWrite=None, purpose=None):
+            from . import io_xaml_exporter
+            sharedKey = None
+            if io_xaml_exporter.SharedFragments is not None and afterWrite is None:
+                sharedKey = repr(("object", item.name, cachedObject is not None, purpose, len(writer.tags), self.scene.frame_current,
+                                  self.sceneDecimateRatio, io_xaml_exporter.AnimatedNames.get(item.name)))
+                fragment = io_xaml_exporter.SharedFragments.get(sharedKey)
+                if fragment is not None:
+                    writer.writeFragment(fragment)
+                    return
+                documentWriter, writer = writer, writer.createFragmentWriter()
+            with io_xaml_exporter.Profiler.span("to_mesh"):
+                meshData = item.to_mesh(self.scene, self.ApplyModifiers, "PREVIEW")
+            try:
+                with io_xaml_exporter.Profiler.span("tessellate"):
+                    meshData.calc_tessface()
+                io_xaml_exporter.DecimateRatio = self.getDecimateRatio(meshData)
+                for step in io_xaml_exporter.iterateCachedMesh(writer, cachedObject, meshData, lambda fragmentWriter: writeMesh(fragmentWriter, meshData), purpose):
+                    yield
+                if afterWrite is not None:
+                    afterWrite(meshData)
+            finally:
+                bpy.data.meshes.remove(meshData)
+            if sharedKey is not None:
+                io_xaml_exporter.SharedFragments.put(sharedKey, writer.content)
+                documentWriter.writeFragment(writer.content)
+
+        # Counts the triangles of a mesh object once exported, its evaluated mesh being counted when its modifiers are applied
+        def countExportedTriangles(self, item):
+            from . import io_xaml_exporter
+            if io_xaml_exporter.isMeshDataShareable(item):
+                return io_xaml_exporter.countPolygonTriangles(item.data)
+            with io_xaml_exporter.Profiler.span("to_mesh"):
+                meshData = item.to_mesh(self.scene, True, "PREVIEW")
+            try:
+                return io_xaml_exporter.countPolygonTriangles(meshData)
+            finally:
+                bpy.data.meshes.remove(meshData)
+
+        # Gets the share of the triangles of a mesh kept to fit the triangle budgets
+        def getDecimateRatio(self, meshData):
+            from . import io_xaml_exporter
+            ratio = self.sceneDecimateRatio
+            if self.MaxObjectTriangles > 0:
+                triangleCount = io_xaml_exporter.countTriangles(meshData)
+                if triangleCount > 0:
+                    ratio = min(ratio, float(self.MaxObjectTriangles) / triangleCount)
+            return min(1.0, ratio)
+
+        def invoke(self, context, event):
+            WindowManager = context.window_manager
+            WindowManager.fileselect_add(self)
+            return {"RUNNING_MODAL"}
         
-def menu_func(self, context):
-    default_path = os.path.splitext(bpy.data.filepath)[0] + ".xaml"
-    self.layout.operator(XamlExporter.bl_idname, text="Export Xaml Scene (.xaml)").filepath = default_path
+    def menu_func(self, context):
+        default_path = os.path.splitext(bpy.data.filepath)[0] + ".xaml"
+        self.layout.operator(XamlExporter.bl_idname, text="Export Xaml Scene (.xaml)").filepath = default_path
 
-def register():
-    bpy.utils.register_module(__name__)
-    bpy.types.INFO_MT_file_export.append(menu_func)
-    print("registered")
+    def register():
+        bpy.utils.register_module(__name__)
+        bpy.types.INFO_MT_file_export.append(menu_func)
+        print("registered")
 
 
-def unregister():
-    bpy.utils.unregister_module(__name__)
-    bpy.types.INFO_MT_file_export.remove(menu_func)
-    print("unregistered")
+    def unregister():
+        bpy.utils.unregister_module(__name__)
+        bpy.types.INFO_MT_file_export.remove(menu_func)
+        print("unregistered")
     
 if __name__ == "__main__":
     register()
\ No newline at end of file
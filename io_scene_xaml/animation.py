@@ -0,0 +1,102 @@
+import re
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Tells whether an object is animated by an action of its own
+def hasAction(object):
+    animationData = getattr(object, "animation_data", None)
+    return animationData is not None and animationData.action is not None
+
+# Tells whether an object or one of its parents is animated
+def isAnimatedInWorld(object):
+    while object is not None:
+        if hasAction(object):
+            return True
+        object = object.parent
+    return False
+
+# Samples the values of objects over frames: each frame is evaluated once for all the objects.
+# getValues gets the list of channel values of an object at the current frame.
+# Yields after each frame, then stores the samples: a (frames x channels) array per object name.
+def iterateSamples(scene, objects, frames, getValues, samples):
+    currentFrame = scene.frame_current
+    rows = dict([(object.name, []) for object in objects])
+    try:
+        for frame in frames:
+            scene.frame_set(frame)
+            for object in objects:
+                rows[object.name].append(getValues(object))
+            yield
+    finally:
+        scene.frame_set(currentFrame)
+    for name, values in rows.items():
+        samples[name] = numpy.array(values, dtype=numpy.float64) if numpy is not None else values
+
+# Gets the largest difference between sampled values and their linear interpolation between two kept frames
+def getSegmentError(values, first, last):
+    if numpy is not None and isinstance(values, numpy.ndarray):
+        ratios = (numpy.arange(first + 1, last, dtype=numpy.float64) - first) / (last - first)
+        interpolated = values[first] + ratios[:, None] * (values[last] - values[first])
+        errors = numpy.abs(values[first + 1:last] - interpolated).max(axis=1)
+        index = int(errors.argmax())
+        return errors[index], first + 1 + index
+    worstError, worstFrame = -1.0, first + 1
+    for frame in range(first + 1, last):
+        ratio = float(frame - first) / (last - first)
+        error = max([abs(values[frame][channel] - (values[first][channel] + ratio * (values[last][channel] - values[first][channel])))
+                     for channel in range(len(values[frame]))])
+        if error > worstError:
+            worstError, worstFrame = error, frame
+    return worstError, worstFrame
+
+# Keeps the frames needed to interpolate the sampled values linearly within the tolerance (Ramer-Douglas-Peucker),
+# the error of a segment being computed at once for all its frames and channels.
+# Returns the indices of the kept frames, an empty list when the values are constant.
+def reduceKeyframes(values, tolerance):
+    frameCount = len(values)
+    if frameCount == 0:
+        return []
+    if numpy is not None and isinstance(values, numpy.ndarray):
+        isConstant = (values.max(axis=0) - values.min(axis=0)).max() <= tolerance
+    else:
+        isConstant = max([max(channel) - min(channel) for channel in zip(*values)]) <= tolerance
+    if isConstant:
+        return []
+    kept = set([0, frameCount - 1])
+    segments = [(0, frameCount - 1)]
+    while len(segments) > 0:
+        first, last = segments.pop()
+        if last - first < 2:
+            continue
+        error, frame = getSegmentError(values, first, last)
+        if error > tolerance:
+            kept.add(frame)
+            segments.append((first, frame))
+            segments.append((frame, last))
+    return sorted(kept)
+
+# Gets the columns of sampled values
+def getColumns(values, columns):
+    if numpy is not None and isinstance(values, numpy.ndarray):
+        return values[:, columns]
+    return [[row[column] for column in columns] for row in values]
+
+# Formats the name of an animated xaml element after its object, unique among the given names
+def formatTargetName(prefix, name, usedNames):
+    targetName = "%s_%s" % (prefix, re.sub(r"\W", "_", name))
+    if targetName in usedNames:
+        index = 1
+        while "%s_%i" % (targetName, index) in usedNames:
+            index += 1
+        targetName = "%s_%i" % (targetName, index)
+    usedNames.add(targetName)
+    return targetName
+
+# Formats a time in seconds as a xaml TimeSpan
+def formatKeyTime(seconds):
+    minutes, seconds = divmod(seconds, 60.0)
+    hours, minutes = divmod(int(minutes), 60)
+    return ("%i:%i:%.6f" % (hours, minutes, seconds)).rstrip("0").rstrip(".")
@@ -0,0 +1,196 @@
+"""Headless batch export of .blend files to xaml.
+
+Usage: python -m io_scene_xaml.batch [options] file.blend [file.blend ...]
+       python -m io_scene_xaml.batch --manifest files.json
+
+Each file is exported by a background Blender process, several of them running at once.
+The same script is run inside these Blender processes to drive the export operator.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+# Name of the addon module enabled in the worker Blender processes
+AddonName = "io_scene_xaml"
+
+# Line printed by a worker once its export succeeded, old Blender versions always exiting with 0
+SuccessMarker = "XAML_BATCH_EXPORT_FINISHED"
+
+# Exporter operator properties exposed on the command line, with their types
+Options = [
+    ("Comprehensive", bool),
+    ("ApplyModifiers", bool),
+    ("AddDefaultNamespaces", bool),
+    ("ExportTextures", bool),
+    ("MaxTextureSize", int),
+    ("TextureFormat", str),
+    ("WeldVertices", bool),
+    ("WeldEpsilon", float),
+    ("MaxObjectTriangles", int),
+    ("MaxSceneTriangles", int),
+    ("MaxGeometryVertices", int),
+    ("OptimizeVertexCache", bool),
+    ("ElideAttributes", bool),
+    ("SplitFiles", bool),
+    ("Compression", str),
+    ("CompressionLevel", int),
+    ("UseCache", bool),
+    ("CacheSize", int),
+    ("FormatWorkers", int),
+    ("FormatChunkSize", int),
+    ("PositionPrecision", int),
+    ("NormalPrecision", int),
+    ("UVPrecision", int),
+    ("TransformPrecision", int),
+    ("CompactNumbers", bool),
+    ("ExportAnimation", bool),
+    ("AnimationTolerance", float),
+    ("ExportInstances", bool),
+    ("MaxInstances", int),
+    ("InstanceSeed", int),
+    ("ExportCameras", str),
+    ("ExportScenes", str),
+    ("IsInDebugmode", bool),
+    ("WriteProfile", bool),
+]
+
+# Parses a boolean command line value
+def parseBool(value):
+    if value.lower() in ("1", "true", "yes", "on"):
+        return True
+    if value.lower() in ("0", "false", "no", "off"):
+        return False
+    raise argparse.ArgumentTypeError("boolean value expected, got '%s'" % value)
+
+# Reads the manifest: a json list of input paths or of {"input": ..., "output": ...} objects, or one path per line
+def readManifest(manifestPath):
+    File = open(manifestPath, "r")
+    content = File.read()
+    File.close()
+    baseDirectory = os.path.dirname(os.path.abspath(manifestPath))
+    if manifestPath.lower().endswith(".json"):
+        entries = json.loads(content)
+    else:
+        entries = [line.strip() for line in content.splitlines() if line.strip() and not line.strip().startswith("#")]
+    jobs = []
+    for entry in entries:
+        if not isinstance(entry, dict):
+            entry = {"input": entry}
+        job = dict(entry)
+        job["input"] = os.path.join(baseDirectory, entry["input"])
+        if "output" in entry:
+            job["output"] = os.path.join(baseDirectory, entry["output"])
+        jobs.append(job)
+    return jobs
+
+# Creates the export jobs, the output being next to the input unless an output directory is given
+def createJobs(inputs, outputDirectory, options):
+    jobs = []
+    for job in inputs:
+        job = dict(job)
+        if "output" not in job:
+            name = os.path.splitext(os.path.basename(job["input"]))[0] + ".xaml"
+            job["output"] = os.path.join(outputDirectory or os.path.dirname(job["input"]), name)
+        jobOptions = dict(options)
+        jobOptions.update(job.get("options", {}))
+        job["options"] = jobOptions
+        jobs.append(job)
+    return jobs
+
+# Runs a job in a background Blender process, raises an error when the export fails
+def runBlenderJob(job, blenderPath):
+    command = [blenderPath, "-b", job["input"], "--python", os.path.abspath(__file__), "--",
+               json.dumps({"output": job["output"], "options": job["options"]})]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+    output = process.communicate()[0]
+    if process.returncode != 0 or SuccessMarker not in output:
+        lines = output.strip().splitlines()
+        raise RuntimeError("\n".join(lines[-20:]) or "blender exited with code %i" % process.returncode)
+
+# Runs a job and reports its outcome and duration
+def runTimedJob(job, runJob):
+    start = time.time()
+    result = {"input": job["input"], "output": job["output"]}
+    try:
+        runJob(job)
+        result["status"] = "ok"
+    except Exception as error:
+        result["status"] = "failed"
+        result["error"] = str(error)
+    result["seconds"] = round(time.time() - start, 3)
+    return result
+
+# Runs all the jobs on a pool of workers and gets the summary
+def runBatch(jobs, workerCount, runJob):
+    start = time.time()
+    pool = ThreadPoolExecutor(max(1, workerCount))
+    results = []
+    for result in pool.map(lambda job: runTimedJob(job, runJob), jobs):
+        print("%-6s %8.2fs  %s" % (result["status"], result["seconds"], result["input"]))
+        results.append(result)
+    pool.shutdown()
+    return {"files": results,
+            "succeeded": len([result for result in results if result["status"] == "ok"]),
+            "failed": len([result for result in results if result["status"] != "ok"]),
+            "seconds": round(time.time() - start, 3)}
+
+# Exports the opened .blend file, run inside a worker Blender process
+def exportFile(bpy, addonUtils, job):
+    addonUtils.enable(AddonName)
+    outputDirectory = os.path.dirname(job["output"])
+    if outputDirectory and not os.path.isdir(outputDirectory):
+        os.makedirs(outputDirectory)
+    result = bpy.ops.export.xaml(filepath=job["output"], **job["options"])
+    if "FINISHED" not in result:
+        raise RuntimeError("export operator returned %s" % result)
+    print(SuccessMarker)
+
+def createParser():
+    parser = argparse.ArgumentParser(description="Export .blend files to xaml with background Blender processes.")
+    parser.add_argument("inputs", nargs="*", help=".blend files to export")
+    parser.add_argument("--manifest", help="json list or text file (one path per line) of the .blend files to export")
+    parser.add_argument("--output-dir", help="directory of the exported files, next to the .blend files by default")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="number of Blender processes run at once")
+    parser.add_argument("--blender", default=os.environ.get("BLENDER", "blender"), help="path of the Blender executable")
+    parser.add_argument("--summary", default="xaml_batch_summary.json", help="path of the json summary")
+    group = parser.add_argument_group("exporter options")
+    for name, optionType in Options:
+        group.add_argument("--%s" % name, type=parseBool if optionType is bool else optionType, metavar=optionType.__name__)
+    return parser
+
+def main(arguments=None, runJob=None):
+    parser = createParser()
+    arguments = parser.parse_args(arguments)
+    inputs = [{"input": os.path.abspath(path)} for path in arguments.inputs]
+    if arguments.manifest:
+        inputs.extend(readManifest(arguments.manifest))
+    if len(inputs) == 0:
+        parser.error("no .blend file to export")
+
+    options = dict([(name, getattr(arguments, name)) for name, optionType in Options if getattr(arguments, name) is not None])
+    jobs = createJobs(inputs, arguments.output_dir, options)
+    if runJob is None:
+        runJob = lambda job: runBlenderJob(job, arguments.blender)
+    summary = runBatch(jobs, arguments.workers, runJob)
+
+    File = open(arguments.summary, "w")
+    json.dump(summary, File, indent=2)
+    File.close()
+    print("%i exported, %i failed in %.2fs, summary written to %s" % (summary["succeeded"], summary["failed"], summary["seconds"], arguments.summary))
+    return 0 if summary["failed"] == 0 else 1
+
+if __name__ == "__main__":
+    try:
+        import bpy
+    except ImportError:
+        bpy = None
+    if bpy is None:
+        sys.exit(main())
+    else:
+        # Worker mode: run by a background Blender process, the job follows the "--" argument
+        import addon_utils
+        exportFile(bpy, addon_utils, json.loads(sys.argv[sys.argv.index("--") + 1]))
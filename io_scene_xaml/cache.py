@@ -0,0 +1,94 @@
+import os
+from collections import OrderedDict
+
+class FragmentCache:
+    "An on-disk cache of xaml fragments keyed by content hash"
+
+    def __init__(self, directory, maxSize):
+        self.directory = directory
+        self.maxSize = maxSize
+        self.hits = 0
+        self.misses = 0
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    # Gets the file path of a fragment
+    def getPath(self, key):
+        return os.path.join(self.directory, key + ".xaml")
+
+    # Gets a cached fragment, None when the fragment is not cached
+    def get(self, key):
+        path = self.getPath(key)
+        try:
+            File = open(path, "r")
+            fragment = File.read()
+            File.close()
+        except (IOError, OSError):
+            self.misses += 1
+            return None
+
+        # Touch the fragment so that eviction removes the least recently used ones first
+        os.utime(path, None)
+        self.hits += 1
+        return fragment
+
+    # Stores a fragment
+    def put(self, key, fragment):
+        File = open(self.getPath(key), "w")
+        File.write(fragment)
+        File.close()
+
+    # Removes the least recently used fragments until the cache fits in its maximum size
+    def evict(self):
+        entries = []
+        totalSize = 0
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith(".xaml") and os.path.isfile(path):
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, stat.st_size, path))
+                totalSize += stat.st_size
+        entries.sort()
+        evictedCount = 0
+        for mtime, size, path in entries:
+            if totalSize <= self.maxSize:
+                break
+            os.remove(path)
+            totalSize -= size
+            evictedCount += 1
+        return evictedCount
+
+class MemoryFragmentCache:
+    "An in-memory cache of xaml fragments, the least recently used ones being dropped above its maximum size"
+
+    def __init__(self, maxSize):
+        self.maxSize = maxSize
+        self.fragments = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    # Gets a cached fragment, None when the fragment is not cached
+    def get(self, key):
+        fragment = self.fragments.get(key)
+        if fragment is None:
+            self.misses += 1
+            return None
+        self.fragments.move_to_end(key)
+        self.hits += 1
+        return fragment
+
+    # Stores a fragment, fragments larger than the cache being left out
+    def put(self, key, fragment):
+        if len(fragment) > self.maxSize:
+            self.evicted += 1
+            return
+        if key in self.fragments:
+            self.size -= len(self.fragments.pop(key))
+        self.fragments[key] = fragment
+        self.size += len(fragment)
+        while self.size > self.maxSize:
+            key, dropped = self.fragments.popitem(last=False)
+            self.size -= len(dropped)
+            self.evicted += 1
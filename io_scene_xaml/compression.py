@@ -0,0 +1,163 @@
+import os
+import gzip
+import time
+import zlib
+import queue
+import struct
+import threading
+
+# File extensions of the compressed files, by format
+FormatExtensions = {"GZIP": ".xaml.gz", "ZIP": ".zip"}
+
+# Sizes and offsets from which the zip64 fields are used in the central directory of a zip package
+Zip64Limit = 0xffffffff
+
+# Gets the modification date and time of a file in the MS-DOS format of zip headers
+def getDosDateTime(timestamp):
+    t = time.localtime(timestamp)
+    return ((max(t.tm_year, 1980) - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday, (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2)
+
+class CompressedFile:
+    "Deflates data to a gzip file or to the members of a zip package, members being written one after the other"
+
+    def __init__(self, path, fileFormat, level=6):
+        self.path = path
+        self.fileFormat = fileFormat
+        self.level = level
+        self.File = open(path, "wb")
+        self.members = []
+        self.member = None
+        self.rawSize = 0
+        self.date, self.time = getDosDateTime(time.time())
+        if fileFormat == "GZIP":
+            # The gzip header names the member after the file, without .gz
+            self.gzipFile = gzip.GzipFile(fileobj=self.File, mode="wb", compresslevel=level)
+
+    # Begins a member, the only one of a gzip file
+    def beginMember(self, name):
+        self.member = {"name": name.replace(os.sep, "/").encode("utf-8"), "crc": 0, "compressedSize": 0, "size": 0, "offset": self.File.tell()}
+        if self.fileFormat == "ZIP":
+            self.compressor = zlib.compressobj(self.level, zlib.DEFLATED, -zlib.MAX_WBITS)
+            # The sizes are not known before the data is compressed, so members are written as zip64 ones whatever their size:
+            # sizes and crc follow the data in a data descriptor (flag 0x08) and names are utf-8 (flag 0x800)
+            self.File.write(struct.pack("<IHHHHHIIIHH", 0x04034b50, 45, 0x0808, 8, self.time, self.date, 0, 0xffffffff, 0xffffffff, len(self.member["name"]), 20))
+            self.File.write(self.member["name"])
+            self.File.write(struct.pack("<HHQQ", 0x0001, 16, 0, 0))
+
+    def writeCompressed(self, data):
+        self.member["compressedSize"] += len(data)
+        self.File.write(data)
+
+    # Compresses the data of the current member
+    def compress(self, data):
+        self.member["size"] += len(data)
+        self.rawSize += len(data)
+        if self.fileFormat == "GZIP":
+            self.gzipFile.write(data)
+        else:
+            self.member["crc"] = zlib.crc32(data, self.member["crc"])
+            self.writeCompressed(self.compressor.compress(data))
+
+    def endMember(self):
+        member = self.member
+        if self.fileFormat == "ZIP":
+            self.writeCompressed(self.compressor.flush())
+            self.File.write(struct.pack("<IIQQ", 0x08074b50, member["crc"] & 0xffffffff, member["compressedSize"], member["size"]))
+        self.members.append(member)
+        self.member = None
+
+    # Adds a file to a zip package, read by blocks
+    def addFile(self, path, name, blockSize=1024*1024):
+        self.beginMember(name)
+        File = open(path, "rb")
+        block = File.read(blockSize)
+        while block:
+            self.compress(block)
+            block = File.read(blockSize)
+        File.close()
+        self.endMember()
+
+    # Writes the central directory of a zip package and closes the file.
+    # Sizes and offsets past Zip64Limit are written in a zip64 extra field, and the zip64 end records follow when the directory needs them.
+    def close(self):
+        if self.fileFormat == "GZIP":
+            self.gzipFile.close()
+        else:
+            directoryOffset = self.File.tell()
+            for member in self.members:
+                fields = [member["size"], member["compressedSize"], member["offset"]]
+                zip64Fields = [value for value in fields if value >= Zip64Limit]
+                extra = struct.pack("<HH" + "Q" * len(zip64Fields), 0x0001, 8 * len(zip64Fields), *zip64Fields) if len(zip64Fields) > 0 else b""
+                size, compressedSize, offset = [0xffffffff if value >= Zip64Limit else value for value in fields]
+                self.File.write(struct.pack("<IHHHHHHIIIHHHHHII", 0x02014b50, 45, 45, 0x0808, 8, self.time, self.date,
+                                            member["crc"] & 0xffffffff, compressedSize, size,
+                                            len(member["name"]), len(extra), 0, 0, 0, 0, offset))
+                self.File.write(member["name"])
+                self.File.write(extra)
+            directorySize = self.File.tell() - directoryOffset
+            count = len(self.members)
+            if count >= 0xffff or directorySize >= Zip64Limit or directoryOffset >= Zip64Limit:
+                zip64Offset = self.File.tell()
+                self.File.write(struct.pack("<IQHHIIQQQQ", 0x06064b50, 44, 45, 45, 0, 0, count, count, directorySize, directoryOffset))
+                self.File.write(struct.pack("<IIQI", 0x07064b50, 0, zip64Offset, 1))
+            self.File.write(struct.pack("<IHHHHIIH", 0x06054b50, 0, 0, min(count, 0xffff), min(count, 0xffff),
+                                        min(directorySize, 0xffffffff), min(directoryOffset, 0xffffffff), 0))
+        self.File.close()
+
+class CompressedStream:
+    "A text stream whose chunks are encoded and compressed by a background thread while the document is being built"
+
+    def __init__(self, compressedFile, chunkSize=1024*1024, maxPending=8):
+        self.compressedFile = compressedFile
+        self.chunkSize = chunkSize
+        self.parts = []
+        self.size = 0
+        # Chunks waiting for the compression are bounded, the writer waits when the compression falls behind
+        self.queue = queue.Queue(maxPending)
+        self.error = None
+        self.compressSeconds = 0.0
+        self.waitSeconds = 0.0
+        self.thread = threading.Thread(target=self.run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def run(self):
+        while True:
+            data = self.queue.get()
+            if data is None:
+                break
+            if self.error is None:
+                start = time.time()
+                try:
+                    self.compressedFile.compress(data)
+                except Exception as error:
+                    self.error = error
+                self.compressSeconds += time.time() - start
+
+    def write(self, text):
+        self.parts.append(text)
+        self.size += len(text)
+        if self.size >= self.chunkSize:
+            self.flushParts()
+
+    # Sends the written text to the compression thread, the time spent here being the overhead on the export
+    def flushParts(self):
+        start = time.time()
+        if len(self.parts) > 0:
+            self.queue.put("".join(self.parts).encode("utf-8"))
+            self.parts = []
+            self.size = 0
+        self.waitSeconds += time.time() - start
+
+    def flush(self):
+        self.flushParts()
+
+    # Waits for the compression of all the written text
+    def close(self):
+        self.flushParts()
+        start = time.time()
+        self.queue.put(None)
+        self.thread.join()
+        self.waitSeconds += time.time() - start
+        if self.error is not None:
+            raise self.error
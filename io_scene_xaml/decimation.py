@@ -0,0 +1,140 @@
+import heapq
+
+# Computes the fundamental error quadric of the plane of a triangle, weighted by its area,
+# as the 10 coefficients of the symmetric matrix: aa ab ac ad bb bc bd cc cd dd
+def getTriangleQuadric(p0, p1, p2):
+    ux, uy, uz = p1[0] - p0[0], p1[1] - p0[1], p1[2] - p0[2]
+    vx, vy, vz = p2[0] - p0[0], p2[1] - p0[1], p2[2] - p0[2]
+    a, b, c = uy * vz - uz * vy, uz * vx - ux * vz, ux * vy - uy * vx
+    length = (a * a + b * b + c * c) ** 0.5
+    if length == 0:
+        return (0.0,) * 10
+    area = length * 0.5
+    a, b, c = a / length, b / length, c / length
+    d = -(a * p0[0] + b * p0[1] + c * p0[2])
+    return (area * a * a, area * a * b, area * a * c, area * a * d, area * b * b,
+            area * b * c, area * b * d, area * c * c, area * c * d, area * d * d)
+
+def addQuadrics(q, r):
+    return tuple([q[i] + r[i] for i in range(10)])
+
+# Evaluates the squared distance to the planes of a quadric
+def evaluateQuadric(q, p):
+    x, y, z = p
+    return (q[0] * x * x + 2 * q[1] * x * y + 2 * q[2] * x * z + 2 * q[3] * x + q[4] * y * y
+            + 2 * q[5] * y * z + 2 * q[6] * y + q[7] * z * z + 2 * q[8] * z + q[9])
+
+def getNormal(p0, p1, p2):
+    ux, uy, uz = p1[0] - p0[0], p1[1] - p0[1], p1[2] - p0[2]
+    vx, vy, vz = p2[0] - p0[0], p2[1] - p0[1], p2[2] - p0[2]
+    return (uy * vz - uz * vy, uz * vx - ux * vz, ux * vy - uy * vx)
+
+# Reduces a triangle list to about targetCount triangles by quadric error edge collapses (Garland and Heckbert, 1997).
+# Collapses move a vertex onto one of its neighbours, so that the remaining vertices keep their normal and uv.
+# Vertices of boundary edges (mesh borders, uv seams and material borders once the geometry is split by material)
+# are never moved, and collapses flipping a triangle are rejected.
+# Returns the remaining triangles, indexing the original positions.
+def decimate(positions, indices, targetCount):
+    triangles = [list(triangle) for triangle in indices]
+    if targetCount >= len(triangles):
+        return triangles
+    vertexCount = len(positions)
+
+    # Vertex quadrics and triangles around each vertex
+    quadrics = [(0.0,) * 10] * vertexCount
+    vertexTriangles = [set() for vertex in range(vertexCount)]
+    edgeCounts = {}
+    for index, (a, b, c) in enumerate(triangles):
+        quadric = getTriangleQuadric(positions[a], positions[b], positions[c])
+        for vertex in (a, b, c):
+            quadrics[vertex] = addQuadrics(quadrics[vertex], quadric)
+            vertexTriangles[vertex].add(index)
+        for edge in ((a, b), (b, c), (c, a)):
+            edge = (min(edge), max(edge))
+            edgeCounts[edge] = edgeCounts.get(edge, 0) + 1
+
+    # Vertices of boundary or non manifold edges stay in place
+    isLocked = [False] * vertexCount
+    for (a, b), count in edgeCounts.items():
+        if count != 2:
+            isLocked[a] = isLocked[b] = True
+
+    # Cost of moving a vertex onto a neighbour, which can only grow as quadrics are summed up by the collapses
+    def getCost(vertex, target):
+        position = positions[target]
+        return evaluateQuadric(quadrics[vertex], position) + evaluateQuadric(quadrics[target], position)
+
+    # Candidate collapses, outdated costs being updated when popped
+    heap = []
+    for a, b in edgeCounts:
+        if not isLocked[a]:
+            heap.append((getCost(a, b), a, b))
+        if not isLocked[b]:
+            heap.append((getCost(b, a), b, a))
+    heapq.heapify(heap)
+
+    triangleCount = len(triangles)
+    isRemoved = [False] * len(triangles)
+    while triangleCount > targetCount and len(heap) > 0:
+        cost, vertex, target = heapq.heappop(heap)
+        if len(vertexTriangles[vertex]) == 0 or not vertexTriangles[vertex] & vertexTriangles[target]:
+            continue
+        currentCost = getCost(vertex, target)
+        if currentCost > cost:
+            heapq.heappush(heap, (currentCost, vertex, target))
+            continue
+
+        # Reject the collapse when a remaining triangle would flip
+        isFlipping = False
+        for index in vertexTriangles[vertex]:
+            triangle = triangles[index]
+            if target in triangle:
+                continue
+            moved = [positions[target] if corner == vertex else positions[corner] for corner in triangle]
+            before = getNormal(*[positions[corner] for corner in triangle])
+            after = getNormal(*moved)
+            if before[0] * after[0] + before[1] * after[1] + before[2] * after[2] <= 0:
+                isFlipping = True
+                break
+        if isFlipping:
+            continue
+
+        # Collapse: triangles sharing the edge disappear, the others now use the target vertex
+        for index in list(vertexTriangles[vertex]):
+            triangle = triangles[index]
+            if target in triangle:
+                isRemoved[index] = True
+                triangleCount -= 1
+                for corner in triangle:
+                    vertexTriangles[corner].discard(index)
+            else:
+                triangle[triangle.index(vertex)] = target
+                vertexTriangles[target].add(index)
+        vertexTriangles[vertex].clear()
+        quadrics[target] = addQuadrics(quadrics[target], quadrics[vertex])
+
+        # Edges around the target: some are new, the others now cost more
+        neighbours = set()
+        for index in vertexTriangles[target]:
+            neighbours.update(triangles[index])
+        neighbours.discard(target)
+        for neighbour in neighbours:
+            if not isLocked[neighbour]:
+                heapq.heappush(heap, (getCost(neighbour, target), neighbour, target))
+            if not isLocked[target]:
+                heapq.heappush(heap, (getCost(target, neighbour), target, neighbour))
+    return [triangle for index, triangle in enumerate(triangles) if not isRemoved[index]]
+
+# Drops the vertices no triangle uses anymore and renumbers the triangles
+def compactVertices(vertexCount, triangles):
+    isUsed = [False] * vertexCount
+    for triangle in triangles:
+        for vertex in triangle:
+            isUsed[vertex] = True
+    remap = [-1] * vertexCount
+    used = []
+    for vertex in range(vertexCount):
+        if isUsed[vertex]:
+            remap[vertex] = len(used)
+            used.append(vertex)
+    return used, [[remap[a], remap[b], remap[c]] for a, b, c in triangles]
@@ -0,0 +1,115 @@
+import os
+import re
+import json
+from concurrent.futures import ThreadPoolExecutor
+from . import xaml
+
+# Writes a text file, returning its size on disk
+def writeText(path, content):
+    File = open(path, "w")
+    File.write(content)
+    File.close()
+    return os.path.getsize(path)
+
+class DictionarySet:
+    "Writes resources in ResourceDictionary files next to the root scene, on a thread pool, with a json manifest"
+
+    def __init__(self, rootPath, rootWriter, workerCount=4):
+        self.rootPath = rootPath
+        self.folder = os.path.splitext(os.path.basename(rootPath))[0] + "_resources"
+        self.directory = os.path.join(os.path.dirname(os.path.abspath(rootPath)), self.folder)
+        self.manifestPath = os.path.splitext(rootPath)[0] + ".manifest.json"
+        self.rootWriter = rootWriter
+        self.pool = ThreadPoolExecutor(max(1, workerCount))
+        # Formatted dictionaries waiting to be written are bounded, so that memory stays bounded too
+        self.maxPending = 2 * max(1, workerCount)
+        self.pending = []
+        self.names = []
+        self.fileNames = {}
+        self.usedFileNames = set()
+        self.entries = {}
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+
+    # Registers a dictionary and gets its file name, made unique among the dictionaries
+    def add(self, name, title):
+        fileName = re.sub(r"[^\w\-.]", "_", title)
+        if fileName.lower() in self.usedFileNames:
+            index = 1
+            while ("%s_%i" % (fileName, index)).lower() in self.usedFileNames:
+                index += 1
+            fileName = "%s_%i" % (fileName, index)
+        self.usedFileNames.add(fileName.lower())
+        self.names.append(name)
+        self.fileNames[name] = fileName + ".xaml"
+        return self.fileNames[name]
+
+    # Gets the path of a dictionary relative to the root scene
+    def getSource(self, name):
+        return "%s/%s" % (self.folder, self.fileNames[name])
+
+    # Writes the references to all the registered dictionaries in the resources of the root scene,
+    # the resource dictionary of the root scene staying open for the resources written after them
+    def writeMergedDictionaries(self, writer):
+        writer.openTag("ResourceDictionary")
+        writer.openTag("ResourceDictionary.MergedDictionaries")
+        for name in self.names:
+            writer.openTag("ResourceDictionary")
+            writer.addProperty("Source", self.getSource(name))
+            writer.closeTag()
+        writer.closeTagName("ResourceDictionary.MergedDictionaries")
+
+    # Creates the in-memory writer of a dictionary, the dictionaries being loadable on their own
+    def begin(self, name):
+        writer = xaml.StreamWriter()
+        writer.formatter = self.rootWriter.formatter
+        writer.precisions = self.rootWriter.precisions
+        writer.isCompact = self.rootWriter.isCompact
+        writer.openTag("ResourceDictionary")
+        writer.newLine()
+        writer.addProperty("xmlns", "http://schemas.microsoft.com/winfx/2006/xaml/presentation")
+        writer.newLine()
+        writer.addProperty("xmlns:x", "http://schemas.microsoft.com/winfx/2006/xaml")
+        return writer
+
+    # Writes a dictionary on the pool, with the kind of its resources and their world bounds (None for materials)
+    def end(self, name, writer, kind, bounds=None):
+        writer.closeAllTags()
+        while len(self.pending) >= self.maxPending:
+            self.pending.pop(0).result()
+        future = self.pool.submit(writeText, os.path.join(self.directory, self.fileNames[name]), writer.content)
+        self.pending.append(future)
+        self.entries[name] = (kind, bounds, future)
+
+    # Waits for the writes and writes the manifest: the files in the order of the root resources, with their sizes and bounds
+    def finish(self):
+        self.pool.shutdown()
+        self.pending = []
+        dictionaries = []
+        for name in self.names:
+            if name not in self.entries:
+                continue
+            kind, bounds, future = self.entries[name]
+            entry = {"file": self.getSource(name), "kind": kind, "bytes": future.result()}
+            if bounds is not None:
+                entry["bounds"] = {"min": list(bounds[0]), "max": list(bounds[1])}
+            dictionaries.append(entry)
+        File = open(self.manifestPath, "w")
+        json.dump({"root": os.path.basename(self.rootPath), "dictionaries": dictionaries}, File, indent=1)
+        File.close()
+        return dictionaries
+
+    # Gets the paths of the written dictionaries and manifest with their paths relative to the root scene
+    def getFiles(self):
+        files = [(os.path.join(self.directory, self.fileNames[name]), self.getSource(name)) for name in self.names if name in self.entries]
+        return files + [(self.manifestPath, os.path.basename(self.manifestPath))]
+
+    # Removes the dictionaries of a cancelled or failed export
+    def discard(self):
+        self.pool.shutdown()
+        for name in self.names:
+            path = os.path.join(self.directory, self.fileNames[name])
+            if os.path.isfile(path):
+                os.remove(path)
+        if os.path.isdir(self.directory) and len(os.listdir(self.directory)) == 0:
+            os.rmdir(self.directory)
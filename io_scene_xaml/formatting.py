@@ -0,0 +1,77 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+from itertools import repeat
+
+# Float formats indexed by number of decimals, blender floats having about 7 significant digits
+FloatFormats = ["%%.%if" % precision for precision in range(8)]
+
+# Runs of trailing zeros removed in successive passes, any run shorter than 8 being removed in 3 passes
+ZeroRuns = ["0"*length for length in (4, 2, 1)]
+
+# Removes the trailing zeros of all the numbers of a formatted text, and the sign of negative zeros
+# Numbers are formatted with a fixed number of decimals, so zeros ending a number are always decimals
+def compactNumbers(text):
+    if "." in text:
+        for zeros in ZeroRuns:
+            text = text.replace(zeros + ",", ",").replace(zeros + " ", " ")
+        text = text.replace(".,", ",").replace(". ", " ")
+        if text.endswith("0"):
+            text = text.rstrip("0")
+        if text.endswith("."):
+            text = text[:-1]
+    text = text.replace("-0,", "0,").replace("-0 ", "0 ")
+    if text.endswith("-0") and (len(text) == 2 or text[-3] in ", "):
+        text = text[:-2] + "0"
+    return text
+
+# Gets the format of a comma separated row of floats
+def getRowFormat(precision, size):
+    return ",".join([FloatFormats[precision]]*size)
+
+# Formats a chunk of rows, each row being a sequence of numbers
+def formatRows(rowFormat, rows, compact=False):
+    text = " ".join([rowFormat]*len(rows)) % tuple(chain.from_iterable(rows))
+    return compactNumbers(text) if compact else text
+
+# Formats a chunk of a 2D numpy array
+def formatArray(rowFormat, array, compact=False):
+    text = " ".join([rowFormat]*len(array)) % tuple(array.ravel().tolist())
+    return compactNumbers(text) if compact else text
+
+class ParallelFormatter:
+    "Formats large lists of numbers on a pool of workers, chunks being returned in order"
+
+    def __init__(self, workerCount, minChunkSize):
+        self.workerCount = workerCount
+        self.minChunkSize = minChunkSize
+        self.processPool = None
+
+    # Tells whether a list is large enough to be worth formatting in parallel
+    def isParallel(self, itemCount):
+        return self.workerCount > 1 and itemCount >= 2 * self.minChunkSize
+
+    # Splits a list in chunks, about 4 per worker so that workers stay busy
+    def split(self, items):
+        chunkSize = max(self.minChunkSize, len(items) // (self.workerCount * 4) + 1)
+        return [items[start:start + chunkSize] for start in range(0, len(items), chunkSize)]
+
+    # Gets the process pool, started on first use
+    def getPool(self):
+        if self.processPool is None:
+            self.processPool = ProcessPoolExecutor(self.workerCount)
+        return self.processPool
+
+    # Formats a list of tuples on the process pool
+    def formatRows(self, rowFormat, rows, compact=False):
+        return self.getPool().map(formatRows, repeat(rowFormat), self.split(rows), repeat(compact))
+
+    # Formats a 2D numpy array on the process pool: formatting holds the interpreter lock, so threads would run one
+    # at a time, while array chunks are pickled as raw buffers, far cheaper to send than the numbers they format to
+    def formatArray(self, rowFormat, array, compact=False):
+        return self.getPool().map(formatArray, repeat(rowFormat), self.split(array), repeat(compact))
+
+    # Stops the workers
+    def close(self):
+        if self.processPool is not None:
+            self.processPool.shutdown()
+            self.processPool = None
@@ -0,0 +1,83 @@
+import random
+
+# Tells whether an object instances other objects: dupli verts, faces, groups or frames, or particle systems
+def isEmitter(object):
+    return getattr(object, "dupli_type", "NONE") != "NONE" or len(getattr(object, "particle_systems", [])) > 0
+
+# Tells whether an emitter is rendered itself besides its instances, which only a particle system can tell
+def isEmitterRendered(object):
+    return len([1 for system in getattr(object, "particle_systems", []) if system.settings.use_render_emitter]) > 0
+
+# Gets the names of the meshes only rendered through their instances: the emitters not rendered themselves,
+# and the children of dupli verts or faces, instanced at each vertex or face of their parent
+def getInstancedMeshNames(objects):
+    names = set()
+    for object in objects:
+        if object.type != "MESH":
+            continue
+        if isEmitter(object) and not isEmitterRendered(object):
+            names.add(object.name)
+        elif object.parent is not None and getattr(object.parent, "dupli_type", "NONE") in ("VERTS", "FACES"):
+            names.add(object.name)
+    return names
+
+# Gets the mesh instances of an emitter as (source object, world matrix) pairs, only the kept indices when given.
+# Matrices are copied as the dupli list is freed once read.
+def readInstances(scene, emitter, keptIndices=None):
+    emitter.dupli_list_create(scene)
+    try:
+        duplis = [dupli for dupli in emitter.dupli_list if dupli.object.type == "MESH"]
+        if keptIndices is not None:
+            duplis = [duplis[index] for index in keptIndices]
+        return [(dupli.object, dupli.matrix.copy()) for dupli in duplis]
+    finally:
+        emitter.dupli_list_clear()
+
+# Counts the mesh instances of an emitter
+def countInstances(scene, emitter):
+    emitter.dupli_list_create(scene)
+    try:
+        return len([dupli for dupli in emitter.dupli_list if dupli.object.type == "MESH"])
+    finally:
+        emitter.dupli_list_clear()
+
+# Picks count indices out of total at random, in order, the same ones on each export of an emitter
+def subsample(total, count, seed, name):
+    generator = random.Random("%i:%s" % (seed, name))
+    return sorted(generator.sample(range(total), count))
+
+# Gathers the mesh instances of the emitters as (emitter, instances) pairs, with the number of instances found.
+# Above maxInstances (0 for no limit), each emitter keeps a random subsample in proportion,
+# the kept counts being rounded cumulatively so that they add up to maxInstances.
+def gatherInstances(scene, emitters, maxInstances=0, seed=0):
+    counts = None
+    if maxInstances > 0:
+        counts = [countInstances(scene, emitter) for emitter in emitters]
+        total = sum(counts)
+        ratio = min(1.0, float(maxInstances) / total) if total > 0 else 1.0
+    instanceSets = []
+    foundCount = 0
+    for index, emitter in enumerate(emitters):
+        keptIndices = None
+        if counts is not None:
+            if ratio < 1.0:
+                keptCount = int(round((foundCount + counts[index]) * ratio)) - int(round(foundCount * ratio))
+                keptIndices = subsample(counts[index], keptCount, seed, emitter.name)
+            foundCount += counts[index]
+        instances = readInstances(scene, emitter, keptIndices)
+        if counts is None:
+            foundCount += len(instances)
+        if len(instances) > 0:
+            instanceSets.append((emitter, instances))
+    return instanceSets, foundCount
+
+# Gets the distinct source objects of the instances, in order of first use
+def getSources(instanceSets):
+    names = set()
+    sources = []
+    for emitter, instances in instanceSets:
+        for source, matrix in instances:
+            if source.name not in names:
+                names.add(source.name)
+                sources.append(source)
+    return sources
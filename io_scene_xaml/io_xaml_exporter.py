@@ -3,6 +3,17 @@ from math import atan
 from math import degrees
 from math import sqrt
 from math import acos
+import array
+import hashlib
+from . import profiling
+from . import ordering
+from . import decimation
+from . import animation
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 # Parameters
 Comprehensive = False
@@ -10,6 +21,47 @@ ApplyModifiers = False
 AddDefaultNamespaces = False
 ExportTextures = False
 IsInDebugmode = False
+WeldVertices = False
+WeldEpsilon = 0.0001
+MaxGeometryVertices = 0
+OptimizeVertexCache = False
+ElideAttributes = False
+SplitFiles = False
+DecimateRatio = 1.0
+Cache = None
+# In-memory fragments shared by the documents of one export, None when a single document is exported
+SharedFragments = None
+Textures = None
+# Names of the animated xaml elements of each animated object, by object name
+AnimatedNames = {}
+Profiler = profiling.Profiler()
+
+# Prints a progress message in debug mode
+def log(message):
+    Profiler.log(message)
+
+# Runs all the steps of an export generator at once
+def runSteps(steps):
+    for step in steps:
+        pass
+
+# Gets the exporter options having an impact on the exported geometry
+def getExporterOptions():
+    return (Comprehensive, ApplyModifiers, WeldVertices, WeldEpsilon, MaxGeometryVertices, OptimizeVertexCache, ElideAttributes, SplitFiles, DecimateRatio)
+
+# Writes a fragment shared by the documents of an export, formatted by the first document writing it at the same depth
+def writeSharedFragment(writer, key, writeFragment):
+    if SharedFragments is None:
+        writeFragment(writer)
+        return
+    key = repr(key + (len(writer.tags),))
+    fragment = SharedFragments.get(key)
+    if fragment is None:
+        fragmentWriter = writer.createFragmentWriter()
+        writeFragment(fragmentWriter)
+        fragment = fragmentWriter.content
+        SharedFragments.put(key, fragment)
+    writer.writeFragment(fragment)
 
 # Formats the name of the material
 def formatMaterialName(material):
@@ -19,6 +71,12 @@ def meshHasTransparency(mesh):
     return len([1 for material in mesh.data.materials
                     if material is not None and material.use_transparency]) > 0
 
+# Gets the image of the first texture slot of a material when mapped with uvs, None otherwise
+def getMaterialImage(material):
+    if len(material.texture_slots) > 0 and material.texture_slots[0] is not None and material.texture_slots[0].texture_coords == 'UV':
+        return getattr(material.texture_slots[0].texture, "image", None)
+    return None
+
 # Begins the Viewport3D Resources tag
 def beginResources(writer):
     writer.openTag("Viewport3D.Resources")
@@ -29,16 +87,21 @@ def endResources(writer):
 
 # Add a material
 def writeMaterial(writer, material):
-    print("\n** Processing material... **")
+    log("\n** Processing material... **")
     writer.openTag("MaterialGroup")
     writer.addProperty("x:Key", formatMaterialName(material))
     
     # Diffuse material
     writer.openTag("DiffuseMaterial")
     writer.openTag("DiffuseMaterial.Brush")
-    if len(material.texture_slots) > 0 and material.texture_slots[0] is not None and material.texture_slots[0].texture_coords == 'UV' and material.texture_slots[0].texture.image is not None:
+    image = getMaterialImage(material)
+    if image is not None:
         writer.openTag("ImageBrush")
-        writer.addProperty("ImageSource", material.texture_slots[0].texture.image.filepath)
+        imageSource = Textures.getImageSource(image) if Textures is not None else None
+        # Split materials are in a folder next to the exported textures
+        if imageSource is not None and SplitFiles:
+            imageSource = "../" + imageSource
+        writer.addProperty("ImageSource", imageSource if imageSource is not None else image.filepath)
     else:
         writer.openTag("SolidColorBrush")
         writer.addColorProperty("Color", material.diffuse_color)
@@ -46,10 +109,6 @@ def writeMaterial(writer, material):
         writer.addProperty("Opacity", material.alpha)
     writer.closeTagName("DiffuseMaterial")
     
-    # TODO manage texture
-    # bpy.context.active_object.data.materials[0].texture_slots[0].texture.image.filepath
-        
-    
     # Check whether material has specularity
     if material.specular_intensity > 0:
         writer.openTag("SpecularMaterial")
@@ -81,7 +140,7 @@ def writeMaterial(writer, material):
         writer.closeTagName("SpecularMaterial")
     
     writer.closeTagName("MaterialGroup")
-    print("Material exportation done")
+    log("Material exportation done")
 
 # Begins the camera tag
 def beginCamera(writer):
@@ -93,21 +152,32 @@ def endCamera(writer):
 
 # Add camera objects
 def writeCamera(writer, camera):
-    print("\n** Processing camera... **")
-    print("camera found!")
+    log("\n** Processing camera... **")
+    log("camera found!")
     if camera.data.type == "PERSP":
         writer.openTag("PerspectiveCamera")
-        writer.addProperty("FieldOfView", degrees(atan(16/camera.data.lens)*2))
+        writer.addFloatProperty("FieldOfView", degrees(atan(16/camera.data.lens)*2))
         
     else:
         writer.openTag("OrthographicCamera")
-        writer.addProperty("Width", camera.data.ortho_scale)
-    writer.addVectorProperty("Position", camera.location)
-    writer.addProperty("NearPlaneDistance", camera.data.clip_start)
-    writer.addProperty("FarPlaneDistance", camera.data.clip_end)
-    writer.addEulerDirectionProperty("LookDirection", camera.matrix_local.to_euler())
+        writer.addFloatProperty("Width", camera.data.ortho_scale)
+    name = formatAnimatedName(camera, "C")
+    if name is not None:
+        writer.addProperty("x:Name", name)
+    position, direction = getCameraPlacement(camera)
+    writer.addVectorProperty("Position", position)
+    writer.addFloatProperty("NearPlaneDistance", camera.data.clip_start)
+    writer.addFloatProperty("FarPlaneDistance", camera.data.clip_end)
+    writer.addEulerDirectionProperty("LookDirection", direction)
     writer.addVectorProperty("UpDirection", Vector((0,0,1)))
-    print("Camera exportation done")
+    log("Camera exportation done")
+
+# Gets the position and the rotation of a camera.
+# The camera is not part of the visual tree, a parented camera is placed with its world transform
+def getCameraPlacement(camera):
+    if camera.parent is None:
+        return camera.location, camera.matrix_local.to_euler()
+    return camera.matrix_world.to_translation(), camera.matrix_world.to_euler()
 
 # Begins the mesh tag
 def beginChildren(writer):
@@ -117,74 +187,225 @@ def beginChildren(writer):
 def endChildren(writer):
     writer.closeTagName("Viewport3D.Children")
 
-# Add a ligth object
-def writeLight(writer, light):
-    print("\n** Processing light... **")
+# Add a ligth object, relative to the ModelVisual3D of its parent when nested, in world space otherwise
+def writeLight(writer, light, isNested=False):
+    log("\n** Processing light... **")
     writer.openTag("ModelVisual3D")
     writer.openTag("ModelVisual3D.Content")
     
+    if light.parent is None:
+        location, rotation = light.location, light.rotation_euler
+    elif isNested:
+        location, rotation = getLocalLocationScale(light)[0], light.matrix_local.to_euler()
+    else:
+        location, rotation = light.matrix_world.to_translation(), light.matrix_world.to_euler()
     if light.data.type == "POINT":
         writer.openTag("PointLight")
-        writer.addVectorProperty("Position", light.location)
+        writer.addVectorProperty("Position", location)
         
     elif light.data.type == "SPOT":
         writer.openTag("SpotLight")
-        writer.addEulerDirectionProperty("Direction", light.rotation_euler)
-        writer.addVectorProperty("Position", light.location)
+        writer.addEulerDirectionProperty("Direction", rotation)
+        writer.addVectorProperty("Position", location)
         
     elif light.data.type == "SUN":
         writer.openTag("DirectionalLight")
-        writer.addEulerDirectionProperty("Direction", light.rotation_euler)
+        writer.addEulerDirectionProperty("Direction", rotation)
         
     elif light.data.type == "AREA":
         writer.openTag("DirectionalLight")
-        writer.addEulerDirectionProperty("Direction", light.rotation_euler)
+        writer.addEulerDirectionProperty("Direction", rotation)
         
     elif light.data.type == "HEMI":
         writer.openTag("AmbientLight")
     
     else:
-        print("no type match for the LAMP!")
+        log("no type match for the LAMP!")
     
     writer.addColorProperty("Color", light.data.color)
     writer.closeTagName("ModelVisual3D")
-    print("Light exportation done")
+    log("Light exportation done")
+
+# Gets positions, normals and triangle indices of a mesh as numpy arrays
+def gatherMeshArrays(mesh):
+    vertices = numpy.empty(len(mesh.vertices) * 3, dtype=numpy.float32)
+    mesh.vertices.foreach_get("co", vertices)
+    normals = numpy.empty(len(mesh.vertices) * 3, dtype=numpy.float32)
+    mesh.vertices.foreach_get("normal", normals)
+    
+    # Tessfaces always hold 4 vertex indices, the last one being 0 for triangles
+    faces = numpy.empty(len(mesh.tessfaces) * 4, dtype=numpy.int32)
+    mesh.tessfaces.foreach_get("vertices_raw", faces)
+    faces = faces.reshape(-1, 4)
+    isQuad = faces[:, 3] != 0
+    quads = faces[isQuad]
+    
+    # Triangles first, then both halves of the quads, as the list based path does
+    indices = numpy.concatenate((faces[~isQuad][:, :3], quads[:, [0, 1, 3]], quads[:, [1, 2, 3]]))
+    return vertices.reshape(-1, 3), normals.reshape(-1, 3), indices
+
+# Counts the triangles of the tessellated faces of a mesh
+def countTriangles(meshData):
+    faces = array.array("i", [0]) * (len(meshData.tessfaces) * 4)
+    meshData.tessfaces.foreach_get("vertices_raw", faces)
+    return len(meshData.tessfaces) + len([vertex for vertex in faces[3::4] if vertex != 0])
+
+# Counts the triangles of the polygons of a mesh, without tessellating it
+def countPolygonTriangles(meshData):
+    loopTotals = array.array("i", [0]) * len(meshData.polygons)
+    meshData.polygons.foreach_get("loop_total", loopTotals)
+    return sum(loopTotals) - 2 * len(loopTotals)
+
+# Keeps DecimateRatio of the triangles of a geometry with shared vertices, numpy arrays or lists
+def decimateGeometry(vertices, normals, uvs, indices):
+    isArray = numpy is not None and isinstance(indices, numpy.ndarray)
+    triangleCount = len(indices)
+    with Profiler.span("decimate"):
+        positions = vertices.tolist() if isArray else [tuple(vertex) for vertex in vertices]
+        targetCount = max(1, int(triangleCount * DecimateRatio))
+        triangles = decimation.decimate(positions, indices.tolist() if isArray else indices, targetCount)
+        used, indices = decimation.compactVertices(len(vertices), triangles)
+        if isArray:
+            vertices, normals, indices = vertices[used], normals[used], numpy.array(indices, dtype=numpy.int32).reshape(-1, 3)
+        else:
+            vertices = [vertices[vertex] for vertex in used]
+            normals = [normals[vertex] for vertex in used]
+            if len(uvs) > 0:
+                uvs = [uvs[vertex] for vertex in used]
+    Profiler.count("decimated_faces", triangleCount - len(indices))
+    Profiler.count("decimation_target", targetCount)
+    log(" -> decimation: %i triangles -> %i triangles" % (triangleCount, len(indices)))
+    return vertices, normals, uvs, indices
+
+# Reorders the triangles then the vertices of a geometry for the vertex cache, numpy arrays or lists,
+# and reports the average cache miss ratio (transformed vertices per triangle) before and after
+def optimizeVertexCache(vertices, normals, uvs, indices):
+    isArray = numpy is not None and isinstance(indices, numpy.ndarray)
+    triangles = indices.tolist() if isArray else indices
+    missesBefore = ordering.computeACMR(triangles) * len(triangles)
+    with Profiler.span("reorder"):
+        if isArray:
+            triangles = ordering.tipsify(triangles, len(vertices))
+            order, remap = ordering.getVertexOrder(triangles, len(vertices))
+            indices = numpy.array(remap, dtype=numpy.int32)[numpy.array(triangles, dtype=numpy.int32).reshape(-1, 3)]
+            vertices, normals = vertices[order], normals[order]
+        else:
+            vertices, normals, uvs, indices = ordering.optimizeTriangleOrder(vertices, normals, uvs, indices)
+            triangles = indices
+    missesAfter = ordering.computeACMR(triangles) * len(triangles)
+    Profiler.count("cache_misses_before", missesBefore)
+    Profiler.count("cache_misses_after", missesAfter)
+    if len(triangles) > 0:
+        log(" -> vertex cache: ACMR %.3f -> %.3f" % (missesBefore / len(triangles), missesAfter / len(triangles)))
+    return vertices, normals, uvs, indices
+
+# Tells whether WPF would compute the given normals itself: it averages the normals of the triangles around
+# each vertex, so the written normals are redundant when all these triangles face the direction of their vertex normal.
+# Degenerate triangles are ignored, as WPF does. Numpy arrays or lists.
+def areNormalsGenerated(vertices, normals, indices, tolerance=0.0001):
+    if len(indices) == 0:
+        return False
+    if numpy is not None and isinstance(indices, numpy.ndarray):
+        corners = numpy.asarray(vertices, dtype=numpy.float64)[indices]
+        faceNormals = numpy.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+        lengths = numpy.sqrt((faceNormals * faceNormals).sum(axis=1))
+        isValid = lengths > 0
+        faceNormals = faceNormals[isValid] / lengths[isValid][:, None]
+        vertexNormals = numpy.asarray(normals, dtype=numpy.float64)
+        vertexNormals = vertexNormals / numpy.maximum(numpy.sqrt((vertexNormals * vertexNormals).sum(axis=1)), 1e-12)[:, None]
+        for corner in range(3):
+            if ((faceNormals * vertexNormals[indices[isValid][:, corner]]).sum(axis=1) < 1.0 - tolerance).any():
+                return False
+        return True
+    for triangle in indices:
+        p0, p1, p2 = vertices[triangle[0]], vertices[triangle[1]], vertices[triangle[2]]
+        ux, uy, uz = p1[0] - p0[0], p1[1] - p0[1], p1[2] - p0[2]
+        vx, vy, vz = p2[0] - p0[0], p2[1] - p0[1], p2[2] - p0[2]
+        nx, ny, nz = uy * vz - uz * vy, uz * vx - ux * vz, ux * vy - uy * vx
+        length = sqrt(nx * nx + ny * ny + nz * nz)
+        if length == 0:
+            continue
+        for vertex in triangle:
+            normal = normals[vertex]
+            normalLength = sqrt(normal[0] * normal[0] + normal[1] * normal[1] + normal[2] * normal[2])
+            if normalLength == 0 or (nx * normal[0] + ny * normal[1] + nz * normal[2]) / (length * normalLength) < 1.0 - tolerance:
+                return False
+    return True
+
+# Tells whether the texture coordinates of a geometry are used by the brush of its material
+def isUvUsed(material):
+    return material is not None and getMaterialImage(material) is not None
+
+# Drops the normals WPF would compute itself, and reports it with the uvs left out as no brush of the material uses them
+def elideAttributes(vertices, normals, uvs, indices, areUvsElided=False):
+    Profiler.count("geometries", 1)
+    if areUvsElided:
+        Profiler.count("elided_uvs", 1)
+        log(" -> texture coordinates omitted: no image brush")
+    if areNormalsGenerated(vertices, normals, indices):
+        normals = []
+        Profiler.count("elided_normals", 1)
+        log(" -> normals omitted: flat faces, computed by WPF")
+    return vertices, normals, uvs, indices
 
 # Add mesh object
 def writeMeshOptimized(writer, mesh):
-    print("\n** Processing mesh with minimalist method... **")
+    log("\n** Processing mesh with minimalist method... **")
     writer.openTag("ModelVisual3D")
     writer.openTag("ModelVisual3D.Content")
     writer.openTag("GeometryModel3D")
     writer.openTag("GeometryModel3D.Geometry")
     writer.openTag("MeshGeometry3D")
     
-    print(" -> gathering data")
-    # Get vertices
-    vertices = [vertex.co for vertex in mesh.vertices]
-    
-    # Get vertex normals
-    normals = [vertex.normal for vertex in mesh.vertices]
-    
-    # Create triangles from vertex indices
-    indices = [face.vertices for face in mesh.tessfaces
-                if len(face.vertices) == 3]
-    indicesQuad = [face.vertices for face in mesh.tessfaces
-                if len(face.vertices) == 4]
-    indices.extend([[indice[0],indice[1],indice[3]] for indice in indicesQuad])
-    indices.extend([[indice[1],indice[2],indice[3]] for indice in indicesQuad])
+    log(" -> gathering data")
+    with Profiler.span("extract"):
+        if numpy is not None:
+            vertices, normals, indices = gatherMeshArrays(mesh)
+        else:
+            # Get vertices
+            vertices = [vertex.co for vertex in mesh.vertices]
+            
+            # Get vertex normals
+            normals = [vertex.normal for vertex in mesh.vertices]
+            
+            # Create triangles from vertex indices
+            indices = [face.vertices for face in mesh.tessfaces
+                        if len(face.vertices) == 3]
+            indicesQuad = [face.vertices for face in mesh.tessfaces
+                        if len(face.vertices) == 4]
+            indices.extend([[indice[0],indice[1],indice[3]] for indice in indicesQuad])
+            indices.extend([[indice[1],indice[2],indice[3]] for indice in indicesQuad])
+        if DecimateRatio < 1.0 and len(indices) > 0:
+            vertices, normals, uvs, indices = decimateGeometry(vertices, normals, [], indices)
+        if OptimizeVertexCache:
+            vertices, normals, uvs, indices = optimizeVertexCache(vertices, normals, [], indices)
+        if ElideAttributes:
+            vertices, normals, uvs, indices = elideAttributes(vertices, normals, [], indices)
+        Profiler.count("vertices", len(vertices))
+        Profiler.count("faces", len(indices))
     
     # Get Texture UV Coordinates
     # TODO
     
-    print(" -> writting data")
+    log(" -> writting data")
     # Set Geometry properties
-    writer.newLine()
-    writer.addVectorListProperty("Positions", vertices)
-    writer.newLine()
-    writer.addListListProperty("TriangleIndices", indices)
-    writer.newLine()
-    writer.addVectorListProperty("Normals", normals)
+    with Profiler.span("write"):
+        if numpy is not None:
+            writer.newLine()
+            writer.addArrayListProperty("Positions", vertices, "position")
+            writer.newLine()
+            writer.addArrayListProperty("TriangleIndices", indices)
+            if len(normals) > 0:
+                writer.newLine()
+                writer.addArrayListProperty("Normals", normals, "normal")
+        else:
+            writer.newLine()
+            writer.addVectorListProperty("Positions", vertices)
+            writer.newLine()
+            writer.addListListProperty("TriangleIndices", indices)
+            if len(normals) > 0:
+                writer.newLine()
+                writer.addVectorListProperty("Normals", normals, "normal")
     writer.closeTagName("GeometryModel3D.Geometry")
     
     # Set material properties
@@ -197,119 +418,539 @@ def writeMeshOptimized(writer, mesh):
 
     # end of list of meshes
     writer.closeTagName("ModelVisual3D")
-    print("Minimalist method exportation done")
+    log("Minimalist method exportation done")
+
+# Groups the face indices of a mesh by material slot index, in a single pass
+def bucketFacesByMaterial(meshData):
+    buckets = {}
+    for index, face in enumerate(meshData.tessfaces):
+        buckets.setdefault(face.material_index, []).append(index)
+    return buckets
 
-def writeMeshComprehensiveMaterialIteration(writer, mesh, meshData, material):
+# Merges the vertices sharing the same position, normal and uv (within epsilon) and reindexes the triangles.
+# Without isNormalKept, vertices are merged whatever their normals, which are averaged: the faces around
+# a vertex are then connected as decimation needs, flat faces being shaded smooth.
+def weldVertices(vertices, normals, uvs, indices, epsilon, isNormalKept=True):
+    scale = 1.0 / epsilon
+    hasUvs = len(uvs) > 0
+    weldedIndices = {}
+    remap = []
+    weldedVertices = []
+    weldedNormals = []
+    weldedUvs = []
+    for i, vertex in enumerate(vertices):
+        normal = normals[i]
+        key = (round(vertex.x * scale), round(vertex.y * scale), round(vertex.z * scale))
+        if isNormalKept:
+            key += (round(normal.x * scale), round(normal.y * scale), round(normal.z * scale))
+        if hasUvs:
+            key += (round(uvs[i][0] * scale), round(uvs[i][1] * scale))
+        index = weldedIndices.get(key)
+        if index is None:
+            index = weldedIndices[key] = len(weldedVertices)
+            weldedVertices.append(vertex)
+            weldedNormals.append(normal if isNormalKept else [normal.x, normal.y, normal.z])
+            if hasUvs:
+                weldedUvs.append(uvs[i])
+        elif not isNormalKept:
+            summed = weldedNormals[index]
+            summed[0] += normal.x
+            summed[1] += normal.y
+            summed[2] += normal.z
+        remap.append(index)
+    if not isNormalKept:
+        for index, (x, y, z) in enumerate(weldedNormals):
+            length = sqrt(x * x + y * y + z * z)
+            weldedNormals[index] = Vector((x / length, y / length, z / length)) if length > 0 else Vector((x, y, z))
+    
+    # Triangles collapsed by the welding are dropped
+    weldedTriangles = []
+    for triangle in indices:
+        a, b, c = remap[triangle[0]], remap[triangle[1]], remap[triangle[2]]
+        if a != b and b != c and a != c:
+            weldedTriangles.append([a, b, c])
+    return weldedVertices, weldedNormals, weldedUvs, weldedTriangles
+
+# Gets the vertices, normals, uvs and triangle indices of the given faces, vertices being duplicated per face
+def gatherMeshComprehensiveGeometry(meshData, material, faceIndices):
    
     currentVertexIndex = 0
     hasUvs = len(meshData.uv_textures) > 0
+    # Texture coordinates no image brush uses are left out before welding, so that they do not keep vertices apart
+    areUvsElided = hasUvs and ElideAttributes and not isUvUsed(material)
+    if areUvsElided:
+        hasUvs = False
     if hasUvs:
-        print("UV coordinates detected for mesh [%s] with material [%s]" % (mesh.name, material.name))
+        log("UV coordinates detected for mesh [%s] with material [%s]" % (meshData.name, material.name if material is not None else "No material"))
+        uvData = meshData.tessface_uv_textures.active.data
 
     vertices = []
     indices = []
     normals = []
     uvs = []
     
-    # If there is no material assigned, material index is 0
-    if material is None:
-        materialIndex = 0
-    else:
-        materialIndex = [m.name for m in meshData.materials if m is not None].index(material.name)
-
     # for each face from current material, collect data
-    for i, face in enumerate([f for f in meshData.tessfaces if f.material_index == materialIndex]):
-        vertices.extend( [meshData.vertices[vertex].co for vertex in face.vertices] )
-        if len(face.vertices) == 3:
+    meshVertices = meshData.vertices
+    tessfaces = meshData.tessfaces
+    for i in faceIndices:
+        face = tessfaces[i]
+        faceVertices = face.vertices
+        vertices.extend( [meshVertices[vertex].co for vertex in faceVertices] )
+        if len(faceVertices) == 3:
             indices.append([currentVertexIndex, currentVertexIndex + 1, currentVertexIndex + 2])
             if hasUvs:
-                #print("Triangle uv face detected")
-                uvs.extend([meshData.tessface_uv_textures.active.data[i].uv3, meshData.tessface_uv_textures.active.data[i].uv2, meshData.tessface_uv_textures.active.data[i].uv1])
-        if len(face.vertices) == 4:
+                uvs.extend([uvData[i].uv1, uvData[i].uv2, uvData[i].uv3])
+        if len(faceVertices) == 4:
             indices.append([currentVertexIndex, currentVertexIndex + 1, currentVertexIndex + 3])
             indices.append([currentVertexIndex + 1, currentVertexIndex + 2, currentVertexIndex + 3])
             if hasUvs:
-                #print("Quad uv face detected")
-                uvs.extend([meshData.tessface_uv_textures.active.data[i].uv4, meshData.tessface_uv_textures.active.data[i].uv3, meshData.tessface_uv_textures.active.data[i].uv2, meshData.tessface_uv_textures.active.data[i].uv1])
+                uvs.extend([uvData[i].uv1, uvData[i].uv2, uvData[i].uv3, uvData[i].uv4])
         if face.use_smooth:
-            normals.extend([meshData.vertices[index].normal for index in face.vertices])
+            normals.extend([meshVertices[index].normal for index in faceVertices])
         else:
-            normals.extend([face.normal]*(len(face.vertices)))
-        currentVertexIndex += len(face.vertices)
-        
-    if len(vertices) == 0:
-        print("no face found for mesh [%s] with material [%s]: skipping this geometry..." % (meshData.name if meshData is not None else "no meshData", material.name if material is not None else "No material"))
-        return
+            normals.extend([face.normal]*(len(faceVertices)))
+        currentVertexIndex += len(faceVertices)
     
-    # Initialize GeometryModel
-    writer.openTag("GeometryModel3D")
-    if material is not None:
-        writer.addProperty("Material", "{StaticResource %s}" % (formatMaterialName(material)))
-    writer.openTag("GeometryModel3D.Geometry")
-    writer.openTag("MeshGeometry3D")
+    # Decimation needs the triangles to share their vertices, including the vertices of flat faces
+    isDecimated = DecimateRatio < 1.0 and len(indices) > 0
+    if (WeldVertices or isDecimated) and len(vertices) > 0:
+        vertexCount = len(vertices)
+        vertices, normals, uvs, indices = weldVertices(vertices, normals, uvs, indices, WeldEpsilon, not isDecimated)
+        Profiler.count("unwelded_vertices", vertexCount)
+        Profiler.count("welded_vertices", vertexCount - len(vertices))
+        log(" -> welding: %i vertices -> %i vertices" % (vertexCount, len(vertices)))
     
-    # Set Geometry properties
-    writer.newLine()
-    writer.addVectorListProperty("Positions", vertices)
-    writer.newLine()
-    writer.addListListProperty("TriangleIndices", indices)
-    writer.newLine()
-    writer.addVectorListProperty("Normals", normals)
-    if hasUvs:
+    if DecimateRatio < 1.0 and len(indices) > 0:
+        vertices, normals, uvs, indices = decimateGeometry(vertices, normals, uvs, indices)
+    if OptimizeVertexCache and len(indices) > 0:
+        vertices, normals, uvs, indices = optimizeVertexCache(vertices, normals, uvs, indices)
+    if ElideAttributes and len(indices) > 0:
+        vertices, normals, uvs, indices = elideAttributes(vertices, normals, uvs, indices, areUvsElided)
+    Profiler.count("vertices", len(vertices))
+    Profiler.count("faces", len(indices))
+    return vertices, normals, uvs, indices
+
+# Add a MeshGeometry3D tag, keyed when written as a resource
+def writeMeshGeometry(writer, vertices, normals, uvs, indices, key=None):
+    with Profiler.span("write"):
+        writer.openTag("MeshGeometry3D")
+        if key is not None:
+            writer.addProperty("x:Key", key)
+    
+        # Set Geometry properties
         writer.newLine()
-        writer.addPointListProperty("TextureCoordinates", uvs)
+        writer.addVectorListProperty("Positions", vertices)
+        writer.newLine()
+        writer.addListListProperty("TriangleIndices", indices)
+        if len(normals) > 0:
+            writer.newLine()
+            writer.addVectorListProperty("Normals", normals, "normal")
+        if len(uvs) > 0:
+            writer.newLine()
+            writer.addPointListProperty("TextureCoordinates", uvs)
+        writer.closeTagName("MeshGeometry3D")
+
+# Splits the given faces in chunks whose vertices fit in a geometry block, faces being yielded as is when small enough
+def splitFaces(meshData, faceIndices, maxVertices):
+    if maxVertices <= 0 or len(faceIndices) * 4 <= maxVertices:
+        yield faceIndices
+        return
+    
+    tessfaces = meshData.tessfaces
+    chunk = []
+    vertexCount = 0
+    for i in faceIndices:
+        faceVertexCount = len(tessfaces[i].vertices)
+        if vertexCount + faceVertexCount > maxVertices and len(chunk) > 0:
+            yield chunk
+            chunk = []
+            vertexCount = 0
+        chunk.append(i)
+        vertexCount += faceVertexCount
+    if len(chunk) > 0:
+        yield chunk
+
+# Gets the geometry of the given faces one chunk at a time, so that only one chunk is in memory
+def iterateGeometryChunks(meshData, material, faceIndices):
+    for chunk in splitFaces(meshData, faceIndices, MaxGeometryVertices):
+        with Profiler.span("extract"):
+            geometry = gatherMeshComprehensiveGeometry(meshData, material, chunk)
+        yield geometry
+
+# Writes the geometry blocks of a material, one step per chunk
+def iterateMeshComprehensiveMaterial(writer, mesh, meshData, material, faceIndices):
+    for vertices, normals, uvs, indices in iterateGeometryChunks(meshData, material, faceIndices):
+        if len(vertices) == 0:
+            log("no face found for mesh [%s] with material [%s]: skipping this geometry..." % (meshData.name if meshData is not None else "no meshData", material.name if material is not None else "No material"))
+            continue
         
-    # End of material-dependant mesh block
-    writer.closeTagName("GeometryModel3D")
+        # Initialize GeometryModel
+        writer.openTag("GeometryModel3D")
+        if material is not None:
+            writer.addProperty("Material", "{StaticResource %s}" % (formatMaterialName(material)))
+        writer.openTag("GeometryModel3D.Geometry")
+        writeMeshGeometry(writer, vertices, normals, uvs, indices)
+            
+        # End of material-dependant mesh block
+        writer.closeTagName("GeometryModel3D")
+        yield
+
+# Iterates on the material slots of a mesh with the indices of their faces
+def iterateMaterialBuckets(meshData):
+    if len(meshData.materials) > 0:
+        # Split the mesh in the group based on materials, faces are bucketed by slot in one pass
+        buckets = bucketFacesByMaterial(meshData)
+        for materialIndex, material in enumerate(meshData.materials):
+            yield materialIndex, material, buckets.get(materialIndex, [])
+    else:
+        # The entire mesh with no associated material is taken into account
+        yield 0, None, range(len(meshData.tessfaces))
+
+# Tells whether the exported geometry of a mesh object is its mesh datablock as is
+def isMeshDataShareable(mesh):
+    return not (ApplyModifiers and len(mesh.modifiers) > 0)
 
-# Add mesh with comprehensice method
-def writeMeshComprehensive(writer, mesh, meshData):
-    print("\n** Processing mesh %s with comprehensice method... **" % meshData.name)
+# Gets the mesh datablocks used as is by several mesh objects
+def gatherSharedMeshData(meshList):
+    users = {}
+    for mesh in meshList:
+        if isMeshDataShareable(mesh):
+            users.setdefault(mesh.data.name, []).append(mesh)
+    return [objects[0].data for objects in users.values() if len(objects) > 1]
+
+# Formats the name of a geometry resource, the chunks following the first one being numbered.
+# Geometries of a single object (owner) are named after the object with the given prefix, those of shared mesh data after the mesh data.
+def formatGeometryName(meshData, materialIndex, chunkIndex=0, owner=None, prefix="GO"):
+    if owner is None:
+        name = "G_%s_%i" % (meshData.name.replace("."," ").replace(" ","_"), materialIndex)
+    else:
+        name = "%s_%s_%i" % (prefix, owner.name.replace("."," ").replace(" ","_"), materialIndex)
+    return name if chunkIndex == 0 else "%s_%i" % (name, chunkIndex)
+
+# Writes the geometries of a mesh datablock as resources, one step per chunk
+def iterateSharedMeshGeometry(writer, meshData, owner=None, prefix="GO"):
+    log("\n** Processing shared mesh data %s... **" % meshData.name)
+    for materialIndex, material, faceIndices in iterateMaterialBuckets(meshData):
+        if len(faceIndices) > 0:
+            for chunkIndex, geometry in enumerate(iterateGeometryChunks(meshData, material, faceIndices)):
+                vertices, normals, uvs, indices = geometry
+                writeMeshGeometry(writer, vertices, normals, uvs, indices, formatGeometryName(meshData, materialIndex, chunkIndex, owner, prefix))
+                yield
+
+# Writes the GeometryModel3D of each geometry resource of a material, one per chunk
+def writeGeometryReferences(writer, meshData, materialIndex, material, faceIndices, owner=None, prefix="GO"):
+    if len(faceIndices) == 0:
+        return
+    for chunkIndex, chunk in enumerate(splitFaces(meshData, faceIndices, MaxGeometryVertices)):
+        writer.openTag("GeometryModel3D")
+        if material is not None:
+            writer.addProperty("Material", "{StaticResource %s}" % (formatMaterialName(material)))
+        writer.addProperty("Geometry", "{StaticResource %s}" % (formatGeometryName(meshData, materialIndex, chunkIndex, owner, prefix)))
+        writer.closeTag()
+
+# Add mesh with comprehensice method, geometries of shared mesh data are referenced from the resources
+def writeMeshComprehensive(writer, mesh, meshData, isShared=False, owner=None):
+    runSteps(iterateMeshComprehensive(writer, mesh, meshData, isShared, owner))
+
+# Writes a mesh with comprehensive method, one step per geometry chunk.
+# Resources referenced instead of inline geometries are named after the owner when given.
+def iterateMeshComprehensive(writer, mesh, meshData, isShared=False, owner=None):
+    log("\n** Processing mesh %s with comprehensice method... **" % meshData.name)
 
     writer.openTag("ModelVisual3D")
     writer.openTag("ModelVisual3D.Content")
     writer.openTag("Model3DGroup")
     
     if len(meshData.materials) > 0:
-        # Split the mesh in the group based on materials
-        print(" -> splitting mesh according to materials repartition")
-        for material in meshData.materials:
-            writeMeshComprehensiveMaterialIteration(writer, mesh, meshData, material)
+        log(" -> splitting mesh according to materials repartition")
     else:
-        # The entire mesh with no associated material is taken into account
-        print(" -> no material defined, mesh is kept in one block")
-        writeMeshComprehensiveMaterialIteration(writer, mesh, meshData, None)
+        log(" -> no material defined, mesh is kept in one block")
+    for materialIndex, material, faceIndices in iterateMaterialBuckets(meshData):
+        if not isShared:
+            for step in iterateMeshComprehensiveMaterial(writer, mesh, meshData, material, faceIndices):
+                yield
+        else:
+            writeGeometryReferences(writer, meshData, materialIndex, material, faceIndices, owner)
+    
+    writeTransform(writer, mesh, "Model3DGroup.Transform")
+    writer.closeTagName("Model3DGroup")
     
-    writer.openTag("Model3DGroup.Transform")
+    # end of list of meshes
+    writer.closeTagName("ModelVisual3D")
+    log("comprehensive method exportation done")
+
+# Formats the key of the Model3DGroup resource of an instanced object
+def formatInstanceName(source):
+    return "I_%s" % source.name.replace("."," ").replace(" ","_")
+
+# Writes the resources of an object instanced by duplis or particles: its geometries,
+# then a Model3DGroup referencing them, shared by all the instances. One step per geometry chunk.
+def iterateInstanceResource(writer, source, meshData):
+    for step in iterateSharedMeshGeometry(writer, meshData, source, "GI"):
+        yield
+    writeInstanceGroup(writer, source, meshData)
+
+# Writes the Model3DGroup of an object instanced by duplis or particles, referencing its geometries and materials
+def writeInstanceGroup(writer, source, meshData):
+    writer.openTag("Model3DGroup")
+    writer.addProperty("x:Key", formatInstanceName(source))
+    for materialIndex, material, faceIndices in iterateMaterialBuckets(meshData):
+        writeGeometryReferences(writer, meshData, materialIndex, material, faceIndices, source, "GI")
+    writer.closeTagName("Model3DGroup")
+
+# Writes the instances of an emitter in a ModelVisual3D, each instance being its world matrix and a reference
+# to the Model3DGroup of its source. One step per stepSize instances.
+def iterateInstances(writer, emitter, instances, stepSize=1000):
+    log("\n** Processing %i instances of %s... **" % (len(instances), emitter.name))
+    writer.openTag("ModelVisual3D")
+    writer.openTag("ModelVisual3D.Children")
+    for index, (source, matrix) in enumerate(instances):
+        writer.openTag("ModelVisual3D")
+        writer.addProperty("Content", "{StaticResource %s}" % formatInstanceName(source))
+        writer.openTag("ModelVisual3D.Transform")
+        writer.openTag("MatrixTransform3D")
+        writer.addProperty("Matrix", writer.formatMatrix(matrix))
+        writer.closeTagName("ModelVisual3D")
+        if (index + 1) % stepSize == 0:
+            yield
+    writer.closeTagName("ModelVisual3D")
+    Profiler.count("instances", len(instances))
+
+# Gets the location and scale of an object relative to its parent, the parent inverse matrix included
+def getLocalLocationScale(object):
+    if object.parent is None:
+        return object.location, object.scale
+    location, rotation, scale = object.matrix_local.decompose()
+    return location, scale
+
+# Gets the name of an animated xaml element of an object, None when the object is not animated
+def formatAnimatedName(object, element):
+    name = AnimatedNames.get(object.name)
+    return None if name is None else "%s_%s" % (name, element)
+
+# Adds the name of an animated xaml element to the current tag
+def addAnimatedName(writer, object, element):
+    name = formatAnimatedName(object, element)
+    if name is not None:
+        writer.addProperty("x:Name", name)
+
+# Add the transform of an object relative to its parent in the given property tag.
+# The elements of animated objects are named, prefixed by namePrefix.
+def writeTransform(writer, object, tagName, namePrefix=""):
+    location, scale = getLocalLocationScale(object)
+    writer.openTag(tagName)
     writer.openTag("Transform3DGroup")
     writer.openTag("Transform3DGroup.Children")
     
     # Scale transform
-    print(" -> computing scale")
+    log(" -> computing scale")
     writer.openTag("ScaleTransform3D")
-    writer.addProperty("ScaleX", mesh.scale.x)
-    writer.addProperty("ScaleY", mesh.scale.y)
-    writer.addProperty("ScaleZ", mesh.scale.z)
+    addAnimatedName(writer, object, namePrefix + "S")
+    writer.addFloatProperty("ScaleX", scale.x)
+    writer.addFloatProperty("ScaleY", scale.y)
+    writer.addFloatProperty("ScaleZ", scale.z)
     writer.closeTag()
     
     # Rotation transform
-    print(" -> computing rotate")
+    log(" -> computing rotate")
     writer.openTag("RotateTransform3D")
     writer.openTag("RotateTransform3D.Rotation")
     writer.openTag("AxisAngleRotation3D ")
+    addAnimatedName(writer, object, namePrefix + "R")
 	
-    writer.addEulerProperty("Axis",  mesh.matrix_local.to_euler())
-    writer.addProperty("Angle", degrees(2 * acos(mesh.matrix_local.to_quaternion()[0])))
+    writer.addEulerProperty("Axis",  object.matrix_local.to_euler())
+    writer.addFloatProperty("Angle", degrees(2 * acos(object.matrix_local.to_quaternion()[0])))
     writer.closeTagName("RotateTransform3D")
     
     # Translation transform
-    print(" -> computing translate")
+    log(" -> computing translate")
     writer.openTag("TranslateTransform3D")
-    writer.addProperty("OffsetX", mesh.location.x)
-    writer.addProperty("OffsetY", mesh.location.y)
-    writer.addProperty("OffsetZ", mesh.location.z)
-    writer.closeTagName("Model3DGroup")
-    
-    # end of list of meshes
+    addAnimatedName(writer, object, namePrefix + "T")
+    writer.addFloatProperty("OffsetX", location.x)
+    writer.addFloatProperty("OffsetY", location.y)
+    writer.addFloatProperty("OffsetZ", location.z)
+    writer.closeTagName(tagName)
+
+# Indexes the objects of a scene by type in a single pass, with the children of each object.
+# Objects whose parent is not in the scene are roots.
+def indexSceneObjects(objects):
+    objectsByType = {"MESH": [], "CAMERA": [], "LAMP": [], "EMPTY": []}
+    children = {}
+    roots = []
+    names = set()
+    for object in objects:
+        names.add(object.name)
+        if object.type in objectsByType:
+            objectsByType[object.type].append(object)
+        if object.parent is None:
+            roots.append(object)
+        else:
+            children.setdefault(object.parent.name, []).append(object)
+    for parentName in [name for name in children if name not in names]:
+        roots.extend(children.pop(parentName))
+    return objectsByType, roots, children
+
+# Gets the names of the objects having exported objects among their descendants, meshes and lights by default
+def getGroupNames(roots, children, isExported=lambda object: object.type in ("MESH", "LAMP")):
+    groupNames = set()
+    def hasExportedDescendants(object):
+        isGroup = False
+        for child in children.get(object.name, []):
+            if hasExportedDescendants(child) or isExported(child):
+                isGroup = True
+        if isGroup:
+            groupNames.add(object.name)
+        return isGroup
+    for object in roots:
+        hasExportedDescendants(object)
+    return groupNames
+
+# Begins a ModelVisual3D holding the children of an object, their transforms being relative to it.
+# The transform elements of animated objects are named with namePrefix, a group being opened once per pass.
+def beginGroup(writer, object, namePrefix="G"):
+    writer.openTag("ModelVisual3D")
+    writeTransform(writer, object, "ModelVisual3D.Transform", namePrefix)
+    writer.openTag("ModelVisual3D.Children")
+
+# Ends the ModelVisual3D of the children of an object
+def endGroup(writer):
     writer.closeTagName("ModelVisual3D")
-    print("comprehensive method exportation done")
\ No newline at end of file
+
+# Gets the bounding box of the vertices of a mesh as (min, max), None when it has no vertex
+def getMeshBounds(meshData):
+    if len(meshData.vertices) == 0:
+        return None
+    positions = array.array("f", [0]) * (len(meshData.vertices) * 3)
+    meshData.vertices.foreach_get("co", positions)
+    return (tuple([min(positions[axis::3]) for axis in range(3)]),
+            tuple([max(positions[axis::3]) for axis in range(3)]))
+
+# Transforms a bounding box by a matrix, the result being the bounding box of its transformed corners
+def transformBounds(bounds, matrix):
+    if bounds is None:
+        return None
+    corners = [matrix * Vector((x, y, z)) for x in (bounds[0][0], bounds[1][0])
+                                           for y in (bounds[0][1], bounds[1][1])
+                                           for z in (bounds[0][2], bounds[1][2])]
+    return (tuple([min([corner[axis] for corner in corners]) for axis in range(3)]),
+            tuple([max([corner[axis] for corner in corners]) for axis in range(3)]))
+
+# Gets the bounding box of two bounding boxes, either being possibly None
+def mergeBounds(bounds, other):
+    if bounds is None or other is None:
+        return bounds if other is None else other
+    return (tuple([min(bounds[0][axis], other[0][axis]) for axis in range(3)]),
+            tuple([max(bounds[1][axis], other[1][axis]) for axis in range(3)]))
+
+# Animated properties of the transforms written by writeTransform and of the camera:
+# element name suffix, property, animation type and sampled channels, camera channels following the transform ones
+TransformTracks = (("S", "ScaleX", "Double", [0]), ("S", "ScaleY", "Double", [1]), ("S", "ScaleZ", "Double", [2]),
+                   ("R", "Axis", "Vector3D", [3, 4, 5]), ("R", "Angle", "Double", [6]),
+                   ("T", "OffsetX", "Double", [7]), ("T", "OffsetY", "Double", [8]), ("T", "OffsetZ", "Double", [9]))
+CameraTracks = (("C", "Position", "Point3D", [10, 11, 12]), ("C", "LookDirection", "Vector3D", [13, 14, 15]))
+
+# Gets the values of the transform of an object written by writeTransform, in the order of TransformTracks
+def getTransformValues(object):
+    location, scale = getLocalLocationScale(object)
+    euler = object.matrix_local.to_euler()
+    angle = degrees(2 * acos(max(-1.0, min(1.0, object.matrix_local.to_quaternion()[0]))))
+    return [scale.x, scale.y, scale.z, degrees(euler.x), degrees(euler.y), degrees(euler.z), angle, location.x, location.y, location.z]
+
+# Gets the position and look direction of a camera written by writeCamera, following the transform values in CameraTracks
+def getCameraValues(camera):
+    position, direction = getCameraPlacement(camera)
+    return list(position) + list(direction.to_matrix() * Vector((0, 0, -1)))
+
+# Begins the storyboard playing the animations in loop once the viewport is loaded
+def beginStoryboard(writer, duration):
+    writer.openTag("Viewport3D.Triggers")
+    writer.openTag("EventTrigger")
+    writer.addProperty("RoutedEvent", "Viewport3D.Loaded")
+    writer.openTag("BeginStoryboard")
+    writer.openTag("Storyboard")
+    writer.addProperty("Duration", animation.formatKeyTime(duration))
+    writer.addProperty("RepeatBehavior", "Forever")
+
+# Ends the storyboard
+def endStoryboard(writer):
+    writer.closeTagName("Viewport3D.Triggers")
+
+# Writes the keyframes of the animated properties of an object, from its values sampled at the given times.
+# Keyframes interpolated within the tolerance are dropped, constant properties are not animated.
+# Returns the numbers of sampled and written keyframes.
+def writeAnimation(writer, object, tracks, namePrefixes, values, times, tolerance):
+    sampledCount = 0
+    writtenCount = 0
+    for element, property, kind, columns in tracks:
+        trackValues = animation.getColumns(values, columns)
+        kept = animation.reduceKeyframes(trackValues, tolerance)
+        for namePrefix in namePrefixes:
+            sampledCount += len(times)
+            writtenCount += len(kept)
+            if len(kept) == 0:
+                continue
+            writer.openTag("%sAnimationUsingKeyFrames" % kind)
+            writer.addProperty("Storyboard.TargetName", formatAnimatedName(object, namePrefix + element))
+            writer.addProperty("Storyboard.TargetProperty", property)
+            for frame in kept:
+                writer.openTag("Linear%sKeyFrame" % kind)
+                writer.addProperty("KeyTime", animation.formatKeyTime(times[frame]))
+                writer.addProperty("Value", ",".join([writer.formatFloat(value) for value in trackValues[frame]]))
+                writer.closeTag()
+            writer.closeTag()
+    Profiler.count("sampled_keyframes", sampledCount)
+    Profiler.count("keyframes", writtenCount)
+    return sampledCount, writtenCount
+
+# Reads an attribute of all the items of a collection as raw bytes
+def readAttributeBytes(collection, attribute, size, typecode):
+    values = array.array(typecode, [0]) * (len(collection) * size)
+    collection.foreach_get(attribute, values)
+    return values.tobytes()
+
+# Computes a content hash of an exported mesh: geometry, transform, materials and exporter options
+def hashMesh(mesh, meshData, writerOptions):
+    digest = hashlib.sha1()
+    digest.update(repr((getExporterOptions(), writerOptions)).encode())
+    if mesh is not None:
+        digest.update(repr((mesh.name, tuple(mesh.scale), tuple(mesh.location),
+                            [tuple(row) for row in mesh.matrix_local], AnimatedNames.get(mesh.name))).encode())
+    # Texture coordinates are left out of the geometries whose material has no image
+    digest.update(repr([(material.name, isUvUsed(material)) if material is not None else None for material in meshData.materials]).encode())
+    digest.update(readAttributeBytes(meshData.vertices, "co", 3, "f"))
+    digest.update(readAttributeBytes(meshData.vertices, "normal", 3, "f"))
+    digest.update(readAttributeBytes(meshData.tessfaces, "vertices_raw", 4, "i"))
+    digest.update(readAttributeBytes(meshData.tessfaces, "material_index", 1, "i"))
+    digest.update(readAttributeBytes(meshData.tessfaces, "use_smooth", 1, "b"))
+    digest.update(readAttributeBytes(meshData.tessfaces, "normal", 3, "f"))
+    if len(meshData.uv_textures) > 0:
+        digest.update(readAttributeBytes(meshData.tessface_uv_textures.active.data, "uv_raw", 8, "f"))
+    return digest.hexdigest()
+
+# Writes a mesh fragment, reusing the cached fragment when the mesh did not change,
+# in steps when writeMesh returns a generator, in one step otherwise.
+# purpose tells apart the different fragments written for a same mesh.
+def iterateCachedMesh(writer, mesh, meshData, writeMesh, purpose=None):
+    if Cache is None:
+        steps = writeMesh(writer)
+        if steps is not None:
+            for step in steps:
+                yield
+        return
+    
+    with Profiler.span("hash"):
+        writerOptions = (len(writer.tags), sorted(writer.precisions.items()), writer.isCompact)
+        key = hashMesh(mesh, meshData, writerOptions if purpose is None else writerOptions + (purpose,))
+    fragment = Cache.get(key)
+    if fragment is None:
+        fragmentWriter = writer.createFragmentWriter()
+        steps = writeMesh(fragmentWriter)
+        if steps is not None:
+            for step in steps:
+                yield
+        fragment = fragmentWriter.content
+        Cache.put(key, fragment)
+    else:
+        Profiler.count("cache_hits", 1)
+        log(" -> mesh %s unchanged: cached fragment reused" % meshData.name)
+    writer.writeFragment(fragment)
@@ -0,0 +1,114 @@
+# Size of the simulated post-transform vertex cache, the common size of Direct3D hardware caches
+CacheSize = 16
+
+# Computes the average cache miss ratio (vertex transforms per triangle) of a triangle list with a FIFO cache
+def computeACMR(indices, cacheSize=CacheSize):
+    if len(indices) == 0:
+        return 0.0
+    cache = []
+    cached = set()
+    misses = 0
+    for triangle in indices:
+        for vertex in triangle:
+            if vertex not in cached:
+                misses += 1
+                cache.append(vertex)
+                cached.add(vertex)
+                if len(cache) > cacheSize:
+                    cached.discard(cache.pop(0))
+    return float(misses) / len(indices)
+
+# Reorders triangles for the vertex cache with the Tipsify algorithm (Sander, Nehab and Barczak, 2007):
+# triangles are emitted by fans around vertices, the next fan center being a recently used vertex
+def tipsify(indices, vertexCount, cacheSize=CacheSize):
+    # Triangles adjacent to each vertex, stored as a flat list with offsets
+    liveCounts = [0] * vertexCount
+    for triangle in indices:
+        for vertex in triangle:
+            liveCounts[vertex] += 1
+    offsets = [0] * (vertexCount + 1)
+    for vertex in range(vertexCount):
+        offsets[vertex + 1] = offsets[vertex] + liveCounts[vertex]
+    adjacency = [0] * offsets[vertexCount]
+    filled = offsets[:vertexCount]
+    for index, triangle in enumerate(indices):
+        for vertex in triangle:
+            adjacency[filled[vertex]] = index
+            filled[vertex] += 1
+
+    cacheTimes = [0] * vertexCount
+    isEmitted = [False] * len(indices)
+    deadEnd = []
+    time = cacheSize + 1
+    cursor = 0
+    ordered = []
+    fan = 0 if vertexCount > 0 else -1
+    while fan >= 0:
+        candidates = []
+        for index in adjacency[offsets[fan]:offsets[fan + 1]]:
+            if isEmitted[index]:
+                continue
+            isEmitted[index] = True
+            triangle = indices[index]
+            ordered.append(triangle)
+            for vertex in triangle:
+                deadEnd.append(vertex)
+                candidates.append(vertex)
+                liveCounts[vertex] -= 1
+                if time - cacheTimes[vertex] > cacheSize:
+                    cacheTimes[vertex] = time
+                    time += 1
+
+        # Next fan: the candidate staying longest in the cache while its remaining triangles are emitted
+        fan = -1
+        bestPriority = -1
+        for vertex in candidates:
+            if liveCounts[vertex] > 0:
+                priority = 0
+                if time - cacheTimes[vertex] + 2 * liveCounts[vertex] <= cacheSize:
+                    priority = time - cacheTimes[vertex]
+                if priority > bestPriority:
+                    fan = vertex
+                    bestPriority = priority
+
+        # Dead end: go back to a recently used vertex, then to any vertex with triangles left
+        if fan < 0:
+            while len(deadEnd) > 0:
+                vertex = deadEnd.pop()
+                if liveCounts[vertex] > 0:
+                    fan = vertex
+                    break
+        if fan < 0:
+            while cursor < vertexCount:
+                if liveCounts[cursor] > 0:
+                    fan = cursor
+                    break
+                cursor += 1
+    return ordered
+
+# Gets the vertices in the order of their first use by the triangles, unused vertices last,
+# and the new index of each vertex
+def getVertexOrder(indices, vertexCount):
+    remap = [-1] * vertexCount
+    order = []
+    for triangle in indices:
+        for vertex in triangle:
+            if remap[vertex] < 0:
+                remap[vertex] = len(order)
+                order.append(vertex)
+    for vertex in range(vertexCount):
+        if remap[vertex] < 0:
+            remap[vertex] = len(order)
+            order.append(vertex)
+    return order, remap
+
+# Reorders the triangles for the vertex cache, then the vertices in the order they are fetched
+def optimizeTriangleOrder(vertices, normals, uvs, indices):
+    indices = tipsify(indices, len(vertices))
+    order, remap = getVertexOrder(indices, len(vertices))
+    vertices = [vertices[vertex] for vertex in order]
+    normals = [normals[vertex] for vertex in order]
+    if len(uvs) > 0:
+        uvs = [uvs[vertex] for vertex in order]
+    indices = [[remap[a], remap[b], remap[c]] for a, b, c in indices]
+    return vertices, normals, uvs, indices
@@ -0,0 +1,169 @@
+import sys
+import json
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Gets the peak memory of the process in bytes, None when the platform does not tell
+def getPeakMemory():
+    if resource is not None:
+        # ru_maxrss is in kilobytes on linux, in bytes on mac os
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    try:
+        import ctypes
+        import ctypes.wintypes
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [("cb", ctypes.wintypes.DWORD), ("PageFaultCount", ctypes.wintypes.DWORD),
+                        ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                        ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                        ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        ctypes.windll.psapi.GetProcessMemoryInfo(ctypes.windll.kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb)
+        return counters.PeakWorkingSetSize
+    except (ImportError, AttributeError, OSError):
+        return None
+
+class Span:
+    "A timed section of the export, with its nested sections and counters"
+
+    def __init__(self, profiler, name, category):
+        self.profiler = profiler
+        self.name = name
+        self.category = category
+        self.seconds = 0.0
+        self.counters = {}
+        self.children = []
+
+    def __enter__(self):
+        self.profiler.stack[-1].children.append(self)
+        self.profiler.stack.append(self)
+        self.start = time.time()
+        self.startPausedSeconds = self.profiler.pausedSeconds
+        self.startBytes = self.profiler.getBytesWritten()
+        if self.category == "object":
+            self.startPeakMemory = getPeakMemory()
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.seconds += time.time() - self.start - (self.profiler.pausedSeconds - self.startPausedSeconds)
+        bytesWritten = self.profiler.getBytesWritten() - self.startBytes
+        if bytesWritten > 0:
+            self.counters["bytes"] = self.counters.get("bytes", 0) + bytesWritten
+        # The peak memory of the process only grows, an object being charged with how much it raised it
+        if self.category == "object" and self.startPeakMemory is not None:
+            self.counters["peak_memory_growth"] = self.counters.get("peak_memory_growth", 0) + getPeakMemory() - self.startPeakMemory
+        self.profiler.stack.pop()
+        return False
+
+    # Gets the counters of the span and all its nested spans, bytes and memory being measured by the outermost span
+    def getTotals(self):
+        totals = dict(self.counters)
+        for child in self.children:
+            for name, value in child.getTotals().items():
+                if name not in ("bytes", "peak_memory", "peak_memory_growth"):
+                    totals[name] = totals.get(name, 0) + value
+        return totals
+
+    def toDict(self):
+        return {"name": self.name, "category": self.category, "seconds": round(self.seconds, 6),
+                "counters": self.counters, "children": [child.toDict() for child in self.children]}
+
+class Profiler:
+    "Records nested timing spans and counters of an export"
+
+    def __init__(self, verbose=False):
+        self.verbose = verbose
+        self.writer = None
+        self.root = Span(self, "export", "export")
+        self.root.start = time.time()
+        self.root.startPausedSeconds = 0.0
+        self.startPeakMemory = getPeakMemory()
+        self.stack = [self.root]
+        # Time the export spent paused, between the steps of a modal export, left out of the open spans
+        self.pausedSeconds = 0.0
+        self.pauseStart = None
+
+    # Gets the number of characters written so far by the document writer
+    def getBytesWritten(self):
+        return self.writer.bytesWritten if self.writer is not None else 0
+
+    # Opens a timed span, to be used in a with statement
+    def span(self, name, category="phase"):
+        return Span(self, name, category)
+
+    # Adds a value to a counter of the current span
+    def count(self, name, value):
+        counters = self.stack[-1].counters
+        counters[name] = counters.get(name, 0) + value
+
+    # Stops the clock of the open spans while the export is not running
+    def pause(self):
+        if self.pauseStart is None:
+            self.pauseStart = time.time()
+
+    # Restarts the clock of the open spans
+    def resume(self):
+        if self.pauseStart is not None:
+            self.pausedSeconds += time.time() - self.pauseStart
+            self.pauseStart = None
+
+    # Prints a progress message when verbose
+    def log(self, message):
+        if self.verbose:
+            print(message)
+
+    # Ends the profiling of the export
+    def finish(self):
+        self.resume()
+        self.root.seconds = time.time() - self.root.start - self.pausedSeconds
+        self.root.counters["bytes"] = self.getBytesWritten()
+        peakMemory = getPeakMemory()
+        if peakMemory is not None:
+            self.root.counters["peak_memory"] = peakMemory
+            self.root.counters["peak_memory_growth"] = peakMemory - self.startPeakMemory
+
+    # Gets the spans of a category, whatever their depth
+    def getSpans(self, category, span=None):
+        span = span or self.root
+        spans = [span] if span.category == category else []
+        for child in span.children:
+            spans.extend(self.getSpans(category, child))
+        return spans
+
+    def toDict(self):
+        return self.root.toDict()
+
+    # Writes the whole span tree as json
+    def writeJson(self, filePath):
+        File = open(filePath, "w")
+        json.dump(self.toDict(), File, indent=1)
+        File.close()
+
+    # Gets a table of the most expensive spans of a category
+    def getSummary(self, category="object", limit=20):
+        spans = sorted(self.getSpans(category), key=lambda span: -span.seconds)
+        lines = ["%-40s %10s %10s %10s %12s %10s" % (category, "seconds", "vertices", "faces", "bytes", "peak +MB")]
+        for span in spans[:limit]:
+            totals = span.getTotals()
+            lines.append("%-40s %10.3f %10i %10i %12i %10.1f" % (span.name[:40], span.seconds, totals.get("vertices", 0), totals.get("faces", 0), totals.get("bytes", 0),
+                                                                 totals.get("peak_memory_growth", 0) / 2.0**20))
+        if len(spans) > limit:
+            lines.append("... %i more" % (len(spans) - limit))
+        phases = {}
+        for span in self.getSpans("phase"):
+            phases[span.name] = phases.get(span.name, 0.0) + span.seconds
+        lines.append("")
+        lines.append("%-40s %10s" % ("phase", "seconds"))
+        for name, seconds in sorted(phases.items(), key=lambda item: -item[1]):
+            lines.append("%-40s %10.3f" % (name, seconds))
+        peakMemory = self.root.counters.get("peak_memory")
+        lines.append("")
+        lines.append("total %.3fs, %i bytes written, peak memory %s" % (self.root.seconds, self.root.counters.get("bytes", 0),
+                     "%.1f MB (+%.1f MB during the export)" % (peakMemory / 2.0**20, self.root.counters["peak_memory_growth"] / 2.0**20) if peakMemory is not None else "unknown"))
+        return "\n".join(lines)
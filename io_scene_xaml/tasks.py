@@ -0,0 +1,32 @@
+import time
+
+class SteppedTask:
+    "Runs a generator of small work units a few at a time, the caller keeping control between two runs"
+
+    def __init__(self, steps):
+        self.steps = steps
+        self.progress = (0, 0)
+        self.isFinished = False
+
+    # Runs work units until the time budget in seconds is spent (all of them when None), returns True once finished
+    def run(self, timeBudget=None):
+        end = time.time() + timeBudget if timeBudget is not None else None
+        try:
+            while True:
+                progress = next(self.steps)
+                if progress is not None:
+                    self.progress = progress
+                if end is not None and time.time() >= end:
+                    return False
+        except StopIteration:
+            self.isFinished = True
+            return True
+
+    # Gets the ratio of the work units done
+    def getRatio(self):
+        done, total = self.progress
+        return float(done) / total if total > 0 else 0.0
+
+    # Stops the task, the generator cleaning up what it started
+    def cancel(self):
+        self.steps.close()
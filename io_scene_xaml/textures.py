@@ -0,0 +1,163 @@
+import os
+import json
+import shutil
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+# File extensions of the image formats textures can be converted to
+FormatExtensions = {"PNG": ".png", "JPEG": ".jpg", "BMP": ".bmp", "TIFF": ".tif"}
+
+# Computes the content hash of a file, read by blocks
+def hashFile(path, blockSize=1024*1024):
+    digest = hashlib.sha1()
+    File = open(path, "rb")
+    block = File.read(blockSize)
+    while block:
+        digest.update(block)
+        block = File.read(blockSize)
+    File.close()
+    return digest.hexdigest()
+
+# Writes the bytes of a packed image
+def writeBytes(path, data):
+    File = open(path, "wb")
+    File.write(data)
+    File.close()
+
+class TextureExporter:
+    "Copies the images referenced by the materials next to the exported file, once per distinct content"
+
+    def __init__(self, directory, manifestPath, maxSize=0, fileFormat="KEEP", workerCount=4):
+        self.directory = directory
+        self.manifestPath = manifestPath
+        self.maxSize = maxSize
+        self.fileFormat = fileFormat
+        self.pool = ThreadPoolExecutor(max(1, workerCount))
+        self.copies = []
+        self.imageSources = {}
+        self.copied = 0
+        self.skipped = 0
+        self.deduplicated = 0
+        self.missing = 0
+        self.manifest = self.readManifest()
+        self.targets = {}
+
+    # Reads the manifest of the previous export: the hashes of the sources and the keys of the written textures
+    def readManifest(self):
+        try:
+            File = open(self.manifestPath, "r")
+            manifest = json.load(File)
+            File.close()
+            return manifest
+        except (IOError, OSError, ValueError):
+            return {"sources": {}, "targets": {}}
+
+    def writeManifest(self):
+        File = open(self.manifestPath, "w")
+        json.dump({"sources": self.manifest["sources"], "targets": self.targets}, File, indent=1, sort_keys=True)
+        File.close()
+
+    # Gets the hash of a source file, reusing the hash of the previous export when its size and date did not change
+    def hashSource(self, path):
+        stat = os.stat(path)
+        entry = self.manifest["sources"].get(path)
+        if entry is not None and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+            return path, entry
+        return path, {"size": stat.st_size, "mtime": stat.st_mtime, "hash": hashFile(path)}
+
+    # Tells whether an image is resized or converted on export
+    def isTransformed(self, image):
+        return (self.maxSize > 0 and max(image.size) > self.maxSize) or self.fileFormat != "KEEP"
+
+    # Gets the name of an exported texture, suffixed by its hash when another content has the same name
+    def getTargetName(self, image, path, contentHash, usedNames):
+        name, extension = os.path.splitext(os.path.basename(path) if path else image.name)
+        if self.fileFormat != "KEEP":
+            extension = FormatExtensions[self.fileFormat]
+        elif not extension:
+            extension = ".png"
+        if usedNames.get(name + extension, contentHash) != contentHash:
+            name = "%s_%s" % (name, contentHash[:8])
+        return name + extension
+
+    # Hashes the images on the pool, then copies each distinct content once, the copies keep running in the background
+    def prepare(self, bpy, images):
+        sources = []
+        for image in images:
+            if image.packed_file is not None:
+                data = getattr(image.packed_file, "data", None)
+                if data is not None:
+                    sources.append((image, None, data, hashlib.sha1(data).hexdigest()))
+                else:
+                    sources.append((image, None, None, hashlib.sha1(repr((image.name, image.packed_file.size)).encode()).hexdigest()))
+                continue
+            path = os.path.normpath(bpy.path.abspath(image.filepath, library=image.library))
+            if not os.path.isfile(path):
+                print("Texture %s not found: %s" % (image.name, path))
+                self.missing += 1
+                continue
+            sources.append((image, path, None, None))
+
+        # Hash the files in parallel, large images taking most of the time
+        hashes = dict(self.pool.map(self.hashSource, set([path for image, path, data, contentHash in sources if path is not None])))
+        self.manifest["sources"].update(hashes)
+
+        usedNames = {}
+        names = {}
+        for image, path, data, contentHash in sources:
+            if contentHash is None:
+                contentHash = hashes[path]["hash"]
+            transform = (self.maxSize if self.isTransformed(image) else 0, self.fileFormat)
+            key = "%s %i %s" % (contentHash, transform[0], transform[1])
+            if key in names:
+                self.imageSources[image.name] = names[key]
+                self.deduplicated += 1
+                continue
+            name = names[key] = self.imageSources[image.name] = self.getTargetName(image, path, key, usedNames)
+            usedNames[name] = key
+            self.targets[name] = key
+            target = os.path.join(self.directory, name)
+
+            # Unchanged textures of the previous export are kept
+            if os.path.isfile(target) and self.manifest["targets"].get(name) == key:
+                self.skipped += 1
+                continue
+            self.copied += 1
+            if self.isTransformed(image) or (path is None and data is None):
+                # Blender images are not thread safe, they are saved from the main thread
+                saveImage(bpy, image, target, self.maxSize, self.fileFormat)
+            elif data is not None:
+                self.copies.append(self.pool.submit(writeBytes, target, data))
+            else:
+                self.copies.append(self.pool.submit(shutil.copyfile, path, target))
+
+    # Gets the path of an exported image relative to the exported file, None when the image was not exported
+    def getImageSource(self, image):
+        return self.imageSources.get(image.name)
+
+    # Gets the paths of the exported textures with their names relative to the exported file
+    def getFiles(self):
+        return [(os.path.join(self.directory, name), name) for name in sorted(self.targets)]
+
+    # Waits for the copies and records the exported textures
+    def finish(self):
+        for copy in self.copies:
+            copy.result()
+        self.pool.shutdown()
+        if len(self.targets) > 0 or os.path.isfile(self.manifestPath):
+            self.writeManifest()
+
+# Saves a copy of an image, scaled down to fit the maximum size and converted to the given format
+def saveImage(bpy, image, path, maxSize, fileFormat):
+    copy = image.copy()
+    try:
+        width, height = image.size
+        if maxSize > 0 and max(width, height) > maxSize:
+            scale = float(maxSize) / max(width, height)
+            copy.scale(max(1, int(width * scale)), max(1, int(height * scale)))
+        if fileFormat != "KEEP":
+            copy.file_format = fileFormat
+        copy.filepath_raw = path
+        copy.save()
+    finally:
+        bpy.data.images.remove(copy)
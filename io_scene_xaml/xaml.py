@@ -1,40 +1,96 @@
+import io
 import os
+import time
 from math import degrees
-from math import radians
-from math import cos
-from math import sin
 from mathutils import *
+from . import formatting
+from . import compression
 
 class StreamWriter:
     "A simple xaml stream writer"
-    content = ""
-    tags = []
-    isCurrentNodeOpen = False
-    
+
+    # Number of list items formatted at once before being written to the stream
+    chunkSize = 4096
+
+    def __init__(self, stream=None):
+        # Without any stream, the content is kept in memory until commit
+        self.stream = stream if stream is not None else io.StringIO()
+        self.tags = []
+        self.isCurrentNodeOpen = False
+        self.bytesWritten = 0
+        # Optional formatting.ParallelFormatter used for large lists
+        self.formatter = None
+        # Number of decimals written for each class of attribute
+        self.precisions = {"position": 6, "normal": 6, "uv": 6, "transform": 6}
+        # Trailing zeros are removed from the numbers when compact, a smaller file for a slower formatting
+        self.isCompact = False
+
+    # Gets the content written so far (in-memory writer only)
+    @property
+    def content(self):
+        return self.stream.getvalue()
+
+    # Writes raw text to the stream
+    def write(self, text):
+        self.bytesWritten += len(text)
+        self.stream.write(text)
+
+    # Creates an in-memory writer producing a fragment at the current indentation level
+    def createFragmentWriter(self):
+        fragmentWriter = StreamWriter()
+        fragmentWriter.tags = list(self.tags)
+        fragmentWriter.formatter = self.formatter
+        fragmentWriter.precisions = self.precisions
+        fragmentWriter.isCompact = self.isCompact
+        return fragmentWriter
+
+    # Writes a fragment produced by a fragment writer
+    def writeFragment(self, fragment):
+        if self.isCurrentNodeOpen:
+            self.write(">\n")
+            self.isCurrentNodeOpen = False
+        self.write(fragment)
+
     # Writes the file
     def commit(self, filePath):
-        File = open(filePath, "w")
-        File.write(self.content)
-        File.close()
+        if isinstance(self.stream, io.StringIO):
+            File = open(filePath, "w")
+            File.write(self.stream.getvalue())
+            File.close()
+        else:
+            self.stream.flush()
         
+    # Gets the format of a row of floats for a class of attribute
+    def getRowFormat(self, attribute, size):
+        return formatting.getRowFormat(self.precisions[attribute], size)
+
+    # Removes the trailing zeros of formatted numbers when the writer is compact
+    def compactNumbers(self, text):
+        return formatting.compactNumbers(text) if self.isCompact else text
+
+    # Transforms a float into xaml format
+    def formatFloat(self, value, attribute="transform"):
+        return self.compactNumbers(formatting.FloatFormats[self.precisions[attribute]] % value)
+
     # Transforms a vector into xaml format
-    def formatVector(self, vector):
-        return "%f,%f,%f" % (vector.x, vector.y, vector.z)
+    def formatVector(self, vector, attribute="position"):
+        return self.compactNumbers(self.getRowFormat(attribute, 3) % (vector.x, vector.y, vector.z))
     
     # Transforms a vector into xaml format
-    def formatPoint(self, point):
-        #print(type(point))
-        #print(type(point[0]))
-        #print(point[0])
-        return "%f,%f" % (point[0], point[1])
+    def formatPoint(self, point, attribute="uv"):
+        return self.compactNumbers(self.getRowFormat(attribute, 2) % (point[0], point[1]))
     
     # Transforms an euler object into xaml format
     def formatEuler(self, euler):
-        return "%f,%f,%f" % (degrees(euler.x), degrees(euler.y), degrees(euler.z))
+        return self.compactNumbers(self.getRowFormat("transform", 3) % (degrees(euler.x), degrees(euler.y), degrees(euler.z)))
     
     # Transforms a quaternion object into xaml format
     def formatQuaternion(self, quaternion):
-        return "%f,%f,%f,%f" % (degrees(quaternion.x), degrees(quaternion.y), degrees(quaternion.z), degrees(quaternion.w))
+        return self.compactNumbers(self.getRowFormat("transform", 4) % (degrees(quaternion.x), degrees(quaternion.y), degrees(quaternion.z), degrees(quaternion.w)))
+
+    # Transforms a matrix into a xaml Matrix3D, whose rows are the columns of the Blender matrix
+    def formatMatrix(self, matrix):
+        return self.compactNumbers(self.getRowFormat("transform", 16) % tuple([matrix[row][column] for column in range(4) for row in range(4)]))
 
     # Formats a list
     def formatList(self, list):
@@ -42,40 +98,74 @@ class StreamWriter:
     
     # Formats a color
     def formatColor(self, color):
-        return "#%.2x%.2x%.2x" % (color.r*255, color.g*255, color.b*255)
+        return "#%.2x%.2x%.2x" % (int(color.r*255), int(color.g*255), int(color.b*255))
     
     # Opens a xaml tag
     def openTag(self, name):
         if self.isCurrentNodeOpen:
-            self.content += ">\n"
-        self.content += "%s<%s" % ("\t"*len(self.tags), name)
+            self.write(">\n")
+        self.write("%s<%s" % ("\t"*len(self.tags), name))
         self.isCurrentNodeOpen = True
         self.tags.append(name)
     
     # Adds a new line for the next property
     def newLine(self):
         if self.isCurrentNodeOpen:
-            self.content += "\n%s" %("\t"*len(self.tags))
+            self.write("\n%s" %("\t"*len(self.tags)))
             
     # Adds a property to the current xaml tag
     def addProperty(self, key, value):
-        self.content += " %s=\"%s\"" % (key, value)
+        self.write(" %s=\"%s\"" % (key, value))
+
+    # Adds a property whose value is written chunk by chunk
+    def addChunkedProperty(self, key, chunks):
+        self.write(" %s=\"" % key)
+        separator = ""
+        for chunk in chunks:
+            self.write(separator + chunk)
+            separator = " "
+        self.write("\"")
+
+    # Adds a property made of a list of rows of numbers, formatted a chunk at a time, compacted when compact and the writer are
+    def addRowListProperty(self, key, rows, rowFormat, compact=True):
+        compact = compact and self.isCompact
+        if self.formatter is not None and self.formatter.isParallel(len(rows)):
+            chunks = self.formatter.formatRows(rowFormat, [tuple(row) for row in rows], compact)
+        else:
+            chunks = (formatting.formatRows(rowFormat, rows[start:start + self.chunkSize], compact)
+                      for start in range(0, len(rows), self.chunkSize))
+        self.addChunkedProperty(key, chunks)
+    
+    # Adds a property from a 2D array, each row being written as a comma separated item
+    # Float arrays are formatted with the precision of the attribute, integer arrays without attribute
+    def addArrayListProperty(self, key, array, attribute=None):
+        if attribute is None:
+            rowFormat = ",".join(["%d"]*array.shape[1])
+        else:
+            rowFormat = self.getRowFormat(attribute, array.shape[1])
+        compact = attribute is not None and self.isCompact
+        if self.formatter is not None and self.formatter.isParallel(len(array)):
+            chunks = self.formatter.formatArray(rowFormat, array, compact)
+        else:
+            chunks = (formatting.formatArray(rowFormat, array[start:start + self.chunkSize], compact)
+                      for start in range(0, len(array), self.chunkSize))
+        self.addChunkedProperty(key, chunks)
     
     # Adds a vector list property
-    def addVectorListProperty(self, key, vectors):
-        formatVectors = " ".join([self.formatVector(vector) for vector in vectors])
-        self.addProperty(key, formatVectors)
+    def addVectorListProperty(self, key, vectors, attribute="position"):
+        self.addRowListProperty(key, vectors, self.getRowFormat(attribute, 3))
         
     # Adds a vector list property
-    def addPointListProperty(self, key, points):
-        #print(points[0])
-        #print(points[0][0])
-        formatPoints = " ".join([self.formatPoint(point) for point in points])
-        self.addProperty(key, formatPoints)
+    def addPointListProperty(self, key, points, attribute="uv"):
+        self.addRowListProperty(key, points, self.getRowFormat(attribute, 2))
+    
+    # Adds a float property to the current xaml tag
+    def addFloatProperty(self, key, value, attribute="transform"):
+        self.addProperty(key, self.formatFloat(value, attribute))
     
     # Adds a vector property to the current xaml tag
-    def addVectorProperty(self, key, vector):
-        self.addProperty(key, self.formatVector(vector))
+    def addVectorProperty(self, key, vector, attribute="transform"):
+        self.addProperty(key, self.formatVector(vector, attribute))
     
     # Adds an euler property to the current xaml tag
     def addEulerProperty(self, key, euler):
@@ -95,16 +185,17 @@ class StreamWriter:
     
     # Adds a list of lists property
     def addListListProperty(self, key, lists):
-        formatLists = " ".join([self.formatList(list) for list in lists])
-        self.addProperty(key, formatLists)
+        # Lists are expected to have the same length, as triangle indices do
+        rowSize = len(lists[0]) if len(lists) > 0 else 0
+        self.addRowListProperty(key, lists, ",".join(["%d"]*rowSize), False)
                          
     # Close the current xaml tag
     def closeTag(self):
         nodeToClose = self.tags.pop()
         if self.isCurrentNodeOpen:
-            self.content += "/>\n" % ()
+            self.write("/>\n")
         else:
-            self.content += "%s</%s>\n" % ("\t"*len(self.tags), nodeToClose)
+            self.write("%s</%s>\n" % ("\t"*len(self.tags), nodeToClose))
         self.isCurrentNodeOpen = False
         return nodeToClose
     
@@ -118,3 +209,63 @@ class StreamWriter:
     def closeAllTags(self):
         while len(self.tags) > 0:
             self.closeTag()
+
+class FileStreamWriter(StreamWriter):
+    "A xaml stream writer writing to disk as the document is built"
+
+    def __init__(self, filePath, bufferSize=1024*1024):
+        StreamWriter.__init__(self, open(filePath, "w", buffering=bufferSize))
+        self.filePath = filePath
+
+    # Flushes and closes the file
+    def commit(self, filePath=None):
+        self.stream.close()
+
+    # Closes and removes the partially written file
+    def discard(self):
+        self.stream.close()
+        if os.path.isfile(self.filePath):
+            os.remove(self.filePath)
+
+class CompressedStreamWriter(StreamWriter):
+    "A xaml stream writer compressing the document in a background thread as it is built, to a gzip file or a zip package"
+
+    def __init__(self, filePath, fileFormat, memberName, level=6):
+        self.package = compression.CompressedFile(filePath, fileFormat, level)
+        self.package.beginMember(memberName)
+        StreamWriter.__init__(self, compression.CompressedStream(self.package))
+        self.filePath = filePath
+        self.packageFiles = []
+        self.packageSeconds = 0.0
+
+    # Adds a file next to the document in a zip package, written on commit
+    def addPackageFile(self, path, name):
+        self.packageFiles.append((path, name))
+
+    # Waits for the compression of the document, then adds the package files
+    def commit(self, filePath=None):
+        try:
+            self.stream.close()
+            self.package.endMember()
+            # Package files are compressed once the document is done, the export waiting for them
+            start = time.time()
+            for path, name in self.packageFiles:
+                self.package.addFile(path, name)
+            self.packageSeconds = time.time() - start
+        finally:
+            self.package.close()
+
+    # Gets the uncompressed and compressed sizes in bytes, the seconds spent compressing and the seconds the export waited for it
+    def getCompressionStats(self):
+        return self.package.rawSize, os.path.getsize(self.filePath), self.stream.compressSeconds, self.stream.waitSeconds + self.packageSeconds
+
+    # Stops the compression and removes the partially written file
+    def discard(self):
+        try:
+            self.stream.close()
+        except Exception:
+            pass
+        if not self.package.File.closed:
+            self.package.File.close()
+        if os.path.isfile(self.filePath):
+            os.remove(self.filePath)
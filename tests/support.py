@@ -0,0 +1,22 @@
+"""Installs the fake Blender modules of the benchmarks once for all the tests, the addon being imported over them."""
+import os
+import sys
+import importlib
+
+RootDirectory = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(RootDirectory, "benchmarks"))
+sys.path.insert(0, RootDirectory)
+import fakeblender
+
+bpy = None
+
+# Installs the fake bpy on the first call and returns it
+def install():
+    global bpy
+    if bpy is None:
+        bpy = fakeblender.install()
+        # The addon registers its operator only when bpy was importable, so it is imported again over the fake bpy
+        for name in [name for name in sys.modules if name == "io_scene_xaml" or name.startswith("io_scene_xaml.")]:
+            del sys.modules[name]
+        importlib.import_module("io_scene_xaml")
+    return bpy
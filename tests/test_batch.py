@@ -0,0 +1,126 @@
+import os
+import sys
+import io
+import json
+import shutil
+import tempfile
+import unittest
+import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from io_scene_xaml import batch
+
+RootDirectory = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Stands for bpy, recording the calls of the export operator
+class StubBpy:
+    def __init__(self, result):
+        self.calls = []
+        stub = self
+        class Export:
+            def xaml(self, **keywords):
+                stub.calls.append(keywords)
+                return result
+        class Ops:
+            export = Export()
+        self.ops = Ops()
+
+# Stands for addon_utils, recording the enabled addons
+class StubAddonUtils:
+    def __init__(self):
+        self.enabled = []
+
+    def enable(self, name):
+        self.enabled.append(name)
+
+class BatchMainTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix="test_batch")
+        self.summaryPath = os.path.join(self.directory, "summary.json")
+        self.jobs = []
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def runJob(self, job):
+        self.jobs.append(job)
+        if "broken" in job["input"]:
+            raise RuntimeError("export failed")
+
+    def readSummary(self):
+        File = open(self.summaryPath)
+        summary = json.load(File)
+        File.close()
+        return summary
+
+    def testJobsAndSummary(self):
+        inputPath = os.path.join(self.directory, "scene.blend")
+        outputDirectory = os.path.join(self.directory, "out")
+        code = batch.main([inputPath, "--output-dir", outputDirectory, "--summary", self.summaryPath,
+                           "--workers", "2", "--WeldVertices", "yes", "--MaxInstances", "10"], runJob=self.runJob)
+        self.assertEqual(code, 0)
+        self.assertEqual(len(self.jobs), 1)
+        self.assertEqual(self.jobs[0]["output"], os.path.join(outputDirectory, "scene.xaml"))
+        self.assertEqual(self.jobs[0]["options"], {"WeldVertices": True, "MaxInstances": 10})
+        summary = self.readSummary()
+        self.assertEqual((summary["succeeded"], summary["failed"]), (1, 0))
+        self.assertEqual(summary["files"][0]["status"], "ok")
+
+    def testFailedJob(self):
+        inputs = [os.path.join(self.directory, name) for name in ("good.blend", "broken.blend")]
+        code = batch.main(inputs + ["--summary", self.summaryPath], runJob=self.runJob)
+        self.assertEqual(code, 1)
+        summary = self.readSummary()
+        self.assertEqual((summary["succeeded"], summary["failed"]), (1, 1))
+        self.assertEqual(summary["files"][1]["error"], "export failed")
+        self.assertEqual(self.jobs[0]["output"], os.path.join(self.directory, "good.xaml"))
+
+    def testManifestOptions(self):
+        manifestPath = os.path.join(self.directory, "files.json")
+        File = open(manifestPath, "w")
+        json.dump([{"input": "a.blend", "output": "out/a.xaml", "options": {"Compression": "GZIP"}}, "b.blend"], File)
+        File.close()
+        code = batch.main(["--manifest", manifestPath, "--summary", self.summaryPath, "--ExportTextures", "false"], runJob=self.runJob)
+        self.assertEqual(code, 0)
+        jobs = sorted(self.jobs, key=lambda job: job["input"])
+        self.assertEqual(jobs[0]["output"], os.path.join(self.directory, "out", "a.xaml"))
+        self.assertEqual(jobs[0]["options"], {"ExportTextures": False, "Compression": "GZIP"})
+        self.assertEqual(jobs[1]["output"], os.path.join(self.directory, "b.xaml"))
+        self.assertEqual(jobs[1]["options"], {"ExportTextures": False})
+
+class BatchExportFileTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix="test_batch")
+        self.job = {"input": "scene.blend", "output": os.path.join(self.directory, "out", "scene.xaml"), "options": {"SplitFiles": True}}
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def testFinished(self):
+        bpy = StubBpy({"FINISHED"})
+        addonUtils = StubAddonUtils()
+        stdout = sys.stdout
+        sys.stdout = output = io.StringIO()
+        try:
+            batch.exportFile(bpy, addonUtils, self.job)
+        finally:
+            sys.stdout = stdout
+        self.assertEqual(addonUtils.enabled, [batch.AddonName])
+        self.assertEqual(bpy.calls, [{"filepath": self.job["output"], "SplitFiles": True}])
+        self.assertTrue(os.path.isdir(os.path.join(self.directory, "out")))
+        self.assertIn(batch.SuccessMarker, output.getvalue())
+
+    def testCancelled(self):
+        self.assertRaises(RuntimeError, batch.exportFile, StubBpy({"CANCELLED"}), StubAddonUtils(), self.job)
+
+class BatchCommandTest(unittest.TestCase):
+    # The module runs with warnings turned into errors, as on Python versions where deprecated modules are gone
+    def testHelp(self):
+        process = subprocess.Popen([sys.executable, "-W", "error", "-m", "io_scene_xaml.batch", "--help"], cwd=RootDirectory,
+                                   stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+        output = process.communicate()[0]
+        self.assertEqual(process.returncode, 0, output)
+        self.assertIn("--manifest", output)
+
+if __name__ == "__main__":
+    unittest.main()
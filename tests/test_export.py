@@ -0,0 +1,508 @@
+import os
+import gzip
+import math
+import re
+import sys
+import types
+import random
+import struct
+import shutil
+import tempfile
+import zipfile
+import unittest
+
+import support
+from support import fakeblender
+bpy = support.install()
+import io_scene_xaml
+from io_scene_xaml import tasks
+from io_scene_xaml import compression
+from io_scene_xaml import io_xaml_exporter
+
+# Records the timers and the progress report of a modal export
+class RecordingWindowManager(fakeblender.WindowManager):
+    def __init__(self):
+        self.timers = []
+        self.isInProgress = False
+
+    def progress_begin(self, minimum, maximum):
+        self.isInProgress = True
+
+    def progress_end(self):
+        self.isInProgress = False
+
+    def event_timer_add(self, time_step, window):
+        timer = fakeblender.WindowManager.event_timer_add(self, time_step, window)
+        self.timers.append(timer)
+        return timer
+
+    def event_timer_remove(self, timer):
+        self.timers.remove(timer)
+
+class ExportTestCase(unittest.TestCase):
+    "Exports the scene made by createScene to a temporary directory, the export log being silenced"
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix="test_export")
+        self.filePath = os.path.join(self.directory, "scene.xaml")
+        self.scene = self.createScene()
+        bpy.context.scene = self.scene
+        bpy.data.meshes[:] = []
+        self.stdout = sys.stdout
+        sys.stdout = open(os.devnull, "w")
+
+    def tearDown(self):
+        sys.stdout.close()
+        sys.stdout = self.stdout
+        shutil.rmtree(self.directory)
+
+    # Creates the exported scene
+    def createScene(self):
+        return fakeblender.createScene(400, 2, 3, 1, False)
+
+    def createOperator(self, **options):
+        operator = io_scene_xaml.XamlExporter()
+        operator.filepath = self.filePath
+        operator.ExportTextures = False
+        for name, value in options.items():
+            setattr(operator, name, value)
+        return operator
+
+    # Exports the scene at once, returning the content of the exported file
+    def export(self, **options):
+        self.createOperator(**options).execute(types.SimpleNamespace(scene=self.scene, window_manager=fakeblender.WindowManager(), window=None))
+        File = open(self.filePath)
+        content = File.read()
+        File.close()
+        return content
+
+class ExportTest(ExportTestCase):
+    def setUp(self):
+        ExportTestCase.setUp(self)
+        self.windowManager = RecordingWindowManager()
+        self.context = types.SimpleNamespace(scene=self.scene, window_manager=self.windowManager, window=object())
+
+    def testSteppedExport(self):
+        operator = self.createOperator()
+        task = tasks.SteppedTask(operator.iterateExport(self.context))
+        runCount = 1
+        while not task.run(0.0):
+            runCount += 1
+        self.assertGreater(runCount, 1)
+        self.assertEqual(task.getRatio(), 1.0)
+        File = open(self.filePath)
+        content = File.read()
+        File.close()
+        self.assertTrue(content.rstrip().endswith("</Viewport3D>"))
+
+    def testCancelRemovesPartialFile(self):
+        operator = self.createOperator()
+        task = tasks.SteppedTask(operator.iterateExport(self.context))
+        self.assertFalse(task.run(0.0))
+        self.assertTrue(os.path.isfile(self.filePath))
+        task.cancel()
+        self.assertFalse(os.path.exists(self.filePath))
+
+    def testModalEscape(self):
+        operator = self.createOperator(RunModal=True)
+        self.assertEqual(operator.execute(self.context), {"RUNNING_MODAL"})
+        # A first step opens the document, as a timer event would on a larger scene
+        self.assertFalse(operator.task.run(0.0))
+        self.assertTrue(os.path.isfile(self.filePath))
+        self.assertEqual(operator.modal(self.context, types.SimpleNamespace(type="ESC")), {"CANCELLED"})
+        self.assertEqual(self.windowManager.timers, [])
+        self.assertFalse(self.windowManager.isInProgress)
+        self.assertFalse(os.path.exists(self.filePath))
+
+    def testModalFinished(self):
+        operator = self.createOperator(RunModal=True)
+        operator.execute(self.context)
+        result = {"PASS_THROUGH"}
+        while result == {"PASS_THROUGH"}:
+            result = operator.modal(self.context, types.SimpleNamespace(type="TIMER"))
+        self.assertEqual(result, {"FINISHED"})
+        self.assertEqual(self.windowManager.timers, [])
+        self.assertTrue(os.path.isfile(self.filePath))
+
+    # Events editing the scene are blocked while exporting, those moving the view are passed
+    def testModalEvents(self):
+        operator = self.createOperator(RunModal=True)
+        operator.execute(self.context)
+        self.assertEqual(operator.modal(self.context, types.SimpleNamespace(type="G")), {"RUNNING_MODAL"})
+        self.assertEqual(operator.modal(self.context, types.SimpleNamespace(type="DEL")), {"RUNNING_MODAL"})
+        self.assertEqual(operator.modal(self.context, types.SimpleNamespace(type="MOUSEMOVE")), {"PASS_THROUGH"})
+        self.assertEqual(operator.modal(self.context, types.SimpleNamespace(type="WHEELUPMOUSE")), {"PASS_THROUGH"})
+        operator.modal(self.context, types.SimpleNamespace(type="ESC"))
+
+    def testModalFailure(self):
+        writeMaterial = io_xaml_exporter.writeMaterial
+        def failingWriteMaterial(*arguments, **options):
+            raise ValueError("material")
+        io_xaml_exporter.writeMaterial = failingWriteMaterial
+        try:
+            operator = self.createOperator(RunModal=True)
+            operator.execute(self.context)
+            with self.assertRaises(ValueError):
+                while operator.modal(self.context, types.SimpleNamespace(type="TIMER")) == {"PASS_THROUGH"}:
+                    pass
+        finally:
+            io_xaml_exporter.writeMaterial = writeMaterial
+        self.assertEqual(self.windowManager.timers, [])
+        self.assertFalse(self.windowManager.isInProgress)
+        self.assertFalse(os.path.exists(self.filePath))
+
+    # Adding an image to a material brings back the texture coordinates left out of the cached geometries
+    def testCacheImageChange(self):
+        scene = fakeblender.createScene(400, 1, 1, 1, True)
+        material = scene.objects[0].data.materials[0]
+        material.texture_slots = []
+        self.context.scene = bpy.context.scene = scene
+        self.createOperator(UseCache=True, ElideAttributes=True).execute(self.context)
+        File = open(self.filePath)
+        self.assertNotIn("TextureCoordinates", File.read())
+        File.close()
+        material.texture_slots = [fakeblender.TextureSlot(fakeblender.Texture(fakeblender.Image("Image", "//image.png")))]
+        bpy.data.meshes[:] = []
+        self.createOperator(UseCache=True, ElideAttributes=True).execute(self.context)
+        File = open(self.filePath)
+        self.assertIn("TextureCoordinates", File.read())
+        File.close()
+
+class ArrayTest(ExportTestCase):
+    # The meshes read with foreach_get in numpy arrays are written as with the loops on each vertex
+    @unittest.skipUnless(io_xaml_exporter.numpy is not None, "numpy is not installed")
+    def testSameAsVertexLoops(self):
+        for options in ({}, {"CompactNumbers": True, "PositionPrecision": 4, "NormalPrecision": 3}):
+            arrays = self.export(Comprehensive=False, **options)
+            numpy = io_xaml_exporter.numpy
+            io_xaml_exporter.numpy = None
+            try:
+                loops = self.export(Comprehensive=False, **options)
+            finally:
+                io_xaml_exporter.numpy = numpy
+            self.assertIn("TriangleIndices", arrays)
+            self.assertEqual(arrays, loops)
+
+class CompressionTest(ExportTestCase):
+    # Reads the files written in the export directory, by path relative to it
+    def readDirectory(self):
+        files = {}
+        for directory, directoryNames, fileNames in os.walk(self.directory):
+            for fileName in fileNames:
+                path = os.path.join(directory, fileName)
+                File = open(path, "rb")
+                files[os.path.relpath(path, self.directory).replace(os.sep, "/")] = File.read()
+                File.close()
+        return files
+
+    def testGzip(self):
+        content = self.export()
+        os.remove(self.filePath)
+        self.createOperator(Compression="GZIP").execute(types.SimpleNamespace(scene=self.scene, window_manager=fakeblender.WindowManager(), window=None))
+        File = open(os.path.join(self.directory, "scene.xaml.gz"), "rb")
+        data = File.read()
+        File.close()
+        self.assertEqual(gzip.decompress(data).decode("utf-8"), content)
+
+    # The zip package holds the document and its resource dictionaries as written without compression
+    def testZip(self):
+        self.export(SplitFiles=True)
+        files = self.readDirectory()
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+        self.createOperator(Compression="ZIP", SplitFiles=True).execute(types.SimpleNamespace(scene=self.scene, window_manager=fakeblender.WindowManager(), window=None))
+        package = zipfile.ZipFile(os.path.join(self.directory, "scene.zip"))
+        try:
+            self.assertIsNone(package.testzip())
+            names = package.namelist()
+            self.assertIn("scene.xaml", names)
+            self.assertGreater(len(names), 2)
+            for name in names:
+                self.assertEqual(package.read(name), files[name], name)
+        finally:
+            package.close()
+
+    # Packages past 4 GB use the zip64 fields, forced here from the first byte
+    def testZip64(self):
+        zip64Limit = compression.Zip64Limit
+        compression.Zip64Limit = 0
+        try:
+            self.createOperator(Compression="ZIP", SplitFiles=True).execute(types.SimpleNamespace(scene=self.scene, window_manager=fakeblender.WindowManager(), window=None))
+        finally:
+            compression.Zip64Limit = zip64Limit
+        File = open(os.path.join(self.directory, "scene.zip"), "rb")
+        data = File.read()
+        File.close()
+        self.assertIn(struct.pack("<I", 0x06064b50), data)
+        package = zipfile.ZipFile(os.path.join(self.directory, "scene.zip"))
+        try:
+            self.assertIsNone(package.testzip())
+            self.assertTrue(package.read("scene.xaml").decode("utf-8").rstrip().endswith("</Viewport3D>"))
+        finally:
+            package.close()
+
+class TransparencyTest(ExportTestCase):
+    def createScene(self):
+        generator = random.Random(0)
+        opaque = fakeblender.Material("Opaque")
+        glass = fakeblender.Material("Glass")
+        glass.use_transparency = True
+        glass.alpha = 0.5
+        createMesh = lambda name, material: fakeblender.Object(name, "MESH", fakeblender.createGridMesh(name, 16, [material], False, generator))
+        self.parent = fakeblender.Object("Parent", "EMPTY", None, location=(1.0, 0.0, 0.0))
+        children = [createMesh("Glass", glass), createMesh("Box", opaque)]
+        for child in children:
+            child.parent = self.parent
+            self.parent.children.append(child)
+        stand = fakeblender.Object("Stand", "EMPTY", None, location=(-1.0, 0.0, 0.0))
+        floor = createMesh("Floor", opaque)
+        floor.parent = stand
+        stand.children.append(floor)
+        camera = fakeblender.Object("Camera", "CAMERA", fakeblender.Camera("Camera"), location=(0.0, -10.0, 5.0))
+        scene = fakeblender.Scene("Scene", [self.parent] + children + [stand, floor, camera])
+        scene.camera = camera
+        return scene
+
+    # A transparent mesh nested in a group comes after the opaque meshes of the groups following it
+    def testTransparentMeshesLast(self):
+        content = self.export()
+        materials = re.findall(r'Material="\{StaticResource (M_\w+)\}"', content)
+        self.assertEqual(materials, ["M_Opaque", "M_Opaque", "M_Glass"])
+        self.assertEqual(content.count("<ModelVisual3D.Children>"), 3)
+
+    # The group opened again for the transparent meshes is animated too
+    def testAnimatedGroups(self):
+        def evaluate(item, frame):
+            item.location = fakeblender.Vector((float(frame), 0.0, 0.0))
+        self.parent.animation_data = types.SimpleNamespace(action=fakeblender.Action("Move", evaluate))
+        self.scene.frame_end = 3
+        content = self.export(ExportAnimation=True)
+        names = re.findall(r'x:Name="(\w+)"', content)
+        self.assertEqual(len(names), len(set(names)))
+        targets = re.findall(r'Storyboard.TargetName="(\w+)"', content)
+        self.assertEqual(sorted(targets), ["A_Parent_GT", "A_Parent_GTT"])
+
+    # A single frame writes no storyboard
+    def testSingleFrame(self):
+        def evaluate(item, frame):
+            item.location = fakeblender.Vector((float(frame), 0.0, 0.0))
+        self.parent.animation_data = types.SimpleNamespace(action=fakeblender.Action("Move", evaluate))
+        self.scene.frame_end = self.scene.frame_start
+        content = self.export(ExportAnimation=True)
+        self.assertNotIn("Storyboard", content)
+        self.assertNotIn("x:Name", content)
+
+class InstanceTest(ExportTestCase):
+    def createScene(self):
+        generator = random.Random(0)
+        scene = fakeblender.createScene(100, 2, 1, 1, True)
+        blade = fakeblender.Object("Blade", "MESH", fakeblender.createGridMesh("BladeMesh", 16, [fakeblender.Material("Grass")], True, generator))
+        ground = scene.objects[0]
+        ground.particle_systems = [fakeblender.ParticleSystem("Grass")]
+        for index in range(20):
+            matrix = fakeblender.Object("Matrix", "EMPTY", None, location=(generator.uniform(-5.0, 5.0), generator.uniform(-5.0, 5.0), 0.0)).matrix_world
+            ground.duplis.append(fakeblender.DupliObject(blade, matrix))
+        scene.objects.append(blade)
+        self.ground = ground
+        self.blade = blade
+        return scene
+
+    # Gets the resource keys defined and referenced by a xaml file
+    def readKeys(self, path):
+        File = open(path)
+        content = File.read()
+        File.close()
+        return set(re.findall(r'x:Key="(\w+)"', content)), set(re.findall(r"StaticResource (\w+)", content))
+
+    def testInstances(self):
+        content = self.export()
+        keys, references = self.readKeys(self.filePath)
+        self.assertIn("I_Blade", keys)
+        self.assertEqual(references - keys, set())
+        self.assertEqual(content.count('Content="{StaticResource I_Blade}"'), 20)
+        self.assertIn("M_Material_000", keys)
+
+    # An emitter is left out unless its particle system renders it, its instances being exported
+    def testEmitterNotRendered(self):
+        self.ground.particle_systems = [fakeblender.ParticleSystem("Grass", False)]
+        content = self.export()
+        keys, references = self.readKeys(self.filePath)
+        self.assertNotIn("M_Material_000", keys)
+        self.assertEqual(content.count('Content="{StaticResource I_Blade}"'), 20)
+        # Without instances, the emitter is written as any other mesh
+        self.export(ExportInstances=False)
+        keys, references = self.readKeys(self.filePath)
+        self.assertIn("M_Material_000", keys)
+
+    # The children of dupli verts are only written as instances at the vertices of their parent, which is left out too
+    def testDupliVertChildren(self):
+        self.ground.particle_systems = []
+        self.ground.dupli_type = "VERTS"
+        self.blade.parent = self.ground
+        self.ground.children.append(self.blade)
+        content = self.export()
+        keys, references = self.readKeys(self.filePath)
+        self.assertEqual(references - keys, set())
+        self.assertNotIn("M_Material_000", keys)
+        self.assertEqual(content.count('Material="{StaticResource M_Grass}"'), 1)
+        self.assertEqual(content.count('Content="{StaticResource I_Blade}"'), 20)
+        # Neither the parent nor a group of its children is written, only the lights and instances are left
+        self.assertNotIn("<Transform3DGroup>", content)
+
+    # Each dictionary resolves its own references, the instance groups staying in the root resources
+    def testSplitDictionariesLoadOnTheirOwn(self):
+        self.export(SplitFiles=True)
+        rootKeys, rootReferences = self.readKeys(self.filePath)
+        allKeys = set(rootKeys)
+        resourceDirectory = os.path.join(self.directory, "scene_resources")
+        for fileName in os.listdir(resourceDirectory):
+            keys, references = self.readKeys(os.path.join(resourceDirectory, fileName))
+            self.assertEqual(references - keys, set(), fileName)
+            allKeys |= keys
+        self.assertIn("I_Blade", rootKeys)
+        self.assertTrue(os.path.isfile(os.path.join(resourceDirectory, "instance_Blade.xaml")))
+        self.assertEqual(rootReferences - allKeys, set())
+
+class DecimationTest(ExportTestCase):
+    def createScene(self):
+        self.grid = fakeblender.Object("Grid", "MESH", self.createFlatGrid("GridMesh", 900))
+        camera = fakeblender.Object("Camera", "CAMERA", fakeblender.Camera("Camera"), location=(0.0, -10.0, 5.0))
+        scene = fakeblender.Scene("Scene", [self.grid, camera])
+        scene.camera = camera
+        return scene
+
+    # Creates a grid of flat faces, each one with its own normal
+    def createFlatGrid(self, name, vertexCount):
+        mesh = fakeblender.createGridMesh(name, vertexCount, [fakeblender.Material("Ground")], False, random.Random(0))
+        for index, face in enumerate(mesh.tessfaces):
+            x, y = 0.2 * math.sin(index), 0.2 * math.cos(index)
+            length = math.sqrt(x * x + y * y + 1.0)
+            face.use_smooth = False
+            face.normal = fakeblender.Vector((x / length, y / length, 1.0 / length))
+        return mesh
+
+    # Counts the triangles written in all the geometries
+    def countTriangles(self, content):
+        return sum([len(re.split(r"[ ,]", indices)) for indices in re.findall(r'TriangleIndices="([^"]+)"', content)]) // 3
+
+    # Flat faces are welded whatever their normals, so that decimation can remove them
+    def testObjectBudgetOnFlatFaces(self):
+        self.assertGreater(self.countTriangles(self.export()), 1000)
+        self.assertLessEqual(self.countTriangles(self.export(MaxObjectTriangles=200)), 210)
+
+    # The scene budget counts the triangles of the meshes once their modifiers are applied
+    def testSceneBudgetOnEvaluatedMeshes(self):
+        self.grid.data = self.createFlatGrid("GridMesh", 100)
+        self.grid.evaluatedData = self.createFlatGrid("GridEvaluated", 900)
+        self.grid.modifiers = ["Subdivision"]
+        self.assertLessEqual(self.countTriangles(self.export(MaxSceneTriangles=400)), 420)
+        self.assertGreater(self.countTriangles(self.export(MaxSceneTriangles=400, ApplyModifiers=False)), 100)
+
+class ElisionTest(ExportTestCase):
+    def createScene(self):
+        materials = [fakeblender.Material("Plain"), fakeblender.Material("Textured", image=fakeblender.Image("Image", "//image.png"))]
+        mesh = fakeblender.createGridMesh("RoofMesh", 64, materials, True, random.Random(0))
+        # A roof of flat faces folded along a row of vertices, each face having its own normal
+        for vertex in mesh.vertices:
+            vertex.co = fakeblender.Vector((vertex.co.x, vertex.co.y, 0.5 * abs(vertex.co.x - 0.5)))
+        for face in mesh.tessfaces:
+            p0, p1, p2 = [mesh.vertices[index].co for index in face.vertices[:3]]
+            face.use_smooth = False
+            face.normal = fakeblender.Vector(self.getTriangleNormal(p0, p1, p2))
+        camera = fakeblender.Object("Camera", "CAMERA", fakeblender.Camera("Camera"), location=(0.0, -10.0, 5.0))
+        scene = fakeblender.Scene("Scene", [fakeblender.Object("Roof", "MESH", mesh), camera])
+        scene.camera = camera
+        return scene
+
+    def getTriangleNormal(self, p0, p1, p2):
+        ux, uy, uz = p1[0] - p0[0], p1[1] - p0[1], p1[2] - p0[2]
+        vx, vy, vz = p2[0] - p0[0], p2[1] - p0[1], p2[2] - p0[2]
+        nx, ny, nz = uy * vz - uz * vy, uz * vx - ux * vz, ux * vy - uy * vx
+        length = math.sqrt(nx * nx + ny * ny + nz * nz)
+        return (nx / length, ny / length, nz / length)
+
+    # Gets the material key and the attributes of each geometry
+    def readGeometries(self, content):
+        geometries = []
+        for material, attributes in re.findall(r'Material="\{StaticResource (\w+)\}">\s*<GeometryModel3D.Geometry>\s*<MeshGeometry3D(.*?)/>', content, re.DOTALL):
+            values = dict(re.findall(r'(\w+)="([^"]*)"', attributes))
+            geometries.append((material, dict([(name, [[float(value) for value in item.split(",")] for item in text.split()]) for name, text in values.items()])))
+        return geometries
+
+    # Computes the normals WPF generates: the average of the normals of the triangles around each vertex
+    def generateNormals(self, positions, indices):
+        sums = [[0.0, 0.0, 0.0] for position in positions]
+        for triangle in indices:
+            triangle = [int(index) for index in triangle]
+            normal = self.getTriangleNormal(*[positions[index] for index in triangle])
+            for index in triangle:
+                sums[index] = [total + value for total, value in zip(sums[index], normal)]
+        return [[value / math.sqrt(sum([value * value for value in total])) for value in total] for total in sums]
+
+    # The omitted normals are those WPF generates, and only the texture coordinates of materials without image are omitted
+    def testElidedMeshRendersTheSame(self):
+        complete = self.readGeometries(self.export())
+        elided = self.readGeometries(self.export(ElideAttributes=True))
+        self.assertEqual(len(complete), 2)
+        self.assertEqual([material for material, attributes in elided], [material for material, attributes in complete])
+        materials = dict(re.findall(r'<MaterialGroup x:Key="(\w+)">(.*?)</MaterialGroup>', self.export(), re.DOTALL))
+        for (material, attributes), (elidedMaterial, elidedAttributes) in zip(complete, elided):
+            self.assertNotIn("Normals", elidedAttributes)
+            self.assertEqual(elidedAttributes["Positions"], attributes["Positions"])
+            self.assertEqual(elidedAttributes["TriangleIndices"], attributes["TriangleIndices"])
+            for normal, generated in zip(attributes["Normals"], self.generateNormals(elidedAttributes["Positions"], elidedAttributes["TriangleIndices"])):
+                for value, generatedValue in zip(normal, generated):
+                    self.assertAlmostEqual(value, generatedValue, 5)
+            self.assertIn("TextureCoordinates", attributes)
+            self.assertEqual("TextureCoordinates" in elidedAttributes, "ImageBrush" in materials[material])
+        self.assertEqual(sorted([material for material, attributes in elided if "TextureCoordinates" in attributes]), ["M_Textured"])
+
+class DocumentTest(ExportTestCase):
+    def createScene(self):
+        scene = fakeblender.createScene(100, 1, 1, 1, False)
+        for index, name in enumerate(["Cam 1", "Cam_1", "cam_1"]):
+            scene.objects.append(fakeblender.Object(name, "CAMERA", fakeblender.Camera(name), location=((index + 1) * 3.0, -10.0, 5.0)))
+        return scene
+
+    # Camera names made the same once their file names are cleaned get a numeric suffix
+    def testCollidingNames(self):
+        self.createOperator(ExportCameras="ALL").execute(types.SimpleNamespace(scene=self.scene, window_manager=fakeblender.WindowManager(), window=None))
+        fileNames = ["scene_Camera.xaml", "scene_Cam_1.xaml", "scene_Cam_1_2.xaml", "scene_cam_1_3.xaml"]
+        self.assertEqual(sorted(os.listdir(self.directory)), sorted(fileNames))
+        positions = set()
+        for fileName in fileNames:
+            File = open(os.path.join(self.directory, fileName))
+            positions.add(re.search(r'PerspectiveCamera [^>]*Position="([^"]*)"', File.read()).group(1))
+            File.close()
+        self.assertEqual(len(positions), len(fileNames))
+
+    # Each document of a single export is the one a separate export of its scene and camera writes
+    def testSameAsSeparateExports(self):
+        linkedScene = fakeblender.Scene("Linked", self.scene.objects)
+        linkedScene.camera = self.scene.camera
+        bpy.data.scenes = [self.scene, linkedScene]
+        self.addCleanup(setattr, bpy.data, "scenes", [])
+        context = types.SimpleNamespace(scene=self.scene, window_manager=fakeblender.WindowManager(), window=None)
+        operator = self.createOperator(ExportCameras="ALL", ExportScenes="ALL")
+        documents = operator.getDocuments(context)
+        self.assertEqual(len(documents), 8)
+        operator.execute(context)
+        for scene, camera, filePath in documents:
+            File = open(filePath)
+            combined = File.read()
+            File.close()
+            activeCamera = scene.camera
+            scene.camera = camera
+            try:
+                self.scene = scene
+                separate = self.export()
+            finally:
+                scene.camera = activeCamera
+            self.assertEqual(combined, separate, os.path.basename(filePath))
+
+if __name__ == "__main__":
+    unittest.main()
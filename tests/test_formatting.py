@@ -0,0 +1,46 @@
+import unittest
+
+import support
+support.install()
+from io_scene_xaml import formatting
+from io_scene_xaml import xaml
+
+class CompactNumbersTest(unittest.TestCase):
+    def compact(self, values, precision=6):
+        return formatting.compactNumbers(formatting.formatRows(formatting.getRowFormat(precision, len(values)), [values]))
+
+    def testNegativeZero(self):
+        self.assertEqual(self.compact((-0.0,)), "0")
+        self.assertEqual(self.compact((-0.0000001, 1.0)), "0,1")
+        self.assertEqual(self.compact((1.0, -0.0)), "1,0")
+
+    def testTrailingZeros(self):
+        self.assertEqual(self.compact((0.5,)), "0.5")
+        self.assertEqual(self.compact((10.0,)), "10")
+        self.assertEqual(self.compact((10.0, 100.25, -20.5)), "10,100.25,-20.5")
+        self.assertEqual(formatting.compactNumbers("10.000 0.500,1.000"), "10 0.5,1")
+
+    def testSmallValues(self):
+        self.assertEqual(self.compact((1e-7,)), "0")
+        self.assertEqual(self.compact((1e-7,), 7), "0.0000001")
+        self.assertEqual(self.compact((-1e-7, 0.000001)), "0,0.000001")
+
+    def testNoDecimals(self):
+        self.assertEqual(self.compact((10.0, -0.2), 0), "10,0")
+
+class WriterPrecisionTest(unittest.TestCase):
+    # Numbers keep their fixed decimals unless the writer is compact
+    def testCompactOption(self):
+        writer = xaml.StreamWriter()
+        writer.openTag("MeshGeometry3D")
+        writer.addVectorListProperty("Positions", [(1.0, 0.5, -0.0)])
+        self.assertIn('Positions="1.000000,0.500000,-0.000000"', writer.content)
+        writer = xaml.StreamWriter()
+        writer.isCompact = True
+        writer.openTag("MeshGeometry3D")
+        writer.addVectorListProperty("Positions", [(1.0, 0.5, -0.0)])
+        writer.addListListProperty("TriangleIndices", [(0, 10, 100)])
+        self.assertIn('Positions="1,0.5,0" TriangleIndices="0,10,100"', writer.content)
+
+if __name__ == "__main__":
+    unittest.main()
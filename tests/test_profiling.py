@@ -0,0 +1,29 @@
+import time
+import unittest
+
+import support
+support.install()
+from io_scene_xaml import profiling
+
+class PauseTest(unittest.TestCase):
+    # The time spent paused between the steps of a modal export is charged to no span
+    def testPausedTimeLeftOut(self):
+        profiler = profiling.Profiler()
+        with profiler.span("Object", "object") as objectSpan:
+            with profiler.span("sample") as sampleSpan:
+                profiler.pause()
+                time.sleep(0.2)
+                profiler.resume()
+        profiler.finish()
+        for span in (objectSpan, sampleSpan, profiler.root):
+            self.assertLess(span.seconds, 0.1)
+
+    def testPauseTwice(self):
+        profiler = profiling.Profiler()
+        profiler.pause()
+        profiler.pause()
+        time.sleep(0.05)
+        profiler.resume()
+        profiler.resume()
+        self.assertGreaterEqual(profiler.pausedSeconds, 0.04)
+        self.assertLess(profiler.pausedSeconds, 1.0)